@@ -0,0 +1,179 @@
+"""
+Benchmark the hot paths: auto_reply, calculate_session_score, calculate_team_score
+and get_inquiries, both directly and through the Flask test client.
+
+Usage:
+    python -m benchmarks.bench --scale 1k --output results.json
+    python -m benchmarks.bench --scale 100k --repeat 50 --only auto_reply --only session_score
+    python -m benchmarks.compare old.json new.json
+
+A fresh SQLite database is created in a temp directory for each run unless
+BENCH_DATABASE_URL is set. Results are written as JSON so runs from different
+commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).decode().strip()
+    except Exception:
+        return None
+
+
+def _timed(fn, repeat, warmup=2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'n': repeat,
+        'mean_ms': round(statistics.mean(samples), 4),
+        'p50_ms': round(samples[len(samples) // 2], 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        'min_ms': round(samples[0], 4),
+        'max_ms': round(samples[-1], 4),
+    }
+
+
+def _setup_environment(args):
+    if os.environ.get('BENCH_DATABASE_URL'):
+        os.environ['DATABASE_URL'] = os.environ['BENCH_DATABASE_URL']
+    else:
+        tmp = tempfile.mkdtemp(prefix='crm-bench-')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        os.environ.setdefault('UPLOAD_FOLDER', os.path.join(tmp, 'uploads'))
+    # Keep background flushing out of the timings
+    os.environ.setdefault('USAGE_FLUSH_SECONDS', '3600')
+    os.environ.setdefault('USAGE_FLUSH_MAX_PENDING', '1000000')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _selected(name, only):
+    return not only or any(pattern in name for pattern in only)
+
+
+def run(args):
+    _setup_environment(args)
+    from benchmarks.synthetic import populate, visitor_messages
+    from datagen import SCALES
+    import app as crm
+    import models as crm_models
+    from blueprints.auto_reply import auto_reply_engine
+    from schema import upgrade_schema
+    from seed import seed_admin
+
+    messages = SCALES.get(args.scale.lower()) or int(args.scale)
+    results = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'database': None,
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'benchmarks': {},
+    }
+    bench = results['benchmarks']
+
+    def measure(name, fn, repeat, warmup=2):
+        if _selected(name, args.only):
+            bench[name] = _timed(fn, repeat, warmup=warmup)
+
+    with crm.app.app_context():
+        upgrade_schema()
+        seed_admin()
+        results['database'] = crm.db.engine.dialect.name
+        models = {name: getattr(crm_models, name) for name in (
+            'Team', 'User', 'AutoReplyTemplate', 'FAQ', 'Rule', 'Inquiry', 'ChatSession', 'ChatMessage')}
+        start = time.perf_counter()
+        results['counts'] = populate(crm.db, models, messages, seed=args.seed)
+        results['populate_seconds'] = round(time.perf_counter() - start, 3)
+
+        corpus = visitor_messages(max(args.repeat, 200))
+        cursor = {'i': 0}
+
+        def next_message():
+            cursor['i'] = (cursor['i'] + 1) % len(corpus)
+            return corpus[cursor['i']]
+
+        # --- direct calls ---
+        auto_reply_engine.rebuild()
+        measure('auto_reply_engine.rebuild', auto_reply_engine.rebuild, max(3, args.repeat // 10), warmup=1)
+        if auto_reply_engine.cache is not None:
+            auto_reply_engine.cache.clear()
+        measure('auto_reply_engine.match', lambda: auto_reply_engine.match(next_message()), args.repeat)
+        measure('auto_reply_engine.match_uncached',
+                lambda: auto_reply_engine.get_index().match(next_message()), args.repeat)
+
+        sample_sessions = crm_models.ChatSession.query.order_by(crm_models.ChatSession.id).limit(args.repeat).all()
+        sessions = iter(sample_sessions * 2)
+        measure('calculate_session_score', lambda: crm_models.calculate_session_score(next(sessions)), args.repeat)
+
+        team_ids = [t.id for t in crm_models.Team.query.all()]
+        teams = iter(team_ids * args.repeat)
+        measure('calculate_team_score', lambda: crm_models.calculate_team_score(next(teams)),
+                max(3, args.repeat // 10), warmup=1)
+
+    # --- through the test client ---
+    client = crm.app.test_client()
+    with client.session_transaction() as s:
+        s['logged_in'] = True
+        s['user_id'] = 1
+        s['user_name'] = 'Benchmark'
+        s['user_role'] = 'ultra_admin'
+
+    def post_auto_reply():
+        r = client.post('/api/auto-reply', json={'message': next_message()})
+        assert r.status_code == 200
+
+    def get(url):
+        def call():
+            r = client.get(url)
+            assert r.status_code == 200, (url, r.status_code)
+        return call
+
+    measure('http.auto_reply', post_auto_reply, args.repeat)
+    measure('http.get_inquiries', get('/api/inquiries'), max(3, args.repeat // 10), warmup=1)
+    measure('http.get_inquiries_filtered', get('/api/inquiries?status=Urgent&type=Sales'),
+            max(3, args.repeat // 10), warmup=1)
+    measure('http.get_teams', get('/api/teams'), max(3, args.repeat // 10), warmup=1)
+
+    if auto_reply_engine.cache is not None:
+        results['reply_cache'] = auto_reply_engine.cache.stats()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='1k', help='1k, 100k, 1m or a message count')
+    parser.add_argument('--repeat', type=int, default=100, help='samples per benchmark')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--only', action='append', default=[], help='run only benchmarks whose name contains this (repeatable)')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    payload = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload + '\n')
+        print(f"Wrote {args.output}")
+    else:
+        print(payload)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare two benchmark result files.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10] [--metric p50_ms]
+
+Prints one line per benchmark and exits with status 1 if any benchmark got
+slower than the threshold (default 10%).
+"""
+import argparse
+import json
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown as a fraction')
+    parser.add_argument('--metric', default='p50_ms', choices=['mean_ms', 'p50_ms', 'p95_ms', 'min_ms', 'max_ms'])
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        base = json.load(f)
+    with open(args.candidate) as f:
+        cand = json.load(f)
+
+    print(f"{'benchmark':40} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    regressions = []
+    for name in sorted(set(base['benchmarks']) | set(cand['benchmarks'])):
+        old = base['benchmarks'].get(name, {}).get(args.metric)
+        new = cand['benchmarks'].get(name, {}).get(args.metric)
+        if old is None or new is None:
+            print(f"{name:40} {old if old is not None else '-':>12} {new if new is not None else '-':>12} {'n/a':>9}")
+            continue
+        change = (new - old) / old if old else 0.0
+        flag = ''
+        if change > args.threshold:
+            regressions.append(name)
+            flag = '  <-- slower'
+        print(f"{name:40} {old:12.3f} {new:12.3f} {change:+8.1%}{flag}")
+
+    print(f"\nbaseline {base.get('commit')} ({base.get('scale')}), candidate {cand.get('commit')} ({cand.get('scale')})")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Run the benchmark suite and the schema check against every supported backend.
+
+Each backend gets a scratch database: a temp SQLite file, and on a PostgreSQL
+server a throwaway crm_matrix_<pid> database that is dropped afterwards. In
+it the app builds its schema, benchmarks.bench populates and exercises the hot
+paths, and `flask db-check` compares the result with the models.
+
+Usage:
+    python -m benchmarks.db_matrix                                  # SQLite only
+    python -m benchmarks.db_matrix --postgres-url postgresql://postgres@localhost:5432/postgres
+    python -m benchmarks.db_matrix --docker                         # throwaway postgres:16 container
+    python -m benchmarks.db_matrix --pgserver                       # embedded server (pip install pgserver)
+    MATRIX_POSTGRES_URL=postgresql://... python -m benchmarks.db_matrix --scale 100k
+
+The PostgreSQL URL must point at a role allowed to CREATE DATABASE. Exits
+non-zero if any backend fails; --output writes every backend's bench results.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import sqlalchemy as sa  # noqa: E402
+
+from services import engine_profile  # noqa: E402
+
+DOCKER_IMAGE = 'postgres:16'
+DOCKER_PORT = 55432
+
+
+def run_step(name, command, env):
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    seconds = round(time.perf_counter() - start, 1)
+    if completed.returncode != 0:
+        print(f"  {name:10} FAILED after {seconds}s\n{completed.stdout[-2000:]}{completed.stderr[-4000:]}")
+    else:
+        print(f"  {name:10} ok ({seconds}s)")
+    return completed
+
+
+def run_backend(database_url, args, workdir):
+    env = dict(os.environ, DATABASE_URL=database_url, BENCH_DATABASE_URL=database_url,
+               UPLOAD_FOLDER=os.path.join(workdir, 'uploads'), FLASK_APP='app')
+    output = os.path.join(workdir, 'bench.json')
+    bench = run_step('bench', [sys.executable, '-m', 'benchmarks.bench', '--scale', args.scale,
+                               '--repeat', str(args.repeat), '--output', output], env)
+    check = run_step('db-check', [sys.executable, '-m', 'flask', 'db-check'], env)
+    result = {'passed': bench.returncode == 0 and check.returncode == 0, 'bench': None}
+    if bench.returncode == 0:
+        with open(output) as f:
+            result['bench'] = json.load(f)
+    return result
+
+
+def postgres_scratch(server_url):
+    """Create a scratch database on the server; returns (its URL, a callable that drops it)."""
+    url = sa.engine.make_url(engine_profile.normalize_database_url(server_url))
+    name = f'crm_matrix_{os.getpid()}'
+    engine = sa.create_engine(url, isolation_level='AUTOCOMMIT')
+    with engine.connect() as connection:
+        connection.execute(sa.text(f'DROP DATABASE IF EXISTS {name}'))
+        connection.execute(sa.text(f'CREATE DATABASE {name}'))
+
+    def drop():
+        with engine.connect() as connection:
+            connection.execute(sa.text(f'DROP DATABASE IF EXISTS {name} WITH (FORCE)'))
+        engine.dispose()
+    return url.set(database=name).render_as_string(hide_password=False), drop
+
+
+def wait_for_postgres(url, seconds=60):
+    engine = sa.create_engine(engine_profile.normalize_database_url(url))
+    deadline = time.monotonic() + seconds
+    while True:
+        try:
+            with engine.connect():
+                break
+        except sa.exc.OperationalError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(1)
+    engine.dispose()
+
+
+def start_docker():
+    """Start a postgres:16 container; returns (server URL, stop callable)."""
+    container = subprocess.check_output([
+        'docker', 'run', '-d', '--rm', '-e', 'POSTGRES_HOST_AUTH_METHOD=trust',
+        '-p', f'127.0.0.1:{DOCKER_PORT}:5432', DOCKER_IMAGE], text=True).strip()
+    url = f'postgresql://postgres@127.0.0.1:{DOCKER_PORT}/postgres'
+    wait_for_postgres(url)
+    return url, lambda: subprocess.run(['docker', 'stop', container], capture_output=True)
+
+
+def start_pgserver(workdir):
+    """Start the embedded server from the pgserver package; returns (server URL, stop callable)."""
+    import pgserver
+    server = pgserver.get_server(os.path.join(workdir, 'pgdata'), cleanup_mode='stop')
+    return server.get_uri(), server.cleanup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--postgres-url', default=os.environ.get('MATRIX_POSTGRES_URL'),
+                        help='PostgreSQL server to create the scratch database on')
+    parser.add_argument('--docker', action='store_true', help=f'start a {DOCKER_IMAGE} container for the run')
+    parser.add_argument('--pgserver', action='store_true', help='start an embedded server (pgserver package)')
+    parser.add_argument('--skip-sqlite', action='store_true')
+    parser.add_argument('--scale', default='1k')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON results here as well')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='crm-matrix-')
+    cleanups = []
+    results = {}
+    try:
+        backends = []
+        if not args.skip_sqlite:
+            backends.append(('sqlite', 'sqlite:///' + os.path.join(workdir, 'sqlite', 'matrix.db')))
+        server_url = args.postgres_url
+        if args.docker:
+            server_url, stop = start_docker()
+            cleanups.append(stop)
+        elif args.pgserver:
+            server_url, stop = start_pgserver(workdir)
+            cleanups.append(stop)
+        if server_url:
+            database_url, drop = postgres_scratch(server_url)
+            cleanups.append(drop)
+            backends.append(('postgresql', database_url))
+
+        for name, database_url in backends:
+            print(f"{name}:")
+            backend_dir = os.path.join(workdir, name)
+            os.makedirs(backend_dir, exist_ok=True)
+            results[name] = run_backend(database_url, args, backend_dir)
+    finally:
+        for cleanup in reversed(cleanups):
+            cleanup()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, result in results.items():
+        print(f"{name:12} {'PASS' if result['passed'] else 'FAIL'}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(results, indent=2, sort_keys=True) + '\n')
+        print(f"Wrote {args.output}")
+    if not results or not all(r['passed'] for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
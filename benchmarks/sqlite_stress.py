@@ -0,0 +1,231 @@
+"""
+SQLite concurrency stress test: several processes (like gunicorn workers)
+mixing reads with short write transactions against one database file, plus
+exporter processes that stream the whole message table to a slow client
+(a long-running read, like /export) while the others keep writing.
+
+Each profile runs on a fresh copy of the same data:
+  legacy     -- the old engine: rollback journal, the driver's default lock wait
+  production -- services.engine_profile: WAL + tuned pragmas + retry_on_lock()
+
+Usage:
+    python -m benchmarks.sqlite_stress --workers 8 --seconds 10 --write-ratio 0.3
+    python -m benchmarks.sqlite_stress --exporters 0    # request traffic only
+    python -m benchmarks.sqlite_stress --profile production --output stress.json
+
+For every profile it reports throughput, read/write latency percentiles and
+how many operations failed with "database is locked" (after retries, for the
+production profile).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlalchemy as sa  # noqa: E402
+
+from services import engine_profile  # noqa: E402
+
+metadata = sa.MetaData()
+users = sa.Table('user', metadata,
+                 sa.Column('id', sa.Integer, primary_key=True),
+                 sa.Column('name', sa.String(100)),
+                 sa.Column('last_active', sa.String(50)))
+sessions = sa.Table('chat_session', metadata,
+                    sa.Column('id', sa.Integer, primary_key=True),
+                    sa.Column('visitor_name', sa.String(100)),
+                    sa.Column('updated_at', sa.String(50)))
+messages = sa.Table('chat_message', metadata,
+                    sa.Column('id', sa.Integer, primary_key=True),
+                    sa.Column('session_id', sa.Integer, nullable=False),
+                    sa.Column('text', sa.Text),
+                    sa.Column('timestamp', sa.String(50)),
+                    sa.Index('ix_chat_message_session_id', 'session_id', 'id'))
+
+PROFILES = ('legacy', 'production')
+
+
+def make_engine(path, profile, legacy_timeout):
+    if profile == 'legacy':
+        return sa.create_engine('sqlite:///' + path, connect_args={'timeout': legacy_timeout})
+    engine = sa.create_engine('sqlite:///' + path)
+    engine_profile.install_sqlite_pragmas(engine, engine_profile.sqlite_pragmas())
+    return engine
+
+
+def populate(path, n_users, n_sessions, n_messages, seed):
+    rng = random.Random(seed)
+    engine = sa.create_engine('sqlite:///' + path)
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(users.insert(), [{'id': i, 'name': f'agent{i}'} for i in range(1, n_users + 1)])
+        connection.execute(sessions.insert(), [{'id': i, 'visitor_name': f'visitor{i}'} for i in range(1, n_sessions + 1)])
+        connection.execute(messages.insert(), [{'session_id': rng.randint(1, n_sessions), 'text': 'hello ' * 10}
+                                               for _ in range(n_messages)])
+    engine.dispose()
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 3)
+
+
+def worker(path, profile, seconds, write_ratio, n_users, n_sessions, legacy_timeout, seed, queue):
+    rng = random.Random(seed)
+    engine = make_engine(path, profile, legacy_timeout)
+    stats = {'reads': 0, 'writes': 0, 'locked': 0, 'retries': 0, 'read_latency': [], 'write_latency': []}
+
+    def write_transaction():
+        # Shaped like a request: touch last_active, add a chat message, bump the session
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        session_id = rng.randint(1, n_sessions)
+        with engine.begin() as connection:
+            connection.execute(users.update().where(users.c.id == rng.randint(1, n_users)).values(last_active=now))
+            connection.execute(messages.insert().values(session_id=session_id, text='stress ' * 10, timestamp=now))
+            connection.execute(sessions.update().where(sessions.c.id == session_id).values(updated_at=now))
+
+    def count_retry():
+        stats['retries'] += 1  # engine.begin() has already rolled back
+
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if rng.random() < write_ratio:
+            try:
+                if profile == 'legacy':
+                    write_transaction()
+                else:
+                    engine_profile.retry_on_lock(write_transaction, count_retry)
+                stats['writes'] += 1
+                stats['write_latency'].append(time.perf_counter() - start)
+            except sa.exc.OperationalError as exc:
+                if not engine_profile.is_lock_error(exc):
+                    raise
+                stats['locked'] += 1
+        else:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(sa.select(users).where(users.c.id == rng.randint(1, n_users))).first()
+                    connection.execute(sa.select(messages.c.id, messages.c.text)
+                                       .where(messages.c.session_id == rng.randint(1, n_sessions))
+                                       .order_by(messages.c.id.desc()).limit(50)).all()
+                stats['reads'] += 1
+                stats['read_latency'].append(time.perf_counter() - start)
+            except sa.exc.OperationalError as exc:
+                if not engine_profile.is_lock_error(exc):
+                    raise
+                stats['locked'] += 1
+    engine.dispose()
+    queue.put(stats)
+
+
+def exporter(path, profile, seconds, legacy_timeout, batch_size, pause, queue):
+    """Stream every message in batches, pausing between batches like a client downloading slowly."""
+    engine = make_engine(path, profile, legacy_timeout)
+    stats = {'exports': 0, 'export_seconds': [], 'locked': 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(
+                    sa.select(messages).order_by(messages.c.id))
+                for _ in result.partitions():
+                    time.sleep(pause)
+            stats['exports'] += 1
+            stats['export_seconds'].append(time.perf_counter() - start)
+        except sa.exc.OperationalError as exc:
+            if not engine_profile.is_lock_error(exc):
+                raise
+            stats['locked'] += 1
+    engine.dispose()
+    queue.put(stats)
+
+
+def run_profile(profile, args):
+    directory = tempfile.mkdtemp(prefix='crm-stress-')
+    path = os.path.join(directory, 'stress.db')
+    populate(path, args.users, args.sessions, args.messages, args.seed)
+
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(
+        path, profile, args.seconds, args.write_ratio, args.users, args.sessions, args.legacy_timeout,
+        args.seed + i, queue)) for i in range(args.workers)]
+    export_queue = multiprocessing.Queue()
+    exporters = [multiprocessing.Process(target=exporter, args=(
+        path, profile, args.seconds, args.legacy_timeout, args.export_batch, args.export_pause, export_queue))
+        for _ in range(args.exporters)]
+    for process in processes + exporters:
+        process.start()
+    results = [queue.get() for _ in processes]
+    exports = [export_queue.get() for _ in exporters]
+    for process in processes + exporters:
+        process.join()
+
+    reads = sum(r['reads'] for r in results)
+    writes = sum(r['writes'] for r in results)
+    locked = sum(r['locked'] for r in results)
+    read_latency = [x for r in results for x in r['read_latency']]
+    write_latency = [x for r in results for x in r['write_latency']]
+    attempted = reads + writes + locked
+    return {
+        'operations': attempted,
+        'ops_per_second': round((reads + writes) / args.seconds, 1),
+        'reads': reads,
+        'writes': writes,
+        'locked_errors': locked,
+        'locked_rate': round(locked / attempted, 4) if attempted else 0,
+        'write_retries': sum(r['retries'] for r in results),
+        'read_p50_ms': percentile(read_latency, 0.5),
+        'read_p99_ms': percentile(read_latency, 0.99),
+        'write_p50_ms': percentile(write_latency, 0.5),
+        'write_p95_ms': percentile(write_latency, 0.95),
+        'write_p99_ms': percentile(write_latency, 0.99),
+        'exports_completed': sum(e['exports'] for e in exports),
+        'exports_locked': sum(e['locked'] for e in exports),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', action='append', choices=PROFILES, help='profiles to run (default: both)')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.3, help='fraction of operations that write')
+    parser.add_argument('--exporters', type=int, default=1, help='processes streaming the message table meanwhile')
+    parser.add_argument('--export-batch', type=int, default=1000, help='rows per exporter fetch')
+    parser.add_argument('--export-pause', type=float, default=0.05, help='seconds an exporter waits between fetches')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--legacy-timeout', type=float, default=5.0,
+                        help="legacy profile lock wait in seconds (the sqlite3 module's default)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results here as well')
+    args = parser.parse_args(argv)
+
+    results = {'workers': args.workers, 'exporters': args.exporters, 'seconds': args.seconds, 'write_ratio': args.write_ratio,
+               'sqlite': sqlite3.sqlite_version, 'profiles': {}}
+    for profile in args.profile or PROFILES:
+        results['profiles'][profile] = stats = run_profile(profile, args)
+        print(f"{profile:12} {stats['ops_per_second']:>9} ops/s  locked {stats['locked_errors']:>5} "
+              f"({stats['locked_rate']:.2%})  retries {stats['write_retries']:>5}  "
+              f"read p99 {stats['read_p99_ms']} ms  write p50/p99 {stats['write_p50_ms']}/{stats['write_p99_ms']} ms  "
+              f"exports {stats['exports_completed']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(results, indent=2, sort_keys=True) + '\n')
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Worker boot time: how long `import app` takes in a fresh interpreter (what
+every gunicorn worker pays before serving), how many SQL statements run while
+importing, and the latency of the first request afterwards.
+
+Each boot runs in its own subprocess against:
+  existing -- a database that is already set up (the normal restart case)
+  fresh    -- an empty database file per boot (first deploy)
+
+Usage:
+    python -m benchmarks.startup --repeat 10
+    python -m benchmarks.startup --ref HEAD~1      # also measure another commit, for before/after
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --blueprints auto_reply   # a slimmed worker (APP_BLUEPRINTS)
+
+--ref checks the commit out into a temporary git worktree. Trees that have a
+`flask init-db` command get it run once before the "existing" boots; older
+trees set their database up while importing.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, '.')
+import sqlalchemy
+statements = []
+sqlalchemy.event.listen(sqlalchemy.engine.Engine, 'before_cursor_execute', lambda *args: statements.append(1))
+start = time.perf_counter()
+import app
+boot = time.perf_counter() - start
+boot_statements = len(statements)
+client = app.app.test_client()
+start = time.perf_counter()
+status = client.get('/login').status_code
+first = time.perf_counter() - start
+print(json.dumps({'boot': boot, 'statements': boot_statements, 'first_request': first, 'status': status}))
+'''
+
+
+def boot(tree, env):
+    completed = subprocess.run([sys.executable, '-c', BOOT_SCRIPT], cwd=tree, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"boot failed in {tree}:\n{completed.stderr[-3000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    boots = sorted(s['boot'] * 1000 for s in samples)
+    firsts = sorted(s['first_request'] * 1000 for s in samples)
+    return {
+        'boot_p50_ms': round(statistics.median(boots), 1),
+        'boot_min_ms': round(boots[0], 1),
+        'boot_max_ms': round(boots[-1], 1),
+        'boot_statements': max(s['statements'] for s in samples),
+        'first_request_p50_ms': round(statistics.median(firsts), 1),
+    }
+
+
+def measure_tree(tree, repeat, workdir, blueprints=None):
+    base_env = dict(os.environ, UPLOAD_FOLDER=os.path.join(workdir, 'uploads'), FLASK_APP='app')
+    base_env.pop('FLASK_RUN_FROM_CLI', None)
+    if blueprints:
+        base_env['APP_BLUEPRINTS'] = blueprints
+    results = {}
+
+    existing = dict(base_env, DATABASE_URL='sqlite:///' + os.path.join(workdir, 'existing.db'))
+    subprocess.run([sys.executable, '-m', 'flask', 'init-db'], cwd=tree, env=existing, capture_output=True)
+    boot(tree, existing)  # older trees create and seed the database here
+    results['existing'] = summarize([boot(tree, existing) for _ in range(repeat)])
+
+    samples = []
+    for i in range(repeat):
+        fresh = dict(base_env, DATABASE_URL='sqlite:///' + os.path.join(workdir, f'fresh{i}.db'))
+        samples.append(boot(tree, fresh))
+    results['fresh'] = summarize(samples)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='boots per database state')
+    parser.add_argument('--ref', help='git commit to measure as well (checked out into a temporary worktree)')
+    parser.add_argument('--blueprints', help='APP_BLUEPRINTS for the booted workers (default: all blueprints)')
+    parser.add_argument('--output', help='write JSON results here as well')
+    args = parser.parse_args(argv)
+
+    trees = [('working tree', ROOT)]
+    worktree = None
+    if args.ref:
+        worktree = tempfile.mkdtemp(prefix='crm-startup-ref-')
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, args.ref], cwd=ROOT, check=True,
+                       capture_output=True)
+        trees.insert(0, (args.ref, worktree))
+
+    results = {}
+    try:
+        for name, tree in trees:
+            workdir = tempfile.mkdtemp(prefix='crm-startup-')
+            try:
+                results[name] = measure_tree(tree, args.repeat, workdir, args.blueprints)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        if worktree:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=ROOT, capture_output=True)
+
+    for name, by_state in results.items():
+        for state, stats in by_state.items():
+            print(f"{name:14} {state:9} boot p50 {stats['boot_p50_ms']:>8} ms (min {stats['boot_min_ms']}, "
+                  f"max {stats['boot_max_ms']})  SQL at boot {stats['boot_statements']:>4}  "
+                  f"first request {stats['first_request_p50_ms']} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(results, indent=2, sort_keys=True) + '\n')
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Synthetic data for the benchmarks.
+
+Everything is generated from a fixed random seed and written with Core
+executemany inserts in large batches, so the same scale always produces the
+same database and a million messages load in reasonable time.
+"""
+import random
+from datetime import datetime, timedelta
+
+# Shared with `flask generate-data`; the benchmark keeps its own fixed-date layout below
+from datagen import FIRST_NAMES, LAST_NAMES, STATUSES, TYPES, WORDS, batched as _batched, sentence as _sentence
+
+
+def scale_counts(messages):
+    return {
+        'messages': messages,
+        'sessions': max(10, messages // 10),
+        'templates': 200,
+        'faqs': 500,
+        'rules': 50,
+        'users': 50,
+        'teams': 5,
+        'inquiries': max(50, messages // 20),
+    }
+
+
+def populate(db, models, messages, seed=42, batch_size=20000):
+    """Fill an empty schema. models is a dict of the model classes from models.py. Returns the counts used."""
+    rng = random.Random(seed)
+    counts = scale_counts(messages)
+    now = datetime(2026, 1, 1, 9, 0, 0)
+    conn = db.session.connection()
+
+    def insert(model, rows):
+        table = models[model].__table__
+        for batch in _batched(rows, batch_size):
+            conn.execute(table.insert(), batch)
+
+    insert('Team', ({'id': i + 1, 'name': f"Team {i + 1}", 'created_at': now.strftime('%Y-%m-%d %H:%M')}
+                    for i in range(counts['teams'])))
+
+    # Users 1..N; leave the seeded admin accounts alone by offsetting ids
+    user_base = 1000
+    usernames = []
+    user_rows = []
+    for i in range(counts['users']):
+        username = f"bench{i:04d}"
+        usernames.append(username)
+        user_rows.append({
+            'id': user_base + i, 'username': username, 'password': 'x', 'name': f"Agent {i}",
+            'role': 'agent', 'team_id': (i % counts['teams']) + 1, 'team_role': 'member', 'preferences': '{}'
+        })
+    insert('User', user_rows)
+
+    insert('AutoReplyTemplate', ({
+        'title': f"Template {i}", 'message': f"Reply for {WORDS[i % len(WORDS)]} #{i}", 'category': 'General',
+        'usage_count': 0, 'keywords': ','.join(rng.sample(WORDS, 2)) + f",kw{i}"
+    } for i in range(counts['templates'])))
+
+    insert('FAQ', ({
+        'question': _sentence(rng, 8) + '?', 'answer': _sentence(rng, 20), 'category': 'General', 'click_count': 0
+    } for _ in range(counts['faqs'])))
+
+    insert('Rule', ({
+        'name': f"Rule {i}", 'keywords': ', '.join(rng.sample(WORDS, 3)), 'score': rng.randint(5, 50),
+        'operation': '+' if i % 5 else '-', 'active': True
+    } for i in range(counts['rules'])))
+
+    insert('Inquiry', ({
+        'customer': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        'assigned_rep': rng.choice(usernames), 'inquiry_type': rng.choice(TYPES), 'status': rng.choice(STATUSES),
+        'description': _sentence(rng, 12), 'created_at': (now - timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M')
+    } for i in range(counts['inquiries'])))
+
+    session_base = 100000
+    insert('ChatSession', ({
+        'id': session_base + i, 'visitor_name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        'visitor_email': f"visitor{i}@example.com", 'status': 'agent_active' if i % 3 else 'bot',
+        'assigned_agent_id': user_base + (i % counts['users']) if i % 3 else None,
+        'created_at': (now - timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M'),
+        'updated_at': (now - timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M'),
+        'archived': False, 'pinned': False, 'tags': '', 'transfer_status': 'none'
+    } for i in range(counts['sessions'])))
+
+    def message_rows():
+        per_session = messages // counts['sessions']
+        extra = messages - per_session * counts['sessions']
+        for i in range(counts['sessions']):
+            n = per_session + (1 if i < extra else 0)
+            for j in range(n):
+                sender = ('customer', 'Visitor') if j % 2 else ('bot', 'Chatbot')
+                yield {
+                    'session_id': session_base + i, 'sender_type': sender[0], 'sender_name': sender[1],
+                    'text': _sentence(rng, 10), 'timestamp': (now + timedelta(minutes=j)).strftime('%Y-%m-%d %H:%M:%S')
+                }
+    insert('ChatMessage', message_rows())
+
+    db.session.commit()
+    return counts
+
+
+def visitor_messages(n, seed=7):
+    """A corpus of visitor messages with repeats and typos, as a bot front-end would see."""
+    rng = random.Random(seed)
+    openers = ["hi", "hello", "price?", "hello how much", "pricng", "intergration help", "demo please"]
+    corpus = []
+    for _ in range(n):
+        if rng.random() < 0.4:
+            corpus.append(rng.choice(openers))
+        else:
+            corpus.append(_sentence(rng, rng.randint(3, 12)))
+    return corpus
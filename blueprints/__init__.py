@@ -0,0 +1,31 @@
+"""
+The routes, one blueprint per area of the app; each module defines `bp`.
+
+create_app() imports only the modules named in APP_BLUEPRINTS (default: all
+of them), so a slimmed process -- say a bot-only worker started with
+APP_BLUEPRINTS=auto_reply -- never imports, compiles or registers the rest.
+auth is always registered, since its session check guards every route.
+Rendered pages rely on the shared page context in dashboard, so processes
+that serve HTML should include it.
+"""
+from importlib import import_module
+
+BLUEPRINTS = ('auth', 'dashboard', 'customers', 'chat', 'inquiries', 'teams', 'notifications', 'scoring',
+              'auto_reply')
+ALWAYS = ('auth',)
+
+
+def selected(setting):
+    """Blueprint names for an APP_BLUEPRINTS value ('' or 'all' = every one), in registration order."""
+    if not setting or setting.strip() == 'all':
+        return list(BLUEPRINTS)
+    names = {name.strip().replace('-', '_') for name in setting.split(',') if name.strip()}
+    unknown = names - set(BLUEPRINTS)
+    if unknown:
+        raise ValueError(f"unknown blueprints {', '.join(sorted(unknown))}; choose from {', '.join(BLUEPRINTS)}")
+    return [name for name in BLUEPRINTS if name in names or name in ALWAYS]
+
+
+def load(names):
+    """Import the named blueprint modules and return their blueprints."""
+    return [import_module(f'{__name__}.{name}').bp for name in names]
@@ -0,0 +1,559 @@
+"""
+Sign-in, the session check that guards every other route, account
+administration (create / edit / delete accounts, role promotions) and the
+signed-in user's own profile.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, redirect, render_template, request, session, url_for
+from sqlalchemy import or_
+from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.utils import secure_filename
+
+from extensions import db
+from models import (ChatSession, ChatSessionSummary, CustomerSummary, Inquiry, Notification, PromotionRequest, Team,
+                    TeamMessage, TeamRequest, User, calculate_agent_score, create_notification,
+                    refresh_customer_summaries, run_write, session_response_stats)
+
+bp = Blueprint('auth', __name__, cli_group=None)
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        user = User.query.filter_by(username=username).first()
+        
+        if user:
+            # Support both hashed and legacy plain text passwords during transition
+            is_valid = False
+            try:
+                if check_password_hash(user.password, password):
+                    is_valid = True
+            except:
+                pass # Not a hash
+            
+            if not is_valid and user.password == password:
+                is_valid = True
+                # Optional: Upgrade to hash on successful login? 
+                # user.password = generate_password_hash(password)
+                # db.session.commit()
+
+            if is_valid:
+                session['logged_in'] = True
+                session['user_id'] = user.id
+                session['user_name'] = user.name
+                session['user_pic'] = user.profile_picture
+                session['user_role'] = user.role or 'agent'
+                session['user_username'] = user.username
+                return redirect(url_for('dashboard.dashboard'))
+            else:
+                return render_template('login.html', error="Invalid credentials")
+        else:
+            return render_template('login.html', error="Invalid credentials")
+    return render_template('login.html')
+
+@bp.route('/logout')
+def logout():
+    # Set user as inactive before clearing session
+    if session.get('user_id'):
+        user = User.query.get(session.get('user_id'))
+        if user:
+            user.last_active = None
+            db.session.commit()
+            
+    session.clear()
+    return redirect(url_for('auth.login'))
+
+@bp.route('/admin/create-account', methods=['GET', 'POST'])
+def admin_create_account():
+    # Only 252499L or someone with super_admin role can access
+    if not session.get('logged_in'):
+        return redirect(url_for('auth.login'))
+    
+    current_user = User.query.get(session.get('user_id'))
+    # Allow 'admin' role to view the page, but creation will be restricted
+    if current_user.username != '252499L' and current_user.role not in ['super_admin', 'admin']:
+        return render_template('404.html'), 404
+
+    if request.method == 'POST':
+        # Only super_admin or ultra_admin can create accounts
+        if current_user.role not in ['super_admin', 'ultra_admin']:
+             return render_template('403.html'), 403
+             
+        username = request.form.get('username')
+        password = request.form.get('password')
+        name = request.form.get('name')
+        bio = request.form.get('bio')
+        role = request.form.get('role', 'agent')
+        
+        # Prepare context variables for possible re-rendering
+        all_users = User.query.all()
+        all_teams = Team.query.all()
+        promotion_requests = []
+        total_super_admins = 0
+        if current_user.role in ['super_admin', 'ultra_admin']:
+            promotion_requests = PromotionRequest.query.filter_by(status='pending').all()
+            total_super_admins = User.query.filter_by(role='super_admin').count()
+
+        # Check if username exists
+        if User.query.filter_by(username=username).first():
+            return render_template('create_account.html', 
+                                   error="Username already exists",
+                                   users=all_users,
+                                   teams=all_teams,
+                                   promotion_requests=promotion_requests,
+                                   total_super_admins=total_super_admins)
+
+        # Handle profile picture
+        profile_pic_filename = None
+        file = request.files.get('profile_picture')
+        if file and file.filename != '':
+            filename = secure_filename(file.filename)
+            unique_filename = f"profile_{username}_{int(datetime.now().timestamp())}_{filename}"
+            file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename))
+            profile_pic_filename = unique_filename
+
+        # Create user
+        new_user = User(
+            username=username,
+            password=generate_password_hash(password),
+            name=name,
+            bio=bio,
+            role=role
+        )
+        if profile_pic_filename:
+            new_user.profile_picture = profile_pic_filename
+        
+        db.session.add(new_user)
+        db.session.commit()
+        
+        # Notification logic
+        notify_roles = ['super_admin', 'ultra_admin']
+        create_notification(
+            'account', 
+            'New Account Created', 
+            f"{current_user.role.replace('_', ' ').title()} {current_user.name} created a new account for {username} ({role}).", 
+            target_roles=notify_roles
+        )
+        
+        return render_template('create_account.html', 
+                               success=f"Account for {username} created successfully!", 
+                               users=User.query.all(),
+                               teams=all_teams,
+                               promotion_requests=promotion_requests,
+                               total_super_admins=total_super_admins)
+
+
+
+    # Fetch pending promotion requests for super_admins
+    promotion_requests = []
+    total_super_admins = 0
+    if current_user.role in ['super_admin', 'ultra_admin']:
+        promotion_requests = PromotionRequest.query.filter_by(status='pending').all()
+        total_super_admins = User.query.filter_by(role='super_admin').count()
+
+    return render_template('create_account.html', 
+                           users=User.query.all(), 
+                           teams=Team.query.all(),
+                           promotion_requests=promotion_requests, 
+                           total_super_admins=total_super_admins,
+                           me=current_user)
+
+@bp.route('/admin/delete-account/<int:user_id>', methods=['POST'])
+def admin_delete_account(user_id):
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    current_user = User.query.get(session.get('user_id'))
+    if current_user.role not in ['ultra_admin', 'super_admin', 'admin']:
+        return jsonify({'error': 'Forbidden'}), 403
+
+    user_to_delete = User.query.get_or_404(user_id)
+    
+    # Ultra Admin can delete their own account BUT only if they already transferred the role
+    if user_to_delete.id == current_user.id:
+        if current_user.role == 'ultra_admin':
+            # Check if there is another ultra_admin (meaning they transferred the role)
+            # Actually, the logic should be: if role is ultra_admin and count is 1, they CANNOT delete.
+            ultra_admin_count = User.query.filter_by(role='ultra_admin').count()
+            if ultra_admin_count == 1:
+                return jsonify({'error': 'Ultra Admin must transfer role to another account before deleting their own account'}), 400
+        else:
+            return jsonify({'error': 'You cannot delete your own account'}), 400
+    
+    # Prevent deletion of primary admin (if not ultra admin)
+    if user_to_delete.username == '252499L' and current_user.role != 'ultra_admin':
+        return jsonify({'error': 'Primary admin account cannot be deleted'}), 400
+
+    # Role-specific deletion rules
+    if current_user.role == 'ultra_admin':
+        # Ultra Admin can delete ANYTHING except themselves (without transfer)
+        pass
+    elif current_user.role == 'super_admin':
+        # Super admin cannot delete other super admins or ultra admin
+        if user_to_delete.role in ['super_admin', 'ultra_admin']:
+            return jsonify({'error': 'Super Admins cannot delete other Super Admins or the Ultra Admin'}), 403
+            
+    elif current_user.role == 'admin':
+        # Admin can ONLY delete agents (cannot delete admins, super_admins, ultra_admins)
+        if user_to_delete.role in ['super_admin', 'admin', 'ultra_admin']:
+             return jsonify({'error': 'Admins cannot delete Super Admins, Ultra Admins or other Admins'}), 403
+
+    # Clean up related data to avoid IntegrityErrors
+    try:
+        # 1. Promotion Requests (where user is target OR requester)
+        PromotionRequest.query.filter(or_(PromotionRequest.target_user_id == user_id, PromotionRequest.requester_id == user_id)).delete(synchronize_session=False)
+        
+        # 2. Team Requests (where user is target OR requester)
+        TeamRequest.query.filter(or_(TeamRequest.user_id == user_id, TeamRequest.requester_id == user_id)).delete(synchronize_session=False)
+        
+        # 3. Notifications
+        Notification.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        
+        # 4. Team Messages
+        TeamMessage.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+        
+        # 5. Chat Sessions - Unassign instead of delete
+        ChatSession.query.filter_by(assigned_agent_id=user_id).update({ChatSession.assigned_agent_id: None}, synchronize_session=False)
+        ChatSession.query.filter_by(requested_agent_id=user_id).update({ChatSession.requested_agent_id: None}, synchronize_session=False)
+
+        # 6. Inquiries - Unassign; assigned_rep keeps the old username for the record
+        Inquiry.query.filter_by(assigned_user_id=user_id).update({Inquiry.assigned_user_id: None}, synchronize_session=False)
+
+        # 7. Derived rows naming the user (SQLite reuses the id for the next account)
+        ChatSessionSummary.query.filter_by(agent_id=user_id).update({ChatSessionSummary.agent_id: None}, synchronize_session=False)
+        affected_customers = [customer_id for (customer_id,) in
+                              db.session.query(CustomerSummary.customer_id).filter_by(active_agent_id=user_id)]
+        refresh_customer_summaries(db.session.connection(), affected_customers)
+
+        # Capture username before deletion for the notification
+        deleted_username = user_to_delete.username
+
+        # Finally delete the user
+        db.session.delete(user_to_delete)
+        db.session.commit()
+        
+        # Notification logic
+        notify_roles = ['super_admin'] if current_user.role in ['super_admin', 'ultra_admin'] else ['super_admin', 'admin']
+        create_notification(
+            'account', 
+            'Account Deleted', 
+            f"{current_user.name} ({current_user.role}) deleted the account of {deleted_username}.", 
+            target_roles=notify_roles
+        )
+        return jsonify({'success': True})
+
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        print(f"ERROR deleting account {user_id}: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': f"Database error: {str(e)}"}), 500
+
+@bp.route('/api/admin/user/<int:user_id>')
+def api_admin_get_user(user_id):
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user = User.query.get_or_404(user_id)
+    
+    # Calculate agent score
+    agent_score = calculate_agent_score(user.id)
+    
+    return jsonify({
+        'id': user.id,
+        'username': user.username,
+        'name': user.name,
+        'role': user.role,
+        'bio': user.bio,
+        'profile_picture': user.profile_picture,
+        'team_id': user.team_id,
+        'team_role': user.team_role,
+        'team_name': user.team_obj.name if user.team_obj else None,
+        'team_pic': user.team_obj.profile_picture if user.team_obj else None,
+        'team_tag': user.team_obj.team_tag if user.team_obj else None,
+        'agent_score': agent_score,
+        'response_stats': session_response_stats(agent_id=user.id)
+    })
+
+@bp.route('/admin/edit-account/<int:user_id>', methods=['POST'])
+def admin_edit_account(user_id):
+    if not session.get('logged_in') or session.get('user_role') not in ['ultra_admin', 'super_admin', 'admin']:
+        return redirect(url_for('auth.login'))
+    
+    current_user_role = session.get('user_role')
+    user = User.query.get_or_404(user_id)
+    
+    # Admin Permission Check: Admins can only edit agents
+    if current_user_role == 'admin' and user.role != 'agent':
+        # Flash message usage would be better, but simple 403 string for now
+        return "Forbidden: Admins can only edit Agent accounts", 403
+
+    user.name = request.form.get('name')
+    
+    # Notification Setup
+    changes_summary = []
+    
+    if user.name != request.form.get('name'):
+        changes_summary.append("name")
+    
+    # Only Super Admin can change roles
+    new_role = request.form.get('role')
+    
+    if (current_user_role in ['super_admin', 'ultra_admin']) and new_role and new_role != user.role:
+        # Check for Promotion Request logic
+        if new_role in ['super_admin', 'ultra_admin']:
+            # Promotions/Transfers need approval from ALL Super Admins
+            # (Ultra Admin also needs approval from Super Admins for a transfer)
+            
+            # Special check for Ultra Admin: only ONE allowed
+            if new_role == 'ultra_admin':
+                if current_user_role != 'ultra_admin':
+                    return "Forbidden: Only an Ultra Admin can promote someone else to Ultra Admin.", 403
+                
+                # Check for existing pending ultra_admin requests
+                existing_ultra_req = PromotionRequest.query.filter_by(target_role='ultra_admin', status='pending').first()
+                if existing_ultra_req:
+                    return render_template('create_account.html', 
+                                           error="A transfer of Ultra Admin role is already in progress.", 
+                                           users=User.query.all(),
+                                           teams=Team.query.all(),
+                                           promotion_requests=PromotionRequest.query.filter_by(status='pending').all())
+
+            # Get all super admins
+            super_admins = User.query.filter_by(role='super_admin').all()
+            
+            # If there are OTHER super admins, we need approval
+            # Note: Approvals are needed for ANY promotion to super_admin or ultra_admin
+            if len(super_admins) > 0:
+                # Need approval process
+                # Check if request already exists
+                existing_req = PromotionRequest.query.filter_by(target_user_id=user.id, status='pending').first()
+                if not existing_req:
+                    # Create request
+                    req = PromotionRequest(
+                        target_user_id=user.id,
+                        requester_id=session.get('user_id'),
+                        target_role=new_role,
+                        status='pending',
+                        approvals=json.dumps([session.get('user_id')]), # Using json dumps for list
+                        created_at=datetime.now().strftime('%Y-%m-%d %H:%M')
+                    )
+                    db.session.add(req)
+                    
+                    # Notify ALL super admins
+                    notif_title = 'Ultra Admin Transfer' if new_role == 'ultra_admin' else 'Promotion - Approval Needed'
+                    notif_msg = f"Ultra Admin {session.get('user_name')} requested to transfer role to {user.name}." if new_role == 'ultra_admin' else f"{session.get('user_name')} requested to promote {user.name} to Super Admin."
+                    
+                    create_notification(
+                        'account', 
+                        notif_title, 
+                        notif_msg, 
+                        target_roles=['super_admin']
+                    )
+                    
+                    db.session.commit()
+                    return render_template('create_account.html', 
+                                           info=f"Promotion request created for {user.name}. Waiting for approval from Super Admins.", 
+                                           users=User.query.all(),
+                                           teams=Team.query.all(),
+                                           promotion_requests=PromotionRequest.query.filter_by(status='pending').all())
+                else:
+                    return render_template('create_account.html', 
+                                           error=f"A request for {user.name} is already pending.", 
+                                           users=User.query.all(),
+                                           teams=Team.query.all(),
+                                           promotion_requests=PromotionRequest.query.filter_by(status='pending').all())
+            else:
+                 changes_summary.append(f"role to {new_role}")
+                 user.role = new_role
+        else:
+             changes_summary.append(f"role to {new_role}")
+             user.role = new_role
+    
+    user.bio = request.form.get('bio')
+    
+    new_password = request.form.get('password')
+    if new_password:
+        user.password = generate_password_hash(new_password)
+        changes_summary.append("password")
+        
+    file = request.files.get('profile_picture')
+    if file and file.filename != '':
+        filename = secure_filename(file.filename)
+        unique_filename = f"profile_{user.username}_{int(datetime.now().timestamp())}_{filename}"
+        file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename))
+        user.profile_picture = unique_filename
+        changes_summary.append("profile picture")
+        
+    db.session.commit()
+    
+    # Send Notification if there were changes
+    # Note: We simply notify that an update occurred
+    if True: # Notify on any edit save
+        notify_roles = ['super_admin'] if current_user_role in ['ultra_admin', 'super_admin'] else ['super_admin', 'admin']
+        create_notification(
+            'account',
+            'Account Updated',
+            f"{session.get('user_name')} updated account details for {user.username}.",
+            target_roles=notify_roles
+        )
+
+    return redirect(url_for('auth.admin_create_account'))
+
+@bp.route('/admin/approve-promotion/<int:req_id>', methods=['POST'])
+def approve_promotion(req_id):
+    if not session.get('logged_in') or session.get('user_role') != 'super_admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+        
+    req = PromotionRequest.query.get_or_404(req_id)
+    current_uid = session.get('user_id')
+    import json
+    
+    approvals = json.loads(req.approvals)
+    if current_uid not in approvals:
+        approvals.append(current_uid)
+        req.approvals = json.dumps(approvals)
+        
+        # Get all current super admins
+        all_super_admins = User.query.filter_by(role='super_admin').all()
+        all_sa_ids = set([u.id for u in all_super_admins])
+        approved_ids = set(approvals)
+        
+        # Check if ALL current super admins have approved
+        if all_sa_ids.issubset(approved_ids):
+            # Promote!
+            req.status = 'approved'
+            old_role = req.target_user.role
+            new_role = req.target_role or 'super_admin'
+            
+            # If target role is ultra_admin, demote the current ultra_admin
+            if new_role == 'ultra_admin':
+                 current_ua = User.query.filter_by(role='ultra_admin').first()
+                 if current_ua:
+                     current_ua.role = 'super_admin'
+            
+            req.target_user.role = new_role
+            
+            # Notify everyone
+            create_notification(
+                'account',
+                'Promotion Approved',
+                f"{req.target_user.name} has been promoted to {new_role.replace('_', ' ').title()}!",
+                target_roles=['super_admin', 'admin']
+            )
+            
+            # Nofity the account itself (Requirement: Account notified of promotion with congratulations)
+            create_notification(
+                'account',
+                '🎉 Congratulations!',
+                f"You have been successfully promoted to {new_role.replace('_', ' ').title()}! Check your new permissions.",
+                target_user_id=req.target_user.id,
+                icon='🎊'
+            )
+        
+        db.session.commit()
+        return jsonify({'success': True, 'message': 'Approval recorded'})
+    
+    return jsonify({'success': True, 'message': 'Already approved'})
+
+@bp.route('/admin/reject-promotion/<int:req_id>', methods=['POST'])
+def reject_promotion(req_id):
+    if not session.get('logged_in') or session.get('user_role') != 'super_admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+        
+    req = PromotionRequest.query.get_or_404(req_id)
+    req.status = 'rejected'
+    db.session.commit()
+    
+    create_notification(
+        'account',
+        'Promotion Rejected',
+        f"Promotion request for {req.target_user.name} was rejected.",
+        target_roles=['super_admin']
+    )
+    
+    return jsonify({'success': True})
+
+@bp.route('/profile', methods=['GET', 'POST'])
+def profile():
+    if not session.get('logged_in'):
+        return redirect(url_for('auth.login'))
+        
+    user_id = session.get('user_id')
+    if not user_id:
+        session.clear()
+        return redirect(url_for('auth.login'))
+        
+    user = User.query.get(user_id)
+    if not user:
+        session.clear()
+        return redirect(url_for('auth.login'))
+    
+    if request.method == 'POST':
+        user.name = request.form.get('name')
+        user.bio = request.form.get('bio')
+        
+        # Password change
+        new_pass = request.form.get('new_password')
+        confirm_pass = request.form.get('confirm_password')
+        if new_pass:
+            if new_pass == confirm_pass:
+                user.password = generate_password_hash(new_pass)
+            else:
+                return render_template('edit_profile.html', user=user, error="Passwords do not match")
+        
+        # Profile Picture
+        if 'profile_picture' in request.files:
+            file = request.files['profile_picture']
+            if file and file.filename != '':
+                filename = secure_filename(file.filename)
+                # Save to specific folder
+                file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+                user.profile_picture = filename # Store filename only
+                
+        db.session.commit()
+        
+        # Update session data
+        session['user_name'] = user.name
+        session['user_pic'] = user.profile_picture
+        
+        return redirect(url_for('auth.profile'))
+    
+    # Calculate individual agent score
+    agent_score = calculate_agent_score(user.id)
+    response_stats = session_response_stats(agent_id=user.id)
+        
+    return render_template('edit_profile.html', user=user, agent_score=agent_score, response_stats=response_stats)
+
+@bp.before_app_request
+def require_login():
+    allowed_routes = ['auth.login', 'static']
+    if request.endpoint and request.endpoint not in allowed_routes and not session.get('logged_in'):
+        # For API endpoints, return JSON error instead of redirect
+        if request.path.startswith('/api/'):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return redirect(url_for('auth.login'))
+    
+    if session.get('logged_in') and session.get('user_id'):
+        user = User.query.get(session.get('user_id'))
+        if user:
+            # Update last active, throttled: this runs on every request and would otherwise make every request a write
+            now = datetime.now()
+            stale = (now - timedelta(seconds=current_app.config['LAST_ACTIVE_WRITE_SECONDS'])).strftime('%Y-%m-%d %H:%M:%S')
+            if not user.last_active or user.last_active < stale:
+                def touch():
+                    user.last_active = now.strftime('%Y-%m-%d %H:%M:%S')
+                try:
+                    run_write(touch)
+                except Exception:
+                    db.session.rollback()  # presence is best effort; never fail the request over it
+                
+            session['user_role'] = user.role
+            session['team_id'] = user.team_id
+            session['user_name'] = user.name
+            session['user_pic'] = user.profile_picture
@@ -0,0 +1,342 @@
+"""
+Auto-reply templates and FAQs: their editor and API, the matching engine
+behind /api/auto-reply, buffered usage / click counters and FAQ analytics.
+"""
+import logging
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, render_template, request, session
+
+from extensions import db
+from models import (AutoReplyTemplate, FAQLog, FAQ, bump_cache_version, create_notification, faq_daily_clicks,
+                    get_cache_version, rollup_faq_clicks)
+from services.auto_reply import AutoReplyEngine
+from services.reply_cache import ReplyCache
+from services.usage_buffer import CounterBuffer
+
+bp = Blueprint('auto_reply', __name__, cli_group=None)
+
+logger = logging.getLogger(__name__)
+
+@bp.route('/templates-manager')
+def templates_manager():
+    return render_template('auto_reply_template_manager.html')
+
+# --- AUTO-REPLY ENGINE ---
+
+AUTO_REPLY_CACHE = 'auto_reply'
+
+def load_auto_reply_sources():
+    templates = [
+        {'id': t.id, 'message': t.message, 'keywords': t.keywords}
+        for t in AutoReplyTemplate.query.order_by(AutoReplyTemplate.id).all()
+    ]
+    faqs = [
+        {'id': f.id, 'question': f.question, 'answer': f.answer}
+        for f in FAQ.query.order_by(FAQ.id).all()
+    ]
+    return templates, faqs
+
+auto_reply_engine = AutoReplyEngine(
+    load_auto_reply_sources,
+    lambda: get_cache_version(AUTO_REPLY_CACHE)
+)
+
+@bp.record_once
+def configure_auto_reply(state):
+    config = state.app.config
+    auto_reply_engine.check_interval = config['AUTO_REPLY_VERSION_CHECK_SECONDS']
+    auto_reply_engine.max_edits = config['FUZZY_MATCH_MAX_EDITS']
+    auto_reply_engine.min_length = config['FUZZY_MATCH_MIN_LENGTH']
+    auto_reply_engine.cache = ReplyCache(max_entries=config['REPLY_CACHE_SIZE'], ttl=config['REPLY_CACHE_TTL'])
+
+def invalidate_auto_reply():
+    """Call after any template write so every worker recompiles its matcher."""
+    bump_cache_version(AUTO_REPLY_CACHE)
+    auto_reply_engine.invalidate()
+
+def sync_faq_index(faq_id, faq=None):
+    """Call after an FAQ write; this worker updates its BM25 index in place, others rebuild."""
+    version = bump_cache_version(AUTO_REPLY_CACHE)
+    faq_data = {'id': faq.id, 'question': faq.question, 'answer': faq.answer} if faq else None
+    auto_reply_engine.apply_faq_change(faq_id, faq_data, version)
+
+# --- BUFFERED USAGE COUNTERS ---
+
+def flush_usage_counters(counters, events):
+    """Persist one batch of buffered template usage / FAQ clicks in a single transaction."""
+    from sqlalchemy import bindparam
+    template_table = AutoReplyTemplate.__table__
+    faq_table = FAQ.__table__
+    template_rows = [{'b_id': k, 'b_n': n} for k, n in counters.get('template_usage', {}).items()]
+    faq_rows = [{'b_id': k, 'b_n': n} for k, n in counters.get('faq_clicks', {}).items()]
+    if template_rows:
+        db.session.execute(
+            template_table.update()
+            .where(template_table.c.id == bindparam('b_id'))
+            .values(usage_count=db.func.coalesce(template_table.c.usage_count, 0) + bindparam('b_n')),
+            template_rows
+        )
+    if faq_rows:
+        db.session.execute(
+            faq_table.update()
+            .where(faq_table.c.id == bindparam('b_id'))
+            .values(click_count=db.func.coalesce(faq_table.c.click_count, 0) + bindparam('b_n')),
+            faq_rows
+        )
+    if events.get('faq_log'):
+        db.session.execute(FAQLog.__table__.insert(), events['faq_log'])
+    db.session.commit()
+    if events.get('faq_log'):
+        # Fold the new click logs into the daily rollups straight away. The batch is already
+        # committed, so a failure here must not send it back to the buffer: the next flush
+        # (or `flask rollup-faq-clicks`) picks the logs up from the watermark.
+        try:
+            rollup_faq_clicks()
+        except Exception:
+            db.session.rollback()
+            logger.warning("FAQ click rollup failed; it will catch up on the next flush", exc_info=True)
+
+usage_counters = CounterBuffer(flush_usage_counters)
+
+@bp.record_once
+def configure_usage_counters(state):
+    usage_counters.interval = state.app.config['USAGE_FLUSH_SECONDS']
+    usage_counters.max_pending = state.app.config['USAGE_FLUSH_MAX_PENDING']
+    # Flushes also run on the buffer's own thread and at exit, outside any request
+    usage_counters.context = state.app.app_context
+
+def record_faq_click(faq_id, log=False):
+    usage_counters.increment('faq_clicks', faq_id)
+    if log:
+        # Log the click for temporal stats
+        usage_counters.record('faq_log', {'faq_id': faq_id, 'clicked_at': datetime.utcnow()})
+
+@bp.route('/api/analytics/faq-performance')
+def faq_performance():
+    """Per-FAQ clicks over the last N days (default 30), served from the daily rollups (read-only)."""
+    from datetime import timedelta
+    days = max(1, min(request.args.get('days', 30, type=int), 366))
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    labels = [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+    # Clicks logged but not yet rolled up are counted from the log tail, not rolled up here
+    series = {}
+    for faq_id, daily in faq_daily_clicks(start).items():
+        counts = series[faq_id] = [0] * days
+        for day, clicks in daily.items():
+            if start <= day <= today:
+                counts[(day - start).days] += clicks
+
+    result = []
+    for f in FAQ.query.all():
+        daily = series.get(f.id, [0] * days)
+        result.append({
+            'id': f.id,
+            'question': f.question,
+            'category': f.category,
+            'clicks': sum(daily),
+            'total_clicks': (f.click_count or 0) + usage_counters.pending('faq_clicks', f.id),
+            'daily': daily
+        })
+    result.sort(key=lambda r: r['clicks'], reverse=True)
+
+    return jsonify({'days': days, 'labels': labels, 'faqs': result})
+
+# 1. Template API
+@bp.route('/api/templates', methods=['GET', 'POST'])
+def handle_templates():
+    if request.method == 'POST':
+        data = request.get_json()
+        new_template = AutoReplyTemplate(
+            title=data['title'],
+            message=data['message'],
+            category=data['category'],
+            keywords=','.join(data['keywords']), # Convert list to string
+            created_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            created_by=session.get('user_name', 'Admin'),
+            updated_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            updated_by=session.get('user_name', 'Admin')
+        )
+        db.session.add(new_template)
+        db.session.commit()
+        invalidate_auto_reply()
+        
+        create_notification(
+            'template',
+            'New Auto-Reply Template Created',
+            f'Template "{new_template.title}" was created by {session.get("user_name", "Admin")}.',
+            icon='💬'
+        )
+        
+        return jsonify(template_to_dict(new_template))
+    
+    templates = AutoReplyTemplate.query.all()
+    return jsonify([template_to_dict(t) for t in templates])
+
+@bp.route('/api/templates/<int:id>', methods=['PUT', 'DELETE'])
+def handle_single_template(id):
+    template = AutoReplyTemplate.query.get_or_404(id)
+    if request.method == 'DELETE':
+        db.session.delete(template)
+        db.session.commit()
+        invalidate_auto_reply()
+        return jsonify({"success": True})
+    
+    data = request.get_json()
+    template.title = data['title']
+    template.message = data['message']
+    template.category = data['category']
+    template.keywords = ','.join(data['keywords'])
+    template.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    template.updated_by = session.get('user_name', 'Admin')
+    db.session.commit()
+    invalidate_auto_reply()
+    
+    create_notification(
+        'template',
+        'Auto-Reply Template Updated',
+        f'Template "{template.title}" was updated by {session.get("user_name", "Admin")}.',
+        icon='✏️'
+    )
+    
+    return jsonify(template_to_dict(template))
+
+# 2. FAQ API
+@bp.route('/api/faqs', methods=['GET', 'POST'])
+def handle_faqs():
+    if request.method == 'POST':
+        data = request.get_json()
+        new_faq = FAQ(
+            question=data['question'],
+            answer=data['answer'],
+            category=data['category'],
+            created_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            created_by=session.get('user_name', 'Admin'),
+            updated_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            updated_by=session.get('user_name', 'Admin')
+        )
+        db.session.add(new_faq)
+        db.session.commit()
+        sync_faq_index(new_faq.id, new_faq)
+        
+        create_notification(
+            'template',
+            'New FAQ Created',
+            f'FAQ "{new_faq.question}" was created by {session.get("user_name", "Admin")}.',
+            icon='❓'
+        )
+        
+        return jsonify(faq_to_dict(new_faq))
+    
+    faqs = FAQ.query.all()
+    return jsonify([faq_to_dict(f) for f in faqs])
+
+@bp.route('/api/faqs/<int:id>', methods=['PUT', 'DELETE'])
+def handle_single_faq(id):
+    faq = FAQ.query.get_or_404(id)
+    if request.method == 'DELETE':
+        db.session.delete(faq)
+        db.session.commit()
+        sync_faq_index(id)
+        return jsonify({"success": True})
+    
+    data = request.get_json()
+    faq.question = data['question']
+    faq.answer = data['answer']
+    faq.category = data['category']
+    faq.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    faq.updated_by = session.get('user_name', 'Admin')
+    db.session.commit()
+    sync_faq_index(faq.id, faq)
+    
+    create_notification(
+        'template',
+        'FAQ Updated',
+        f'FAQ "{faq.question}" was updated by {session.get("user_name", "Admin")}.',
+        icon='✏️'
+    )
+    
+    return jsonify(faq_to_dict(faq))
+
+@bp.route('/api/faqs/<int:id>/click', methods=['POST'])
+def increment_faq_click(id):
+    faq = FAQ.query.get_or_404(id)
+    # Counted in memory and written with the next batch
+    record_faq_click(faq.id, log=True)
+    return jsonify(faq_to_dict(faq))
+
+# 3. Auto-Reply Logic API
+@bp.route('/api/auto-reply', methods=['POST'])
+def auto_reply():
+    data = request.get_json()
+    user_msg = data.get('message', '')
+    
+    # 1. Keyword match in templates, 2. fall back to BM25-ranked FAQs
+    # (both served from the in-memory index, no SELECTs here)
+    source, matches = auto_reply_engine.match(
+        user_msg,
+        top_k=current_app.config['FAQ_MATCH_TOP_K'],
+        min_score=current_app.config['FAQ_MATCH_MIN_SCORE']
+    )
+    
+    if source == 'template':
+        for t in matches:
+            usage_counters.increment('template_usage', t['id'])
+        return jsonify({
+            "source": source,
+            "replies": [t['message'] for t in matches]
+        })
+    
+    if source == 'faq':
+        for f in matches:
+            record_faq_click(f['id'])
+        return jsonify({
+            "source": source,
+            "replies": [f['answer'] for f in matches],
+            "scores": [f['score'] for f in matches]
+        })
+    
+    # 3. Fallback to AI (Mocked for now)
+    return jsonify({
+        "source": "ai",
+        "replies": ["I see you're asking about that. Our AI agent is currently processing your request... (Integration Placeholder)"]
+    })
+
+@bp.route('/api/auto-reply/cache-stats')
+def auto_reply_cache_stats():
+    """Reply cache hit-rate for this worker process."""
+    stats = auto_reply_engine.cache.stats()
+    stats['pid'] = os.getpid()
+    stats['version'] = auto_reply_engine.version
+    return jsonify(stats)
+
+# Helper functions to serialize objects
+def template_to_dict(t):
+    return {
+        'id': t.id,
+        'title': t.title,
+        'message': t.message,
+        'category': t.category,
+        'keywords': t.keywords.split(',') if t.keywords else [],
+        'usageCount': (t.usage_count or 0) + usage_counters.pending('template_usage', t.id),
+        'created_at': t.created_at,
+        'created_by': t.created_by,
+        'updated_at': t.updated_at,
+        'updated_by': t.updated_by
+    }
+
+def faq_to_dict(f):
+    return {
+        'id': f.id,
+        'question': f.question,
+        'answer': f.answer,
+        'category': f.category,
+        'clickCount': (f.click_count or 0) + usage_counters.pending('faq_clicks', f.id),
+        'created_at': f.created_at,
+        'created_by': f.created_by,
+        'updated_at': f.updated_at,
+        'updated_by': f.updated_by
+    }
@@ -0,0 +1,557 @@
+"""
+Chat history pages and the live chat API: sessions, messages, takeovers and
+transfers, and linking chats to customers and inquiries.
+"""
+from flask import Blueprint, jsonify, render_template, request, session
+from sqlalchemy import or_
+
+from extensions import db
+from models import (ChatMessage, ChatSession, ChatSessionSummary, Customer, Inquiry, LeadScore, Rule, User,
+                    catch_up_lead_scores, create_notification, customer_summary, customer_summary_dict,
+                    find_customer_id, run_write, visitor_phone, write_session_summaries)
+
+bp = Blueprint('chat', __name__, cli_group=None)
+
+@bp.route('/history')
+def history():
+    view = request.args.get('view', 'active')  # active or archived
+    search_query = request.args.get('search', '').strip()
+    
+    # Base query, with each session's stored lead score
+    catch_up_lead_scores()
+    base_query = (db.session.query(ChatSession, LeadScore.score)
+                  .outerjoin(LeadScore, LeadScore.session_id == ChatSession.id)
+                  .filter(ChatSession.archived == (view == 'archived')))
+    
+    # If search query exists, filter by message content or visitor name
+    if search_query:
+        # Find session IDs that have messages containing the search query
+        matching_message_sessions = db.session.query(ChatMessage.session_id).filter(
+            ChatMessage.text.ilike(f'%{search_query}%')
+        ).distinct().all()
+        matching_session_ids = [s[0] for s in matching_message_sessions]
+        
+        # Filter sessions by either visitor name OR session ID in matching messages
+        base_query = base_query.filter(
+            or_(
+                ChatSession.visitor_name.ilike(f'%{search_query}%'),
+                ChatSession.id.in_(matching_session_ids)
+            )
+        )
+    rows = base_query.order_by(ChatSession.pinned.desc(), ChatSession.id.desc()).all()
+
+    # Each listed session's last message for the preview, in one query
+    latest_ids = (db.select(db.func.max(ChatMessage.id))
+                  .where(ChatMessage.session_id.in_(base_query.with_entities(ChatSession.id)))
+                  .group_by(ChatMessage.session_id))
+    last_messages = {m.session_id: m for m in ChatMessage.query.filter(ChatMessage.id.in_(latest_ids))}
+
+    # Lead status for persistent UI
+    sessions = []
+    for s, score in rows:
+        s.calculated_score = score or 0
+        s.is_lead = s.calculated_score > 0
+        s.last_message = last_messages.get(s.id)
+        sessions.append(s)
+
+    rules = Rule.query.filter_by(active=True).all()
+    
+    # Collect all keywords from active rules
+    keywords = []
+    for r in rules:
+        for kw in r.keywords.split(','):
+            kw = kw.strip()
+            if kw:
+                keywords.append(kw.lower())
+    
+    # Get current user role for permissions
+    user_role = session.get('user_role', 'agent')
+    
+    # Agents for the admin transfer picker, which only super admins see.
+    # Customers and inquiries are searched from the link modals instead.
+    users_list = []
+    if user_role in ('super_admin', 'ultra_admin'):
+        users_list = db.session.query(User.id, User.name, User.username).order_by(User.name).all()
+    
+    return render_template('chat-history.html',
+                           sessions=sessions,
+                           users=users_list,
+                           rule_keywords=keywords,
+                           current_view=view,
+                           user_role=user_role)
+
+@bp.route('/visitor-profile/<int:session_id>')
+def visitor_profile(session_id):
+    chat_session = ChatSession.query.get_or_404(session_id)
+    return render_template('visitor_profile.html', session=chat_session, visitor_phone=visitor_phone(chat_session))
+
+@bp.route('/api/chat/session/<int:session_id>/profile')
+def api_visitor_profile(session_id):
+    chat_session = ChatSession.query.get_or_404(session_id)
+
+    customer_data = None
+    if chat_session.linked_customer_id:
+        c = chat_session.linked_customer
+        summary, active_agent_name = customer_summary(c.id)
+
+        customer_data = {
+            'id': c.id,
+            'name': c.name,
+            'email': c.email,
+            'phone': c.phone,
+            'location': c.location,
+            'notes': c.notes,
+            'tags': c.tags,
+            'assigned_staff': active_agent_name or "no agent has been assigned",
+            **customer_summary_dict(summary)
+        }
+
+    return jsonify({
+        'session': {
+            'id': chat_session.id,
+            'visitor_name': chat_session.visitor_name,
+            'visitor_email': chat_session.visitor_email,
+            'visitor_phone': visitor_phone(chat_session),
+            'linked_customer_id': chat_session.linked_customer_id,
+            'linked_inquiry_id': chat_session.linked_inquiry_id,
+            'updated_at': chat_session.updated_at,
+            'discovery_channel': 'Direct Visit'
+        },
+        'customer': customer_data
+    })
+
+@bp.route('/api/chat/session/<int:session_id>/become-customer', methods=['POST'])
+def api_promote_to_customer(session_id):
+    chat_session = ChatSession.query.get_or_404(session_id)
+    
+    # Check if already a customer
+    if chat_session.linked_customer_id:
+        return jsonify({'ok': False, 'error': 'This visitor is already linked to a customer record.'}), 400
+
+    # A visitor whose email or phone is already on file is linked to that customer, not duplicated
+    existing_id = find_customer_id(chat_session.visitor_email, chat_session.visitor_phone)
+    if existing_id:
+        chat_session.linked_customer_id = existing_id
+        db.session.commit()
+        return jsonify({'ok': True, 'customer_id': existing_id, 'existing': True})
+
+    new_customer = Customer(
+        name=chat_session.visitor_name,
+        email=chat_session.visitor_email,
+        phone=chat_session.visitor_phone,
+        status="Active",
+        assigned_staff=session.get('user_name', 'Admin')
+    )
+    db.session.add(new_customer)
+    db.session.commit() # Save to get the new ID
+    
+    # Update the chat session to reflect the new internal customer link
+    chat_session.linked_customer_id = new_customer.id
+    db.session.commit()
+    
+    return jsonify({'ok': True, 'customer_id': new_customer.id})
+
+# --- CHAT API ENDPOINTS ---
+
+@bp.route('/api/chat/sessions')
+def api_chat_sessions():
+    sessions = ChatSession.query.filter_by(archived=False).order_by(ChatSession.pinned.desc(), ChatSession.id.desc()).all()
+    result = []
+    for s in sessions:
+        last_msg = s.chat_messages[-1] if s.chat_messages else None
+        result.append({
+            'id': s.id,
+            'visitor_name': s.visitor_name,
+            'visitor_email': s.visitor_email,
+            'status': s.status,
+            'linked_customer_id': s.linked_customer_id,
+            'linked_inquiry_id': s.linked_inquiry_id,
+            'updated_at': s.updated_at,
+            'tags': s.tags or '',
+            'archived': s.archived,
+            'pinned': s.pinned,
+            'last_message': last_msg.text[:60] + '...' if last_msg and len(last_msg.text) > 60 else (last_msg.text if last_msg else ''),
+            'last_time': last_msg.timestamp if last_msg else '',
+            'message_count': len(s.chat_messages)
+        })
+    return jsonify(result)
+
+@bp.route('/api/chat/session/<int:session_id>/messages')
+def api_chat_messages(session_id):
+    from flask import session as flask_session
+    chat_session = ChatSession.query.get_or_404(session_id)
+    since_id = request.args.get('since', 0, type=int)
+    
+    msg_query = ChatMessage.query.filter_by(session_id=session_id)
+    if since_id > 0:
+        msg_query = msg_query.filter(ChatMessage.id > since_id)
+    
+    messages = []
+    for m in msg_query.all():
+        pic = None
+        if m.sender_type == 'agent':
+            agent = User.query.filter_by(name=m.sender_name).first()
+            if agent:
+                pic = agent.profile_picture
+        
+        messages.append({
+            'id': m.id,
+            'sender_type': m.sender_type,
+            'sender_name': m.sender_name,
+            'text': m.text,
+            'timestamp': m.timestamp,
+            'pic': pic
+        })
+    return jsonify({
+        'session': {
+            'id': chat_session.id,
+            'visitor_name': chat_session.visitor_name,
+            'visitor_email': chat_session.visitor_email,
+            'visitor_phone': visitor_phone(chat_session),
+            'status': chat_session.status,
+            'linked_customer_id': chat_session.linked_customer_id,
+            'linked_inquiry_id': chat_session.linked_inquiry_id,
+            'tags': chat_session.tags or '',
+            'archived': chat_session.archived,
+            'pinned': chat_session.pinned,
+            'assigned_agent_id': chat_session.assigned_agent_id,
+            'assigned_agent_name': chat_session.assigned_agent.name if chat_session.assigned_agent else None,
+            'assigned_agent_pic': chat_session.assigned_agent.profile_picture if chat_session.assigned_agent else None,
+            'requested_agent_id': chat_session.requested_agent_id,
+            'requested_agent_name': chat_session.requested_agent.name if chat_session.requested_agent else None,
+            'transfer_status': chat_session.transfer_status,
+            'linked_customer_id': chat_session.linked_customer_id,
+            # Labels for the linked badges
+            'linked_customer_name': chat_session.linked_customer.name if chat_session.linked_customer else None,
+            'linked_customer_email': chat_session.linked_customer.email if chat_session.linked_customer else None,
+            'linked_inquiry_customer': chat_session.linked_inquiry.customer if chat_session.linked_inquiry else None,
+            'linked_inquiry_status': chat_session.linked_inquiry.status if chat_session.linked_inquiry else None,
+            'current_user_id': flask_session.get('user_id')
+        },
+        'messages': messages
+    })
+
+@bp.route('/api/chat/session/<int:session_id>/send', methods=['POST'])
+def api_chat_send(session_id):
+    chat_session = ChatSession.query.get_or_404(session_id)
+    data = request.get_json()
+    from datetime import datetime
+    from flask import session as flask_session
+    
+    if chat_session.assigned_agent_id and chat_session.assigned_agent_id != flask_session.get('user_id'):
+        return jsonify({'ok': False, 'error': 'Only the assigned agent can chat here.'}), 403
+    
+    def send():
+        new_msg = ChatMessage(
+            session_id=session_id,
+            sender_type='agent',
+            sender_name=flask_session.get('user_name', 'Admin'),
+            text=data.get('text', ''),
+            timestamp=datetime.now().strftime('%I:%M %p')
+        )
+        if not chat_session.assigned_agent_id:
+            chat_session.assigned_agent_id = flask_session.get('user_id')
+            chat_session.status = 'agent_active'
+        db.session.add(new_msg)
+        chat_session.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+        return new_msg
+    new_msg = run_write(send)
+    
+    agent = User.query.get(flask_session.get('user_id'))
+    agent_pic = agent.profile_picture if agent else None
+
+    return jsonify({'ok': True, 'message': {
+        'id': new_msg.id,
+        'sender_type': new_msg.sender_type,
+        'sender_name': new_msg.sender_name,
+        'text': new_msg.text,
+        'timestamp': new_msg.timestamp,
+        'pic': agent_pic
+    }})
+
+@bp.route('/api/chat/session/<int:session_id>/takeover', methods=['POST'])
+def api_chat_takeover(session_id):
+    chat_session = ChatSession.query.get_or_404(session_id)
+    from datetime import datetime
+    from flask import session as flask_session
+    
+    if chat_session.assigned_agent_id:
+        return jsonify({'ok': False, 'error': f'Chat already assigned to {chat_session.assigned_agent.username}.'}), 400
+    
+    chat_session.assigned_agent_id = flask_session.get('user_id')
+    chat_session.status = 'agent_active'
+    chat_session.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    
+    # Add system message
+    system_msg = ChatMessage(
+        session_id=session_id,
+        sender_type='system',
+        sender_name='System',
+        text=f'🟢 {flask_session.get("user_name", "An agent")} has taken over this conversation.',
+        timestamp=datetime.now().strftime('%I:%M %p')
+    )
+    db.session.add(system_msg)
+    db.session.commit()
+    
+    return jsonify({'ok': True, 'message': {
+        'id': system_msg.id,
+        'sender_type': system_msg.sender_type,
+        'sender_name': system_msg.sender_name,
+        'text': system_msg.text,
+        'timestamp': system_msg.timestamp
+    }})
+
+@bp.route('/api/chat/session/<int:session_id>/request-transfer', methods=['POST'])
+def api_chat_request_transfer(session_id):
+    chat_session = ChatSession.query.get_or_404(session_id)
+    from flask import session as flask_session
+    if not chat_session.assigned_agent_id:
+        return jsonify({'ok': False, 'error': 'Chat is not assigned to anyone.'}), 400
+    
+    chat_session.requested_agent_id = flask_session.get('user_id')
+    chat_session.transfer_status = 'pending'
+    db.session.commit()
+    
+    create_notification(
+        'chat',
+        'Chat Transfer Requested',
+        f'Agent {flask_session.get("user_name")} wants to take over chat with {chat_session.visitor_name}.',
+        target_user_id=chat_session.assigned_agent_id,
+        icon='🔄'
+    )
+    
+    return jsonify({'ok': True})
+
+@bp.route('/api/chat/session/<int:session_id>/handle-transfer', methods=['POST'])
+def api_chat_handle_transfer(session_id):
+    chat_session = ChatSession.query.get_or_404(session_id)
+    from flask import session as flask_session
+    data = request.get_json()
+    action = data.get('action') # 'accept' or 'reject'
+    
+    if chat_session.assigned_agent_id != flask_session.get('user_id'):
+        return jsonify({'ok': False, 'error': 'Only the owner can handle transfers.'}), 403
+        
+    if action == 'accept':
+        from datetime import datetime
+        old_agent_name = flask_session.get('user_name')
+        new_agent_id = chat_session.requested_agent_id
+        new_agent = User.query.get(new_agent_id)
+        
+        chat_session.assigned_agent_id = new_agent_id
+        chat_session.requested_agent_id = None
+        chat_session.transfer_status = 'none'
+        
+        # Add system message
+        sys_msg = ChatMessage(
+            session_id=session_id,
+            sender_type='system',
+            sender_name='System',
+            text=f'🔄 Agent {old_agent_name} transferred this chat over to Agent {new_agent.name if new_agent else "another agent"}.',
+            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        )
+        db.session.add(sys_msg)
+        db.session.commit()
+    else:
+        chat_session.requested_agent_id = None
+        chat_session.transfer_status = 'none'
+        db.session.commit()
+        
+    return jsonify({'ok': True})
+
+@bp.route('/api/chat/session/<int:session_id>/admin-transfer', methods=['POST'])
+def api_chat_admin_transfer(session_id):
+    from flask import session as flask_session
+    from datetime import datetime
+    
+    # Check if user is admin/super admin/ultra admin for force actions
+    user_role = flask_session.get('user_role', 'agent')
+    if user_role not in ['super_admin', 'ultra_admin']:
+        return jsonify({'ok': False, 'error': 'Only admins can forcefully transfer chats.'}), 403
+        
+    chat_session = ChatSession.query.get_or_404(session_id)
+    data = request.get_json()
+    new_agent_id = data.get('target_user_id')
+    
+    if not new_agent_id:
+        return jsonify({'ok': False, 'error': 'No target agent provided.'}), 400
+        
+    new_agent = User.query.get(new_agent_id)
+    if not new_agent:
+        return jsonify({'ok': False, 'error': 'Target agent not found.'}), 404
+        
+    old_agent_name = "None"
+    if chat_session.assigned_agent_id:
+        old_agent = User.query.get(chat_session.assigned_agent_id)
+        if old_agent:
+            old_agent_name = old_agent.name
+            
+    chat_session.assigned_agent_id = new_agent_id
+    chat_session.requested_agent_id = None
+    chat_session.transfer_status = 'none'
+    chat_session.status = 'agent_active' # Ensure it's in agent mode
+    chat_session.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    
+    # Add system message
+    role_name = user_role.replace('_', ' ').title()
+    sys_msg = ChatMessage(
+        session_id=session_id,
+        sender_type='system',
+        sender_name='System',
+        text=f'🛡️ {role_name} {flask_session.get("user_name")} forcefully transferred this chat from {old_agent_name} to {new_agent.name}.',
+        timestamp=datetime.now().strftime('%I:%M %p')
+    )
+    db.session.add(sys_msg)
+    db.session.commit()
+    
+    return jsonify({'ok': True})
+
+@bp.route('/api/chat/session/<int:session_id>/force-takeover', methods=['POST'])
+def api_chat_force_takeover(session_id):
+    from flask import session as flask_session
+    from datetime import datetime
+    
+    # Check if user is super admin or ultra admin
+    user_role = flask_session.get('user_role', 'agent')
+    if user_role not in ['super_admin', 'ultra_admin']:
+        return jsonify({'ok': False, 'error': 'Only admins can force take over chats.'}), 403
+    
+    chat_session = ChatSession.query.get_or_404(session_id)
+    old_agent_name = None
+    
+    if chat_session.assigned_agent_id:
+        old_agent = User.query.get(chat_session.assigned_agent_id)
+        old_agent_name = old_agent.name if old_agent else 'previous agent'
+    
+    # Force transfer
+    chat_session.assigned_agent_id = flask_session.get('user_id')
+    chat_session.status = 'agent_active'
+    chat_session.requested_agent_id = None
+    chat_session.transfer_status = 'none'
+    chat_session.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    
+    # Add system message
+    role_name = user_role.replace('_', ' ').title()
+    if old_agent_name:
+        message_text = f'⚡ {role_name} {flask_session.get("user_name", "Admin")} has forcefully taken over this conversation from {old_agent_name}.'
+    else:
+        message_text = f'⚡ {role_name} {flask_session.get("user_name", "Admin")} has taken over this conversation.'
+    
+    system_msg = ChatMessage(
+        session_id=session_id,
+        sender_type='system',
+        sender_name='System',
+        text=message_text,
+        timestamp=datetime.now().strftime('%I:%M %p')
+    )
+    db.session.add(system_msg)
+    db.session.commit()
+    
+    return jsonify({'ok': True})
+
+@bp.route('/api/chat/session/<int:session_id>/link-customer', methods=['POST'])
+def api_chat_link_customer(session_id):
+    session = ChatSession.query.get_or_404(session_id)
+    data = request.get_json()
+    customer_id = data.get('customer_id')
+
+    if customer_id:
+        customer = Customer.query.get_or_404(customer_id)
+        session.linked_customer_id = customer.id
+    elif data.get('email') or data.get('phone'):
+        # Link by contact details, resolved through the identity index
+        customer_id = find_customer_id(data.get('email'), data.get('phone'))
+        if not customer_id:
+            return jsonify({'ok': False, 'error': 'No customer with that email or phone.'}), 404
+        session.linked_customer_id = customer_id
+    else:
+        session.linked_customer_id = None
+
+    db.session.commit()
+    return jsonify({'ok': True, 'customer_id': session.linked_customer_id})
+
+@bp.route('/api/chat/session/<int:session_id>/link-inquiry', methods=['POST'])
+def api_chat_link_inquiry(session_id):
+    session = ChatSession.query.get_or_404(session_id)
+    data = request.get_json()
+    inquiry_id = data.get('inquiry_id')
+    
+    if inquiry_id:
+        inquiry = Inquiry.query.get_or_404(inquiry_id)
+        session.linked_inquiry_id = inquiry.id
+    else:
+        session.linked_inquiry_id = None
+    
+    db.session.commit()
+    return jsonify({'ok': True})
+
+@bp.route('/api/inquiry/<int:inquiry_id>/unlink-chats', methods=['POST'])
+def api_inquiry_unlink_chats(inquiry_id):
+    inquiry = Inquiry.query.get_or_404(inquiry_id)
+    # Find all sessions linked to this inquiry
+    sessions = ChatSession.query.filter_by(linked_inquiry_id=inquiry.id).all()
+    for s in sessions:
+        s.linked_inquiry_id = None
+    db.session.commit()
+    return jsonify({'ok': True})
+
+@bp.route('/api/chat/message/<int:message_id>/edit', methods=['POST'])
+def api_chat_edit_message(message_id):
+    msg = ChatMessage.query.get_or_404(message_id)
+    # Allow editing agent and bot messages
+    if msg.sender_type not in ('agent', 'bot'):
+        return jsonify({'ok': False, 'error': 'Cannot edit customer/system messages.'}), 400
+    
+    data = request.get_json()
+    new_text = data.get('text')
+    if not new_text or not new_text.strip():
+        return jsonify({'ok': False, 'error': 'Text cannot be empty.'}), 400
+
+    msg.text = new_text.strip()
+    db.session.commit()
+    return jsonify({'ok': True, 'text': msg.text})
+
+@bp.route('/api/chat/message/<int:message_id>/delete', methods=['POST'])
+def api_chat_delete_message(message_id):
+    msg = ChatMessage.query.get_or_404(message_id)
+    # Only allow deleting agent, customer, and bot messages
+    if msg.sender_type not in ('agent', 'customer', 'bot'):
+        return jsonify({'ok': False, 'error': 'Cannot delete system messages.'}), 400
+    db.session.delete(msg)
+    db.session.commit()
+    return jsonify({'ok': True})
+
+@bp.route('/api/chat/session/<int:session_id>/delete', methods=['POST'])
+def api_chat_delete_session(session_id):
+    session = ChatSession.query.get_or_404(session_id)
+    ChatSessionSummary.query.filter_by(session_id=session_id).delete()
+    db.session.delete(session)
+    db.session.commit()
+    return jsonify({'ok': True})
+
+@bp.route('/api/chat/session/<int:session_id>/archive', methods=['POST'])
+def api_chat_archive(session_id):
+    session = ChatSession.query.get_or_404(session_id)
+    data = request.get_json()
+    session.archived = data.get('archived', True)
+    db.session.commit()
+    if session.archived:
+        # The chat is closed: summarize it now rather than at the next `flask maintain` pass
+        write_session_summaries([session_id])
+    return jsonify({'ok': True, 'archived': session.archived})
+
+@bp.route('/api/chat/session/<int:session_id>/tags', methods=['POST'])
+def api_chat_update_tags(session_id):
+    session = ChatSession.query.get_or_404(session_id)
+    data = request.get_json()
+    session.tags = data.get('tags', '')
+    db.session.commit()
+    return jsonify({'ok': True, 'tags': session.tags})
+
+@bp.route('/api/chat/session/<int:session_id>/pin', methods=['POST'])
+def api_chat_pin(session_id):
+    session = ChatSession.query.get_or_404(session_id)
+    data = request.get_json()
+    session.pinned = data.get('pinned', not session.pinned)
+    db.session.commit()
+    return jsonify({'ok': True, 'pinned': session.pinned})
@@ -0,0 +1,691 @@
+"""
+Customer directory, profiles and editing, streaming exports and the bulk
+customer import (with their `flask export` / `flask import-customers`
+commands).
+"""
+import io
+from datetime import datetime
+
+import click
+from flask import (Blueprint, Response, current_app, jsonify, redirect, render_template, request, session,
+                   stream_with_context, url_for)
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import (ChatMessage, ChatSession, Customer, Inquiry, LeadScore, MetricDaily, Tag, User, CUSTOMER_SORTS,
+                    create_notification, customer_summary, customer_summary_dict, customers_with_tags, find_customer_id,
+                    metric_day, parse_tags, refresh_customer_summaries, resolve_contacts, sync_contact_identities,
+                    sync_customer_tags, upsert_add)
+from services import customer_import, engine_profile, export, metrics
+from services.pagination import estimate_count, keyset_page
+
+bp = Blueprint('customers', __name__, cli_group=None)
+
+def get_tags_inventory():
+    tag_colors = {
+        'VIP': '#f59e0b',
+        'New': '#10b981',
+        'Returning': '#3b82f6',
+        'Hot Lead': '#ef4444',
+        'Cold Lead': '#6b7280',
+        'Premium': '#8b5cf6',
+        'Enterprise': '#ec4899'
+    }
+
+    # Start with defaults so inventory is never empty
+    tags_inventory = dict(tag_colors)
+
+    for (tag,) in db.session.query(Tag.name).filter(Tag.customer_count > 0).order_by(Tag.name):
+        # Preserve default color if present, otherwise add with gray
+        tags_inventory.setdefault(tag, tag_colors.get(tag, '#94a3b8'))
+
+    return tags_inventory
+
+@bp.route('/customers')
+def customers():
+    # Tag color mapping
+    tag_colors = {
+        'VIP': '#f59e0b',
+        'New': '#10b981',
+        'Returning': '#3b82f6',
+        'Hot Lead': '#ef4444',
+        'Cold Lead': '#6b7280',
+        'Premium': '#8b5cf6',
+        'Enterprise': '#ec4899'
+    }
+    
+    # Get filter parameters; the cards and directory table page through /api/customers
+    selected_tags = request.args.getlist('tags')
+    last_contact_filter = request.args.get('last_contact', '')
+    
+    return render_template(
+        'customer-list.html',
+        tags_inventory=get_tags_inventory(),
+        tag_colors=tag_colors,
+        selected_tags=selected_tags,
+        last_contact_filter=last_contact_filter
+    )
+
+def customer_to_dict(c):
+    return {
+        'id': c.id,
+        'name': c.name,
+        'email': c.email,
+        'phone': c.phone,
+        'location': c.location,
+        'status': c.status,
+        'tags': parse_tags(c.tags),
+        'last_contact': c.last_contact,
+        'updated_at': c.updated_at,
+        'updated_by': c.updated_by
+    }
+
+@bp.route('/api/customers')
+def api_customer_directory():
+    """
+    Keyset-paginated customer directory.
+
+    Query params: sort (id, name, last_contact, created), order (asc, desc),
+    limit (max 200), cursor (next_cursor of the previous page), search (name,
+    email or phone), id, tags (repeatable, any of), status, location,
+    last_contact (exact date), last_contact_from / last_contact_to (inclusive range).
+    """
+    sort = request.args.get('sort', 'id')
+    if sort not in CUSTOMER_SORTS:
+        return jsonify({'error': f"sort must be one of {', '.join(CUSTOMER_SORTS)}"}), 400
+    descending = request.args.get('order', 'asc').lower() == 'desc'
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+
+    query = Customer.query
+    if request.args.get('id'):
+        query = query.filter(Customer.id == request.args.get('id', type=int))
+    search = request.args.get('search', '').strip()
+    if search:
+        query = query.filter(or_(Customer.name.ilike(f'%{search}%'),
+                                 Customer.email.ilike(f'%{search}%'),
+                                 Customer.phone.ilike(f'%{search}%')))
+    tags = request.args.getlist('tags')
+    if tags:
+        query = query.filter(Customer.id.in_(customers_with_tags(tags)))
+    if request.args.get('status'):
+        query = query.filter(Customer.status == request.args['status'])
+    if request.args.get('location'):
+        query = query.filter(Customer.location == request.args['location'])
+    if request.args.get('last_contact'):
+        query = query.filter(Customer.last_contact == request.args['last_contact'])
+    if request.args.get('last_contact_from'):
+        query = query.filter(Customer.last_contact >= request.args['last_contact_from'])
+    if request.args.get('last_contact_to'):
+        # Inclusive of the whole day when last_contact carries a time
+        query = query.filter(Customer.last_contact <= request.args['last_contact_to'] + ' 23:59:59')
+
+    cursor = request.args.get('cursor')
+    try:
+        items, next_cursor = keyset_page(query, sort, CUSTOMER_SORTS[sort], Customer.id,
+                                         cursor=cursor, descending=descending, limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    result = {'customers': [customer_to_dict(c) for c in items], 'next_cursor': next_cursor}
+    # The total only changes with the filters, so only the first page pays for it
+    if not cursor:
+        cap = current_app.config['COUNT_ESTIMATE_CAP']
+        result['total'], result['total_exact'] = estimate_count(query, Customer.id, cap)
+    return jsonify(result)
+
+@bp.route('/customer/<int:id>')
+def customer_profile(id):
+    # Fetch customer from database.db
+    customer = Customer.query.get_or_404(id)
+    
+    # Tag color mapping (same as in customers route)
+    tag_colors = {
+        'VIP': '#f59e0b',
+        'New': '#10b981',
+        'Returning': '#3b82f6',
+        'Hot Lead': '#ef4444',
+        'Cold Lead': '#6b7280',
+        'Premium': '#8b5cf6',
+        'Enterprise': '#ec4899'
+    }
+    
+    # Only what the rep picker shows
+    users = db.session.query(User.username, User.name).order_by(User.id).all()
+
+    summary, active_agent_name = customer_summary(customer.id)
+
+    return render_template('customer_details.html', c=customer, tags_inventory=get_tags_inventory(), tag_colors=tag_colors, users=users,
+                           summary=summary, total_lead_score=summary.lead_score if summary else 0,
+                           assigned_name=active_agent_name or "no agent has been assigned")
+
+@bp.route('/api/customer/<int:id>')
+def api_get_customer(id):
+    customer = Customer.query.get_or_404(id)
+    summary, active_agent_name = customer_summary(customer.id)
+
+    return jsonify({
+        'id': customer.id,
+        'name': customer.name,
+        'email': customer.email,
+        'phone': customer.phone,
+        'location': customer.location,
+        'notes': customer.notes,
+        'tags': customer.tags,
+        'assigned_staff': active_agent_name or "no agent has been assigned",
+        'created_at': customer.created_at,
+        'updated_at': customer.updated_at,
+        **customer_summary_dict(summary)
+    })
+
+from flask import flash
+
+@bp.route('/customer/<int:id>/edit', methods=['GET','POST'])
+def edit_customer(id):
+
+    c = Customer.query.get_or_404(id)
+
+    tag_colors = {
+        'VIP': '#f59e0b',
+        'New': '#10b981',
+        'Returning': '#3b82f6',
+        'Hot Lead': '#ef4444',
+        'Cold Lead': '#6b7280',
+        'Premium': '#8b5cf6',
+        'Enterprise': '#ec4899'
+    }
+
+    if request.method == 'POST':
+        c.name = request.form.get("name")
+        c.email = request.form.get("email")
+        c.phone = request.form.get("phone")
+        c.location = request.form.get("location")
+        c.notes = request.form.get("notes")
+
+        tags = request.form.getlist("tags")
+        new_tag = request.form.get("new_tag")
+
+        if new_tag:
+            tags.append(new_tag)
+
+        c.tags = ",".join(tags)
+
+        db.session.commit()
+        flash("Customer updated successfully!", "success")
+
+        return redirect(url_for('customers.customer_profile', id=c.id))
+
+    return render_template(
+        'edit_customer.html',
+        c=c,
+        tags_inventory=get_tags_inventory(),
+        tag_colors=tag_colors
+    )
+
+@bp.route('/customer/<int:id>/delete', methods=['POST'])
+def delete_customer(id):
+    customer = Customer.query.get_or_404(id)
+    db.session.delete(customer)
+    db.session.commit()
+    flash("Customer deleted successfully!", "danger")
+    return redirect(url_for('customers.customers'))
+
+@bp.route('/export_customers')
+def export_customers():
+    """Export all customers as CSV (streamed; see export_data for other formats)"""
+    return export_data('customers')
+
+# --- STREAMING EXPORTS ---
+# Rows come from a server-side cursor in EXPORT_BATCH_SIZE batches and are
+# encoded into ~64KB chunks as the client reads them, so memory stays flat
+# however many rows are exported.
+
+EXPORT_FIELDS = {
+    'customers': [
+        ('ID', 'id', Customer.id),
+        ('Name', 'name', Customer.name),
+        ('Email', 'email', Customer.email),
+        ('Phone', 'phone', Customer.phone),
+        ('Location', 'location', Customer.location),
+        ('Tags', 'tags', Customer.tags),
+        ('Status', 'status', Customer.status),
+        ('Last Contact', 'last_contact', Customer.last_contact),
+    ],
+    'inquiries': [
+        ('ID', 'id', Inquiry.id),
+        ('Customer', 'customer', Inquiry.customer),
+        ('Customer ID', 'customer_id', Inquiry.customer_id),
+        ('Assigned Rep', 'assigned_rep', Inquiry.assigned_rep),
+        ('Type', 'inquiry_type', Inquiry.inquiry_type),
+        ('Status', 'status', Inquiry.status),
+        ('Description', 'description', Inquiry.description),
+        ('Notes', 'notes', Inquiry.notes),
+        ('Created At', 'created_at', Inquiry.created_at),
+        ('Updated At', 'updated_at', Inquiry.updated_at),
+    ],
+}
+
+# Chats export one CSV row per message (session columns repeated), or one NDJSON record per session
+CHAT_SESSION_FIELDS = [
+    ('Session ID', 'id', ChatSession.id),
+    ('Visitor Name', 'visitor_name', ChatSession.visitor_name),
+    ('Visitor Email', 'visitor_email', ChatSession.visitor_email),
+    ('Status', 'status', ChatSession.status),
+    ('Customer ID', 'customer_id', ChatSession.linked_customer_id),
+    ('Inquiry ID', 'inquiry_id', ChatSession.linked_inquiry_id),
+    ('Created At', 'created_at', ChatSession.created_at),
+    ('Updated At', 'updated_at', ChatSession.updated_at),
+]
+CHAT_MESSAGE_FIELDS = [
+    ('Message ID', 'id', ChatMessage.id),
+    ('Sender Type', 'sender_type', ChatMessage.sender_type),
+    ('Sender Name', 'sender_name', ChatMessage.sender_name),
+    ('Text', 'text', ChatMessage.text),
+    ('Timestamp', 'timestamp', ChatMessage.timestamp),
+]
+
+EXPORT_KINDS = ('customers', 'inquiries', 'chats')
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+def stream_query(statement):
+    """Yield rows using a server-side cursor where the driver has one, EXPORT_BATCH_SIZE at a time."""
+    # Between fetches the transaction idles while the client downloads, so lift the web timeouts
+    engine_profile.set_local_timeouts(db.session.connection(), current_app.config['EXPORT_STATEMENT_TIMEOUT_MS'])
+    result = db.session.execute(statement.execution_options(
+        stream_results=True, yield_per=current_app.config['EXPORT_BATCH_SIZE']))
+    try:
+        for row in result:
+            yield tuple(row)
+    finally:
+        result.close()
+
+def export_chunks(kind, fmt):
+    """Encoded byte chunks for one export."""
+    if kind == 'chats':
+        session_keys = [key for _, key, _ in CHAT_SESSION_FIELDS]
+        message_keys = [key for _, key, _ in CHAT_MESSAGE_FIELDS]
+        statement = (db.select(*[c for _, _, c in CHAT_SESSION_FIELDS], *[c for _, _, c in CHAT_MESSAGE_FIELDS])
+                     .outerjoin(ChatMessage, ChatMessage.session_id == ChatSession.id)
+                     .order_by(ChatSession.id, ChatMessage.id))
+        rows = stream_query(statement)
+        if fmt == 'csv':
+            header = [h for h, _, _ in CHAT_SESSION_FIELDS] + [h for h, _, _ in CHAT_MESSAGE_FIELDS]
+            return export.csv_chunks(header, rows)
+        records = (
+            dict(zip(session_keys, key),
+                 messages=[dict(zip(message_keys, m)) for m in messages if m[0] is not None])
+            for key, messages in export.group_rows(rows, len(session_keys))
+        )
+        return export.ndjson_chunks(records)
+
+    fields = EXPORT_FIELDS[kind]
+    columns = [c for _, _, c in fields]
+    rows = stream_query(db.select(*columns).order_by(columns[0]))
+    if fmt == 'csv':
+        return export.csv_chunks([h for h, _, _ in fields], rows)
+    keys = [key for _, key, _ in fields]
+    return export.ndjson_chunks(dict(zip(keys, row)) for row in rows)
+
+@bp.route('/export/<kind>')
+def export_data(kind):
+    """Stream customers, inquiries or chats as ?format=csv|ndjson, optionally &gzip=1."""
+    fmt = request.args.get('format', 'csv').lower()
+    if kind not in EXPORT_KINDS:
+        return jsonify({'error': f"Unknown export '{kind}'"}), 404
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    chunks = export_chunks(kind, fmt)
+    filename = f"{kind}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    if compress:
+        chunks = export.gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    output = Response(stream_with_context(chunks), mimetype=mimetype)
+    output.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return output
+
+@bp.cli.command('export')
+@click.argument('kind', type=click.Choice(EXPORT_KINDS))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='csv')
+@click.option('--gzip', 'compress', is_flag=True, help='Compress the output.')
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='File to write (default stdout).')
+def export_command(kind, fmt, compress, output):
+    """Export customers, inquiries or chats (sessions with messages)."""
+    chunks = export_chunks(kind, fmt)
+    if compress:
+        chunks = export.gzip_chunks(chunks)
+    for chunk in chunks:
+        output.write(chunk)
+
+@bp.route('/api/customer/create', methods=['POST'])
+def api_create_customer():
+    data = request.get_json()
+    
+    # Check if email already exists (safety check from your friend's logic), ignoring case and spacing
+    if find_customer_id(email=data.get('email')):
+        return jsonify({"error": "A customer with this email already exists"}), 400
+
+    new_cust = Customer(
+        name=data.get('name'),
+        email=data.get('email'),
+        phone=data.get('phone'),
+        location=data.get('location'),
+        status="Active",  # Default for new customers
+        tags=data.get('tags', 'New'),
+        created_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+        created_by=session.get('user_name', 'Admin'),
+        updated_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+        updated_by=session.get('user_name', 'Admin')
+    )
+    
+    db.session.add(new_cust)
+    db.session.commit()
+    
+    # Create a corresponding ChatSession so the new customer appears in Chat History
+    try:
+        now = datetime.now().strftime('%Y-%m-%d %H:%M')
+        chat = ChatSession(
+            visitor_name=new_cust.name,
+            visitor_email=new_cust.email,
+            status='bot',
+            linked_customer_id=new_cust.id,
+            created_at=now,
+            updated_at=now
+        )
+        db.session.add(chat)
+        db.session.flush()  # ensure chat.id available
+
+        # Add an initial system message to the chat history
+        sys_msg = ChatMessage(
+            session_id=chat.id,
+            sender_type='system',
+            sender_name='System',
+            text=f'Customer record created for {new_cust.name} in CRM.',
+            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        )
+        db.session.add(sys_msg)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # don't block customer creation on chat seeding failure
+
+    flash("Customer created successfully!", "success")
+
+    create_notification(
+        'customer',
+        'New Customer Added',
+        f'Customer "{new_cust.name}" was added by {session.get("user_name", "Admin")}.',
+        icon='👤'
+    )
+    
+    return jsonify({"ok": True, "id": new_cust.id, "name": new_cust.name})
+
+# --- BULK CUSTOMER IMPORT ---
+# A CSV is streamed through validation and written IMPORT_BATCH_SIZE rows per
+# transaction with Core statements, instead of one ORM round trip (plus a chat,
+# a system message and a notification per user) per customer. Rows are matched
+# to existing customers through the contact identity index. Core statements
+# skip the flush hooks, so each batch updates the tag and identity indexes, the
+# customer summaries and the new-customer metric itself.
+
+IMPORT_ON_EXISTING = ('update', 'skip')
+IMPORT_FIELDS = ('name', 'email', 'phone', 'location', 'assigned_staff', 'status', 'tags', 'notes', 'last_contact')
+
+def import_customer_batch(records, report, matched_ids, on_existing='update', seed_chats=False, user_name='System',
+                          dry_run=False):
+    """
+    Match one batch of validated ImportRecords against the contact identity
+    index and create or update them in the current transaction. matched_ids
+    carries the existing customers already claimed by earlier rows.
+    """
+    connection = db.session.connection()
+    table = Customer.__table__
+    known = resolve_contacts({key for record in records for key in record.keys()}, connection)
+    # Customer.email is unique whether or not the identity index knows the address
+    email_owners = dict(connection.execute(
+        db.select(table.c.email, table.c.id)
+        .where(table.c.email.in_({record.email_key for record in records if record.email_key}))).all())
+    new, existing = [], []
+    for record in records:
+        record.customer_id = next((known[key] for key in record.keys() if key in known), None)
+        if record.customer_id is None and record.email_key in email_owners:
+            report.reject(record.line, 'email belongs to an existing customer')
+        elif record.customer_id is None:
+            new.append(record)
+        elif record.customer_id in matched_ids:
+            # Two rows naming the same customer by different keys
+            report.duplicates += 1
+            report.error(record.line, 'duplicate of an earlier row')
+        else:
+            matched_ids.add(record.customer_id)
+            existing.append(record)
+    if on_existing == 'skip':
+        report.skipped_existing += len(existing)
+        existing = []
+    if dry_run:
+        report.created += len(new)
+        report.updated += len(existing)
+        return
+
+    now = datetime.now().strftime('%Y-%m-%d %H:%M')
+    tags_by_customer = {}
+    contacts_by_customer = {}
+
+    if existing:
+        current = {row.id: row for row in connection.execute(
+            db.select(table.c.id, table.c.name, table.c.email, table.c.tags)
+            .where(table.c.id.in_([r.customer_id for r in existing])))}
+        params = []
+        for record in existing:
+            fields = dict(record.fields)
+            stored = current[record.customer_id]
+            # Never move an email onto this customer if another customer already has it
+            if record.email_key and (known.get(('email', record.email_key), record.customer_id) != record.customer_id
+                                     or email_owners.get(record.email_key, record.customer_id) != record.customer_id):
+                fields.pop('email', None)
+            # Matched on the phone alone: the row may be someone else sharing the number,
+            # so it only fills in a missing name or email
+            if known.get(('email', record.email_key)) != record.customer_id:
+                for field in ('name', 'email'):
+                    if getattr(stored, field):
+                        fields.pop(field, None)
+            if 'tags' in fields:
+                merged = parse_tags(stored.tags)
+                merged += [name for name in parse_tags(fields['tags']) if name not in merged]
+                fields['tags'] = ','.join(merged)
+                tags_by_customer[record.customer_id] = merged
+            params.append(dict({f'b_{f}': fields.get(f) for f in IMPORT_FIELDS}, b_id=record.customer_id))
+        # Blank cells keep the stored value
+        connection.execute(
+            table.update().where(table.c.id == db.bindparam('b_id')).values(
+                dict({f: db.func.coalesce(db.bindparam(f'b_{f}'), table.c[f]) for f in IMPORT_FIELDS},
+                     updated_at=now, updated_by=user_name)),
+            params)
+        report.updated += len(existing)
+        contacts_by_customer.update(
+            (customer_id, (email, phone)) for customer_id, email, phone in connection.execute(
+                db.select(table.c.id, table.c.email, table.c.phone)
+                .where(table.c.id.in_([r.customer_id for r in existing]))))
+
+    if new:
+        rows = []
+        for record in new:
+            row = {f: record.fields.get(f) for f in IMPORT_FIELDS}
+            row['status'] = row['status'] or 'Active'
+            row['tags'] = row['tags'] or 'New'
+            row.update(created_at=now, created_by=user_name, updated_at=now, updated_by=user_name)
+            rows.append(row)
+        ids = connection.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows).scalars().all()
+        buckets = metrics.MetricBuckets()
+        for record, row, customer_id in zip(new, rows, ids):
+            record.customer_id = customer_id
+            tags_by_customer[customer_id] = parse_tags(row['tags'])
+            contacts_by_customer[customer_id] = (row['email'], row['phone'])
+            buckets.add(metrics.NEW_CUSTOMERS, metric_day(now))
+        upsert_add(MetricDaily.__table__, ['metric', 'day'], buckets.rows(), connection=connection)
+        report.created += len(new)
+        if seed_chats:
+            seed_import_chats(connection, new, rows, now)
+
+    sync_customer_tags(connection, tags_by_customer)
+    sync_contact_identities(connection, contacts_by_customer)
+    refresh_customer_summaries(connection, contacts_by_customer)
+
+def seed_import_chats(connection, records, rows, now):
+    """The ChatSession + system message api_create_customer makes, for a batch of imported customers."""
+    sessions = ChatSession.__table__
+    session_ids = connection.execute(
+        sessions.insert().returning(sessions.c.id, sort_by_parameter_order=True),
+        [{'visitor_name': row['name'], 'visitor_email': row['email'], 'status': 'bot',
+          'linked_customer_id': record.customer_id, 'created_at': now, 'updated_at': now}
+         for record, row in zip(records, rows)]
+    ).scalars().all()
+    stamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    connection.execute(ChatMessage.__table__.insert(), [
+        {'session_id': session_id, 'sender_type': 'system', 'sender_name': 'System',
+         'text': f"Customer record created for {row['name']} in CRM.", 'timestamp': stamp}
+        for session_id, row in zip(session_ids, rows)
+    ])
+    # No visitor text yet, so the stored lead score is already final
+    connection.execute(LeadScore.__table__.insert(),
+                       [{'session_id': session_id, 'score': 0, 'pending': 0} for session_id in session_ids])
+
+def import_customers(stream, batch_size=None, on_existing='update', seed_chats=False, notify=True,
+                     dry_run=False, user_name='System'):
+    """
+    Import customers from a CSV text stream, deduplicating on normalised email
+    and phone against the file and the database. Each batch commits on its
+    own; returns the ImportReport.
+    """
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    report = customer_import.ImportReport()
+    seen = set()
+    matched_ids = set()
+    batch = []
+
+    def write(records):
+        # Totals and claimed customers only count once the batch has committed
+        batch_report, claimed = customer_import.ImportReport(), set(matched_ids)
+        try:
+            import_customer_batch(records, batch_report, claimed, on_existing, seed_chats, user_name, dry_run)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        report.add(batch_report)
+        matched_ids.update(claimed)
+
+    def flush_batch():
+        try:
+            write(batch)
+        except IntegrityError:
+            # A row the checks above missed: write the batch a row at a time and reject the ones that conflict
+            for record in batch:
+                try:
+                    write([record])
+                except IntegrityError:
+                    report.reject(record.line, 'conflicts with an existing customer')
+        batch.clear()
+
+    for record in customer_import.read_customers(stream, current_app.config['DEFAULT_COUNTRY_CODE']):
+        report.rows += 1
+        if record.error:
+            report.reject(record.line, record.error)
+            continue
+        keys = record.keys()
+        if any(key in seen for key in keys):
+            report.duplicates += 1
+            report.error(record.line, 'duplicate of an earlier row')
+            continue
+        seen.update(keys)
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush_batch()
+    if batch:
+        flush_batch()
+
+    if notify and not dry_run and (report.created or report.updated):
+        # One notification for the whole import rather than one per customer
+        create_notification(
+            'customer',
+            'Customers Imported',
+            f'{user_name} imported {report.created} new and updated {report.updated} existing customers.',
+            icon='👥',
+            created_by=user_name
+        )
+    return report
+
+@bp.route('/api/customers/import', methods=['POST'])
+def api_import_customers():
+    """
+    Bulk import from a CSV upload (multipart field 'file') or a text/csv body.
+    Options (query or form): on_existing=update|skip, seed_chats=1, notify=0, dry_run=1.
+    """
+    def flag(name, default):
+        value = request.values.get(name)
+        return default if value is None else value.lower() in ('1', 'true', 'yes', 'on')
+
+    on_existing = request.values.get('on_existing', 'update')
+    if on_existing not in IMPORT_ON_EXISTING:
+        return jsonify({'error': f"on_existing must be one of {', '.join(IMPORT_ON_EXISTING)}"}), 400
+    upload = request.files.get('file')
+    raw = upload.stream if upload else request.stream
+    stream = io.TextIOWrapper(raw if upload else io.BufferedReader(raw), encoding='utf-8-sig', newline='')
+
+    try:
+        report = import_customers(
+            stream,
+            on_existing=on_existing,
+            seed_chats=flag('seed_chats', False),
+            notify=flag('notify', True),
+            dry_run=flag('dry_run', False),
+            user_name=session.get('user_name', 'Admin')
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        # Batches committed before the failure stay imported
+        return jsonify({'error': str(e)}), 400
+    return jsonify(dict(report.to_dict(), ok=True))
+
+@bp.cli.command('import-customers')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=None, type=int, help='Rows per transaction (default IMPORT_BATCH_SIZE).')
+@click.option('--on-existing', type=click.Choice(IMPORT_ON_EXISTING), default='update')
+@click.option('--seed-chats', is_flag=True, help='Open a chat session for each new customer.')
+@click.option('--no-notify', is_flag=True, help='Skip the summary notification.')
+@click.option('--dry-run', is_flag=True, help='Validate and match only; write nothing.')
+def import_customers_command(path, batch_size, on_existing, seed_chats, no_notify, dry_run):
+    """Import customers from a CSV file."""
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        try:
+            report = import_customers(stream, batch_size, on_existing, seed_chats, not no_notify, dry_run)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    result = report.to_dict()
+    click.echo(f"{result['rows']} rows: {result['created']} created, {result['updated']} updated, "
+               f"{result['skipped_existing']} existing skipped, {result['duplicates']} duplicates, "
+               f"{result['invalid']} invalid")
+    for error in result['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}", err=True)
+
+@bp.route('/api/customer/<int:id>/notes', methods=['PUT'])
+def api_update_customer_notes(id):
+    customer = Customer.query.get_or_404(id)
+    data = request.get_json()
+    
+    customer.notes = data.get('notes', '')
+    customer.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    customer.updated_by = session.get('user_name', 'Admin')
+    db.session.commit()
+    
+    create_notification(
+        'customer',
+        'Customer Notes Updated',
+        f'Notes for "{customer.name}" were updated by {session.get("user_name", "Admin")}.',
+        icon='📝'
+    )
+    
+    return jsonify({"success": True, "message": "Notes saved successfully"})
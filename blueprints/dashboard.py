@@ -0,0 +1,498 @@
+"""
+The dashboard, its stats API, announcements, settings and global search, plus
+the context every rendered page shares (sidebar counts, theme, search data,
+the from_json filter, the 404 page). Processes that render pages register it.
+"""
+from flask import Blueprint, current_app, has_request_context, jsonify, render_template, request, session
+from sqlalchemy import or_
+
+from extensions import db
+from models import (Announcement, AutoReplyTemplate, ChatSession, Customer, Inquiry, LeadScore, PromotionRequest, Rule,
+                    Team, TeamMessage, TeamRequest, User, FAQ, catch_up_lead_scores, create_notification,
+                    faq_clicks_since, metric_buckets_since, session_response_stats)
+from services import metrics
+from services.ttl_cache import CoalescingTTLCache
+
+bp = Blueprint('dashboard', __name__, cli_group=None)
+
+@bp.before_app_request
+def inject_sidebar_counts():
+    if not session.get('logged_in'):
+        return
+
+    user_id = session.get('user_id')
+    if not user_id:
+        return
+
+    # Using g to store temporary globals for templates
+    from flask import g
+    user = User.query.get(user_id)
+    if not user:
+        return
+
+    # 1. Pending Join Requests (Leader only)
+    g.team_pending_requests_count = 0
+    if user.team_id and user.team_role == 'leader':
+        g.team_pending_requests_count = TeamRequest.query.filter_by(
+            team_id=user.team_id, status='pending', type='join'
+        ).count()
+
+    # 2. Unread Team Messages
+    g.unread_team_messages = False
+    if user.team_id:
+        last_read = user.last_active_team_chat
+        
+        query = TeamMessage.query.filter_by(team_id=user.team_id)
+        if last_read:
+             query = query.filter(TeamMessage.created_at > last_read)
+        
+        # Don't count own messages
+        query = query.filter(TeamMessage.user_id != user.id)
+        
+        unread_count = query.count()
+        if unread_count > 0:
+            g.unread_team_messages = True
+
+@bp.app_context_processor
+def context_processor():
+    # Make g variables available in templates without 'g.' prefix if desired, 
+    # but normally context_processor returns a dict.
+    # Let's return them explicitly.
+    from flask import g
+    return dict(
+        team_pending_requests_count=getattr(g, 'team_pending_requests_count', 0),
+        unread_team_messages=getattr(g, 'unread_team_messages', False)
+    )
+
+@bp.app_context_processor
+def inject_user_preferences():
+    theme = 'light'
+    if has_request_context() and 'user_id' in session:
+        user_id = session.get('user_id')
+        # Avoid database call on static files if possible, but for now simple query
+        user = User.query.get(user_id)
+        if user and user.preferences:
+            try:
+                import json
+                prefs = json.loads(user.preferences)
+                theme = prefs.get('theme', 'light')
+            except:
+                pass
+    return dict(current_theme=theme)
+
+@bp.app_template_filter('from_json')
+def from_json_filter(s):
+    import json
+    try:
+        if not s: return []
+        return json.loads(s)
+    except:
+        return []
+
+@bp.app_context_processor
+def inject_pending_counts():
+    if not session.get('logged_in'): 
+        return {}
+    
+    import json
+    # Pending promotions for the UI (notifications badge)
+    pending_count = PromotionRequest.query.filter_by(status='pending').count()
+    
+    # Check if the current user has a pending promotion request (Requirement: account itself able to see pending promotion)
+    my_id = session.get('user_id')
+    if my_id:
+        try:
+            my_id = int(my_id)
+        except:
+            pass
+            
+    my_user = User.query.get(my_id) if my_id else None
+    
+    # Check if the current user has a pending promotion request
+    my_promotion = PromotionRequest.query.filter_by(target_user_id=my_id, status='pending').first() if my_id else None
+    
+    my_promotion_data = None
+    if my_promotion:
+        # Calculate how many have approved
+        approvals = json.loads(my_promotion.approvals)
+        # Total super admins needed
+        sa_count = User.query.filter_by(role='super_admin').count()
+        my_promotion_data = {
+            'role': my_promotion.target_role.replace('_', ' ').title(),
+            'approvals': len(approvals),
+            'total_needed': sa_count
+        }
+
+    # Team request counts for leaders
+    team_pending_requests_count = 0
+    if my_user and my_user.team_id and my_user.team_role in ['leader', 'vice_leader']:
+        team_pending_requests_count = TeamRequest.query.filter_by(team_id=my_user.team_id, status='pending').count()
+
+    # Chat transfer requests for the current user (Assigned TO me, requested by someone else)
+    transfer_request_count = ChatSession.query.filter_by(assigned_agent_id=my_id, transfer_status='pending').count() if my_id else 0
+
+    return dict(
+        pending_promotion_count=pending_count, 
+        my_promotion=my_promotion_data,
+        team_pending_requests_count=team_pending_requests_count,
+        transfer_request_count=transfer_request_count,
+        my_team_id=my_user.team_id if my_user else None,
+        my_team_role=my_user.team_role if my_user else None,
+        my_user=my_user
+    )
+
+def top_leads(limit, positive_only=False):
+    """The highest scoring sessions as (ChatSession, score), read through the score index."""
+    query = (db.session.query(ChatSession, LeadScore.score)
+             .join(LeadScore, LeadScore.session_id == ChatSession.id))
+    if positive_only:
+        query = query.filter(LeadScore.score > 0)
+    return query.order_by(LeadScore.score.desc(), ChatSession.id).limit(limit).all()
+
+@bp.route('/')
+@bp.route('/dashboard')
+def dashboard():
+    all_announcements = Announcement.query.order_by(Announcement.id.desc()).all()
+    
+    # Latest Chats
+    latest_chats = ChatSession.query.filter_by(archived=False).order_by(ChatSession.updated_at.desc()).limit(5).all()
+    
+    # High Value Leads, from the stored scores
+    catch_up_lead_scores()
+    high_value_leads = []
+    for s, score in top_leads(3): # User asked for High Value sections... template says Top 3
+        s.calculated_score = score # Attach for template
+        high_value_leads.append(s)
+    
+    # Actively scored leads only: the top of the list plus the total count
+    active_leads = []
+    for s, score in top_leads(current_app.config['DASHBOARD_LEADS_LIMIT'], positive_only=True):
+        s.calculated_score = score
+        active_leads.append(s)
+    lead_count = LeadScore.query.filter(LeadScore.score > 0).count()
+
+    return render_template('admin_dashboard_main_hub.html', 
+                           all_announcements=all_announcements,
+                           latest_chats=latest_chats,
+                           high_value_leads=high_value_leads,
+                           all_leads=active_leads,
+                           lead_count=lead_count)
+
+# Every open dashboard polls this, so results are shared for a few seconds per worker
+dashboard_stats_cache = CoalescingTTLCache()
+
+@bp.record_once
+def configure_dashboard_stats(state):
+    dashboard_stats_cache.ttl = state.app.config['DASHBOARD_STATS_TTL']
+
+@bp.route('/api/dashboard/stats')
+def dashboard_stats():
+    """Returns all stat values and graph data for the customizable dashboard."""
+    return jsonify(dashboard_stats_cache.get_or_compute('dashboard_stats', compute_dashboard_stats))
+
+def compute_dashboard_stats():
+    from datetime import datetime, timedelta
+    now_dt = datetime.utcnow()
+
+    # Today plus the previous 6 days, read from the daily rollups
+    faq_clicks_7d = faq_clicks_since((now_dt - timedelta(days=6)).date())
+
+    # Lead / customer / response-time graphs come from the daily metric buckets
+    # (local dates, like the created_at strings they are derived from)
+    today = datetime.now().date()
+    week = metrics.days_ending(today, 7)
+    months = metrics.months_ending(today, 6)
+    buckets = metric_buckets_since(min(months[0], today - timedelta(days=29)))
+    leads_30d, _ = metrics.window_sum(buckets, metrics.LEADS, today - timedelta(days=29))
+    conversions_30d, _ = metrics.window_sum(buckets, metrics.CONVERSIONS, today - timedelta(days=29))
+    responses_7d, response_minutes_7d = metrics.window_sum(buckets, metrics.RESPONSE_TIME, week[0])
+    conversion_rate = f"{conversions_30d / leads_30d * 100:.1f}%" if leads_30d else "—"
+    avg_response = f"{response_minutes_7d / responses_7d:.1f} min" if responses_7d else "—"
+    week_labels = [d.strftime('%a') for d in week]
+
+    # First response / bot deflection from the batch session summaries
+    responses = session_response_stats(since_day=today - timedelta(days=29))
+    first_response = responses['first_response']['p50_seconds']
+    first_response = f"{first_response / 60:.1f} min" if first_response is not None else "—"
+    deflection = responses['deflection_rate']
+    deflection = f"{deflection * 100:.1f}%" if deflection is not None else "—"
+
+    # All simple counts in a single round trip
+    def count_of(model):
+        return db.select(db.func.count()).select_from(model).scalar_subquery()
+    total_customers, total_rules, active_rules, total_templates, total_faqs = db.session.query(
+        count_of(Customer),
+        count_of(Rule),
+        db.select(db.func.count()).select_from(Rule).where(Rule.active == True).scalar_subquery(),
+        count_of(AutoReplyTemplate),
+        count_of(FAQ)
+    ).one()
+
+    # --- Fetch Real Inquiry Status Data ---
+    # (also gives the total/active inquiry counts, so no separate COUNTs)
+    inq_status_counts = db.session.query(Inquiry.status, db.func.count(Inquiry.id)).group_by(Inquiry.status).all()
+    total_inquiries = sum(count for _, count in inq_status_counts)
+    active_inquiries = sum(count for status, count in inq_status_counts if status is not None and status != 'Resolved')
+    
+    inq_labels = []
+    inq_data = []
+    inq_colors = []
+    
+    # Color mapping matching the previous design
+    status_colors = {
+        "New": "#44BBA4",       # Teal
+        "In Progress": "#f59e0b", # Orange
+        "Resolved": "#3F88C5",  # Blue
+        "Urgent": "#E94F37"     # Red
+    }
+    
+    for status, count in inq_status_counts:
+        status_label = status if status else "Unknown"
+        inq_labels.append(status_label)
+        inq_data.append(count)
+        inq_colors.append(status_colors.get(status_label, "#94a3b8")) # Gray if unknown status
+
+    # Handle empty case
+    if not inq_data:
+        inq_labels = ["No Data"]
+        inq_data = [0]
+        inq_colors = ["#e2e8f0"]
+
+    return {
+        "solid_stats": [
+            {"key": "total_customers", "label": "Total Customers", "value": total_customers, "icon": "👥", "color": "#3F88C5"},
+            {"key": "active_inquiries", "label": "Active Inquiries", "value": active_inquiries, "icon": "📩", "color": "#E94F37"},
+            {"key": "total_inquiries", "label": "Total Inquiries", "value": total_inquiries, "icon": "📋", "color": "#44BBA4"},
+            {"key": "scoring_rules", "label": "Scoring Rules", "value": f"{active_rules} / {total_rules}", "icon": "⚡", "color": "#a855f7"},
+            {"key": "templates_count", "label": "Reply Templates", "value": total_templates, "icon": "💬", "color": "#f59e0b"},
+            {"key": "faq_count", "label": "FAQs Published", "value": total_faqs, "icon": "❓", "color": "#06b6d4"},
+            {"key": "faq_clicks_7d", "label": "FAQ Clicks (7d)", "value": faq_clicks_7d, "icon": "📊", "color": "#f43f5e"},
+            {"key": "conversion_rate", "label": "Conversion Rate", "value": conversion_rate, "icon": "📈", "color": "#10b981"},
+            {"key": "avg_response", "label": "Avg Response Time", "value": avg_response, "icon": "⏱️", "color": "#ec4899"},
+            {"key": "first_response", "label": "Median First Response (30d)", "value": first_response, "icon": "⚡", "color": "#0ea5e9"},
+            {"key": "bot_deflection", "label": "Bot-Only Chats (30d)", "value": deflection, "icon": "🤖", "color": "#64748b"},
+        ],
+        "graphs": [
+            {
+                "key": "leads_7d",
+                "label": "Leads (Past 7 Days)",
+                "type": "line",
+                "labels": week_labels,
+                "datasets": [{"label": "Leads", "data": metrics.daily_counts(buckets, metrics.LEADS, week), "borderColor": "#3F88C5", "backgroundColor": "rgba(63,136,197,0.1)"}]
+            },
+            {
+                "key": "inquiry_status",
+                "label": "Inquiry Status Breakdown",
+                "type": "doughnut",
+                "labels": inq_labels,
+                "datasets": [{"label": "Inquiries", "data": inq_data, "backgroundColor": inq_colors}]
+            },
+            {
+                "key": "customer_growth",
+                "label": "Customer Growth (6 Months)",
+                "type": "bar",
+                "labels": [m.strftime('%b') for m in months],
+                "datasets": [{"label": "New Customers", "data": metrics.monthly_counts(buckets, metrics.NEW_CUSTOMERS, months), "backgroundColor": "#a855f7"}]
+            },
+            {
+                "key": "response_time",
+                "label": "Avg Response Time (7 Days)",
+                "type": "line",
+                "labels": week_labels,
+                "datasets": [{"label": "Minutes", "data": metrics.daily_averages(buckets, metrics.RESPONSE_TIME, week), "borderColor": "#ec4899", "backgroundColor": "rgba(236,72,153,0.1)"}]
+            }
+        ]
+    }
+
+@bp.route('/settings')
+def settings():
+    return render_template('settings.html')
+
+# --- ANNOUNCEMENT CRUD API ---
+
+@bp.route('/api/announcements', methods=['GET'])
+def get_announcements():
+    announcements = Announcement.query.order_by(Announcement.id.desc()).all()
+    return jsonify([announcement_to_dict(a) for a in announcements])
+
+@bp.route('/api/announcements', methods=['POST'])
+def create_announcement():
+    if session.get('user_role') not in ['ultra_admin', 'super_admin', 'admin']:
+        return jsonify({'error': 'Forbidden: Only admins can create announcements'}), 403
+        
+    data = request.get_json()
+    from datetime import datetime
+    new_announcement = Announcement(
+        title=data.get('title'),
+        content=data.get('content'),
+        priority=data.get('priority', 'normal'),
+        created_at=datetime.now().strftime('%Y-%m-%d %H:%M')
+    )
+    db.session.add(new_announcement)
+    db.session.commit()
+    
+    create_notification(
+        'announcement',
+        f'📢 {new_announcement.title}',
+        f'Announcement by {session.get("user_name", "Admin")}: {new_announcement.content[:100]}',
+        icon='📢'
+    )
+    
+    return jsonify(announcement_to_dict(new_announcement)), 201
+
+@bp.route('/api/announcements/<int:id>', methods=['PUT'])
+def update_announcement(id):
+    if session.get('user_role') not in ['ultra_admin', 'super_admin', 'admin']:
+        return jsonify({'error': 'Forbidden: Only admins can edit announcements'}), 403
+
+    announcement = Announcement.query.get_or_404(id)
+    data = request.get_json()
+    announcement.title = data.get('title', announcement.title)
+    announcement.content = data.get('content', announcement.content)
+    announcement.priority = data.get('priority', announcement.priority)
+    db.session.commit()
+    
+    create_notification(
+        'announcement',
+        'Announcement Updated',
+        f'Announcement "{announcement.title}" was updated by {session.get("user_name", "Admin")}.',
+        icon='✏️'
+    )
+    
+    return jsonify(announcement_to_dict(announcement))
+
+@bp.route('/api/announcements/<int:id>', methods=['DELETE'])
+def delete_announcement(id):
+    if session.get('user_role') not in ['ultra_admin', 'super_admin', 'admin']:
+        return jsonify({'error': 'Forbidden: Only admins can delete announcements'}), 403
+
+    announcement = Announcement.query.get_or_404(id)
+    db.session.delete(announcement)
+    db.session.commit()
+    return jsonify({"success": True})
+
+def announcement_to_dict(a):
+    return {
+        'id': a.id,
+        'title': a.title,
+        'content': a.content,
+        'priority': a.priority,
+        'createdAt': a.created_at
+    }
+
+# --- USER PREFERENCES API ---
+
+@bp.route('/api/user/preferences', methods=['GET', 'POST'])
+def handle_preferences():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+        
+    import json
+    if request.method == 'POST':
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Invalid data'}), 400
+        
+        try:
+            prefs = json.loads(user.preferences) if user.preferences else {}
+        except:
+            prefs = {}
+        
+        prefs.update(data)
+        user.preferences = json.dumps(prefs)
+        db.session.commit()
+        return jsonify({'success': True})
+    
+    # GET method
+    try:
+        prefs = json.loads(user.preferences) if user.preferences else {}
+    except:
+        prefs = {}
+    return jsonify(prefs)
+
+# --- Error Handlers ---
+@bp.app_errorhandler(404)
+def page_not_found(e):
+    return render_template('404.html'), 404
+
+# --- GLOBAL SEARCH API ---
+@bp.route('/api/global-search')
+def global_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify([])
+
+    results = []
+
+    # 1. Teams (Team Name)
+    teams = Team.query.filter(Team.name.ilike(f'%{query}%')).limit(3).all()
+    for t in teams:
+        results.append({
+            'category': 'Team',
+            'display': t.name,
+            'url': '/admin/create-account' # Teams are also managed here
+        })
+
+    # 3. Chats (Visitor Name)
+    chats = ChatSession.query.filter(ChatSession.visitor_name.ilike(f'%{query}%')).limit(3).all()
+    for c in chats:
+        results.append({
+            'category': 'Chat',
+            'display': f"{c.visitor_name} (#{c.id})",
+            'url': f"/history?session={c.id}"
+        })
+
+    # 4. Announcements (Title or Content)
+    anns = Announcement.query.filter(
+        or_(Announcement.title.ilike(f'%{query}%'), Announcement.content.ilike(f'%{query}%'))
+    ).limit(3).all()
+    for a in anns:
+        results.append({
+            'category': 'Announcement',
+            'display': a.title,
+            'url': '/dashboard' # Announcements are on the dashboard
+        })
+    
+    # 5. Customers (Name or Email) - Added for completeness as the UI says "Search leads, rules, or customers..."
+    customers = Customer.query.filter(
+         or_(Customer.name.ilike(f'%{query}%'), Customer.email.ilike(f'%{query}%'))
+    ).limit(3).all()
+    for c in customers:
+        results.append({
+            'category': 'Customer',
+            'display': c.name,
+            'url': f"/customer/{c.id}"
+        })
+
+    # 6. Inquiries (ID, Customer, Type, Description)
+    inq_filters = [
+        Inquiry.customer.ilike(f'%{query}%'),
+        Inquiry.inquiry_type.ilike(f'%{query}%'),
+        Inquiry.description.ilike(f'%{query}%')
+    ]
+    # Check if query is numeric for ID search
+    if query.isdigit():
+        inq_filters.append(Inquiry.id == int(query))
+        
+    inquiries = Inquiry.query.filter(or_(*inq_filters)).limit(3).all()
+    for i in inquiries:
+        results.append({
+            'category': 'Inquiry',
+            'display': f"#{i.id} - {i.customer} ({i.inquiry_type})",
+            'url': f"/inquiry/{i.id}"
+        })
+
+    # 7. Rules, templates and FAQs (by name / title / question)
+    for r in Rule.query.filter(Rule.name.ilike(f'%{query}%')).limit(3).all():
+        results.append({'category': 'Rule', 'display': r.name, 'url': '/scoring'})
+    for t in AutoReplyTemplate.query.filter(AutoReplyTemplate.title.ilike(f'%{query}%')).limit(3).all():
+        results.append({'category': 'Template', 'display': t.title, 'url': '/templates-manager'})
+    for f in FAQ.query.filter(FAQ.question.ilike(f'%{query}%')).limit(3).all():
+        results.append({'category': 'FAQ', 'display': f.question, 'url': '/templates-manager'})
+
+    return jsonify(results)
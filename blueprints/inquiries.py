@@ -0,0 +1,262 @@
+"""
+Inquiry repository pages and API: listing, creating, updating, inquiry
+messages and linking inquiries to customers.
+"""
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, jsonify, render_template, request, session
+from sqlalchemy import or_
+
+from extensions import db
+from models import ChatMessage, ChatSession, Customer, Inquiry, Message, User, INQUIRY_SORTS, create_notification
+from services.pagination import estimate_count, keyset_page
+
+bp = Blueprint('inquiries', __name__, cli_group=None)
+
+@bp.route('/repository')
+def repository():
+    return render_template('inquiry-repository.html')
+
+# Route to show the Detail/Chat page
+@bp.route('/inquiry/<int:id>')
+def inquiry_detail(id):
+    inquiry = Inquiry.query.get_or_404(id)
+    assigned_user = inquiry.assigned_user
+    users = User.query.all()
+    return render_template('inquiry_detail.html', inquiry=inquiry, users=users, assigned_user=assigned_user)
+
+@bp.route('/inquiry/<int:id>/delete', methods=['POST'])
+def delete_inquiry(id):
+    inquiry = Inquiry.query.get_or_404(id)
+    db.session.delete(inquiry)
+    db.session.commit()
+    flash("Customer deleted successfully!", "danger")
+    return jsonify({'ok': True})
+
+# API to fetch messages for the chat
+@bp.route('/api/inquiry/<int:id>/messages')
+def get_messages(id):
+    inquiry = Inquiry.query.get_or_404(id)
+    
+    # If linked to a chat session, return THOSE messages
+    if inquiry.chat_sessions:
+        session = inquiry.chat_sessions[0]
+        messages = []
+        for m in session.chat_messages:
+            messages.append({
+                'sender': m.sender_name or m.sender_type,
+                'text': m.text,
+                'time': m.timestamp,
+                'is_agent': m.sender_type in ['agent', 'bot', 'system']
+            })
+        return jsonify(messages)
+    
+    # Fallback to old behavior (though UI hides it)
+    messages = [{'sender': m.sender, 'text': m.text, 'time': m.time, 'is_agent': m.is_agent} for m in inquiry.messages]
+    return jsonify(messages)
+
+@bp.route('/api/inquiry/<int:id>/message', methods=['POST'])
+def send_message(id):
+    inquiry = Inquiry.query.get_or_404(id)
+    data = request.get_json()
+    from datetime import datetime
+    
+    if inquiry.chat_sessions:
+        session = inquiry.chat_sessions[0]
+        new_msg = ChatMessage(
+            session_id=session.id,
+            sender_type='agent',
+            sender_name='Admin',
+            text=data.get('text'),
+            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        )
+        db.session.add(new_msg)
+        session.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    else:
+        new_msg = Message(
+            inquiry_id=id,
+            sender="Admin",
+            text=data.get('text'),
+            time=datetime.now().strftime('%I:%M %p'),
+            is_agent=True
+        )
+        db.session.add(new_msg)
+        
+    db.session.commit()
+    return jsonify({"ok": True})
+
+# --- INQUIRY REPOSITORY API ---
+
+def inquiry_to_dict(inquiry, user):
+    # Format: "[display name] @[username]"
+    if user:
+        user_display = f"{user.name} @{user.username}"
+    else:
+        user_display = inquiry.assigned_rep or "Unassigned"
+    return {
+        'id': inquiry.id,
+        'customer': inquiry.customer,
+        'customer_id': inquiry.customer_id,
+        'inquiry_type': inquiry.inquiry_type,
+        'status': inquiry.status,
+        'assigned_rep': user_display,
+        'rep_username': inquiry.assigned_rep,
+        'rep_id': user.id if user else None,
+        'rep_pic': user.profile_picture if user else None,
+        'created_at': inquiry.created_at,
+        'created_by': inquiry.created_by,
+        'updated_at': inquiry.updated_at,
+        'updated_by': inquiry.updated_by
+    }
+
+@bp.route('/api/inquiries')
+def get_inquiries():
+    """
+    Keyset-paginated inquiry repository.
+
+    Query params: search (customer or rep), id, status / status[], type /
+    type[], sort (id, customer, status, created, updated), order (asc, desc),
+    limit (max 200), cursor (next_cursor of the previous page).
+    """
+    search = request.args.get('search', '').lower()
+    inq_id = request.args.get('id', '')
+
+    # Support both single and multiple filters
+    status_filter = request.args.get('status', '')
+    status_list = request.args.getlist('status[]')
+
+    type_filter = request.args.get('type', '')
+    type_list = request.args.getlist('type[]')
+
+    sort = request.args.get('sort', 'id')
+    if sort not in INQUIRY_SORTS:
+        return jsonify({'error': f"sort must be one of {', '.join(INQUIRY_SORTS)}"}), 400
+    descending = request.args.get('order', 'asc').lower() == 'desc'
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+
+    # Reps come along through the assigned user foreign key
+    query = Inquiry.query.options(db.joinedload(Inquiry.assigned_user))
+
+    if inq_id:
+        query = query.filter(Inquiry.id == inq_id)
+    if search:
+        # Reps match on the user's current display name or username
+        matching_users = db.select(User.id).where(or_(User.name.ilike(f'%{search}%'),
+                                                      User.username.ilike(f'%{search}%')))
+        query = query.filter(or_(
+            Inquiry.customer.ilike(f'%{search}%'),
+            Inquiry.assigned_rep.ilike(f'%{search}%'),
+            Inquiry.assigned_user_id.in_(matching_users)
+        ))
+
+    # Apply status filter
+    if status_filter:
+        query = query.filter(Inquiry.status == status_filter)
+    elif status_list:
+        query = query.filter(Inquiry.status.in_(status_list))
+
+    # Apply type filter
+    if type_filter:
+        query = query.filter(Inquiry.inquiry_type == type_filter)
+    elif type_list:
+        query = query.filter(Inquiry.inquiry_type.in_(type_list))
+
+    cursor = request.args.get('cursor')
+    try:
+        items, next_cursor = keyset_page(query, sort, INQUIRY_SORTS[sort], Inquiry.id,
+                                         cursor=cursor, descending=descending, limit=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    result = {'inquiries': [inquiry_to_dict(i, i.assigned_user) for i in items], 'next_cursor': next_cursor}
+    # The total only changes with the filters, so only the first page pays for it
+    if not cursor:
+        cap = current_app.config['COUNT_ESTIMATE_CAP']
+        result['total'], result['total_exact'] = estimate_count(query, Inquiry.id, cap)
+    return jsonify(result)
+
+@bp.route('/inquiry/new')
+def inquiry_new():
+    users = User.query.all()
+    return render_template('inquiry_new.html', users=users)
+
+@bp.route('/api/inquiry/create', methods=['POST'])
+def api_create_inquiry():
+    data = request.get_json()
+    new_inquiry = Inquiry(
+        customer=data.get('customer'),
+        customer_id=data.get('customer_id'),
+        assigned_rep=data.get('assigned_rep'),
+        inquiry_type=data.get('inquiry_type'),
+        status=data.get('status', 'New'),
+        description=data.get('description', ''),
+        notes=data.get('notes', ''),
+        created_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+        created_by=session.get('user_name', 'Admin'),
+        updated_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+        updated_by=session.get('user_name', 'Admin')
+    )
+    db.session.add(new_inquiry)
+    db.session.commit()
+    
+    # Handle immediate linking to chat
+    linked_session_id = data.get('linked_session_id')
+    if linked_session_id:
+        chat = ChatSession.query.get(linked_session_id)
+        if chat:
+            chat.linked_inquiry_id = new_inquiry.id
+            db.session.commit()
+    
+    create_notification(
+        'inquiry',
+        'New Inquiry Created',
+        f'Inquiry for "{new_inquiry.customer}" was created by {session.get("user_name", "Admin")}.',
+        icon='📋'
+    )
+    
+    return jsonify({"ok": True, "id": new_inquiry.id})
+
+@bp.route('/api/inquiry/<int:id>/update', methods=['PUT'])
+def api_update_inquiry(id):
+    inquiry = Inquiry.query.get_or_404(id)
+    data = request.get_json()
+    
+    inquiry.status = data.get('status', inquiry.status)
+    inquiry.assigned_rep = data.get('assigned_rep', inquiry.assigned_rep)
+    inquiry.description = data.get('description', inquiry.description)
+    
+    # Handle internal notes - if inquiry has a linked customer, update customer notes instead
+    if 'notes' in data:
+        if inquiry.customer_id:
+            # Update linked customer's notes
+            customer = Customer.query.get(inquiry.customer_id)
+            if customer:
+                customer.notes = data.get('notes')
+                customer.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+                customer.updated_by = session.get('user_name', 'Admin')
+        else:
+            # No linked customer, update inquiry notes directly
+            inquiry.notes = data.get('notes', inquiry.notes)
+    
+    inquiry.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    inquiry.updated_by = session.get('user_name', 'Admin')
+    db.session.commit()
+    
+    create_notification(
+        'inquiry',
+        'Inquiry Updated',
+        f'Inquiry for "{inquiry.customer}" was updated by {session.get("user_name", "Admin")}.',
+        icon='✏️'
+    )
+    
+    return jsonify({"ok": True, "id": inquiry.id})
+
+@bp.route('/api/inquiry/<int:id>/link-customer', methods=['POST'])
+def api_link_inquiry_customer(id):
+    inquiry = Inquiry.query.get_or_404(id)
+    data = request.get_json()
+    inquiry.customer_id = data.get('customer_id')
+    inquiry.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    inquiry.updated_by = session.get('user_name', 'Admin')
+    db.session.commit()
+    return jsonify({"ok": True})
@@ -0,0 +1,61 @@
+"""
+Per-user notification feed.
+"""
+from flask import Blueprint, jsonify, request, session
+
+from extensions import db
+from models import Notification
+
+bp = Blueprint('notifications', __name__, cli_group=None)
+
+
+
+@bp.route('/api/notifications')
+def get_notifications():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'notifications': [], 'unread_count': 0})
+        
+    from datetime import datetime, timedelta
+    # Get notifications from the past week for THIS user
+    one_week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M')
+    notifications = Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.created_at >= one_week_ago
+    ).order_by(Notification.id.desc()).all()
+    
+    result = []
+    for n in notifications:
+        result.append({
+            'id': n.id,
+            'type': n.type,
+            'title': n.title,
+            'message': n.message,
+            'icon': n.icon,
+            'created_by': n.created_by,
+            'created_at': n.created_at,
+            'is_read': n.is_read
+        })
+    
+    unread_count = sum(1 for n in notifications if not n.is_read)
+    return jsonify({'notifications': result, 'unread_count': unread_count})
+
+@bp.route('/api/notifications/read', methods=['POST'])
+def mark_notifications_read():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    data = request.get_json()
+    notif_ids = data.get('ids', [])
+    
+    if notif_ids == 'all':
+        Notification.query.filter_by(user_id=user_id, is_read=False).update({'is_read': True})
+    else:
+        for nid in notif_ids:
+            notif = Notification.query.filter_by(id=nid, user_id=user_id).first()
+            if notif:
+                notif.is_read = True
+    
+    db.session.commit()
+    return jsonify({'ok': True})
@@ -0,0 +1,88 @@
+"""
+Lead scoring page and the rule editor.
+"""
+from datetime import datetime
+
+from flask import Blueprint, jsonify, redirect, render_template, request, session, url_for
+
+from extensions import db
+from models import Rule, create_notification, invalidate_rules
+
+bp = Blueprint('scoring', __name__, cli_group=None)
+
+@bp.route('/scoring')
+def lead_scoring():
+    rules = Rule.query.all()
+    return render_template('lead-scoring.html', rules=rules)
+
+# Lead Scoring Logic (Add/Edit/Delete)
+@bp.route('/add_rule', methods=['GET', 'POST'])
+def add_rule():
+    if request.method == 'POST':
+        new_rule = Rule(
+            name=request.form.get('name'),
+            keywords=request.form.get('keywords'),
+            score=int(request.form.get('score')),
+            operation=request.form.get('operation'),
+            active=True if request.form.get('active') else False,
+            created_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            created_by=session.get('user_name', 'Admin'),
+            updated_at=datetime.now().strftime('%Y-%m-%d %H:%M'),
+            updated_by=session.get('user_name', 'Admin')
+        )
+        db.session.add(new_rule)
+        db.session.commit()
+        invalidate_rules()
+        
+        create_notification(
+            'rule',
+            'New Scoring Rule Created',
+            f'Rule "{new_rule.name}" was created by {session.get("user_name", "Admin")}.',
+            icon='⚙️'
+        )
+        
+        return redirect(url_for('scoring.lead_scoring'))
+    return render_template('rule_form.html', rule=None, title="New Rule Configuration")
+
+@bp.route('/edit_rule/<int:id>', methods=['GET', 'POST'])
+def edit_rule(id):
+    rule = Rule.query.get_or_404(id)
+    if request.method == 'POST':
+        rule.name = request.form.get('name')
+        rule.keywords = request.form.get('keywords')
+        rule.score = int(request.form.get('score'))
+        rule.operation = request.form.get('operation')
+        rule.active = True if request.form.get('active') else False
+        rule.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+        rule.updated_by = session.get('user_name', 'Admin')
+        db.session.commit()
+        invalidate_rules()
+        
+        create_notification(
+            'rule',
+            'Scoring Rule Updated',
+            f'Rule "{rule.name}" was updated by {session.get("user_name", "Admin")}.',
+            icon='✏️'
+        )
+        
+        return redirect(url_for('scoring.lead_scoring'))
+    return render_template('rule_form.html', rule=rule, title="Edit Rule Configuration")
+
+@bp.route('/delete_rule/<int:id>')
+def delete_rule(id):
+    rule = Rule.query.get_or_404(id)
+    db.session.delete(rule)
+    db.session.commit()
+    invalidate_rules()
+    return redirect(url_for('scoring.lead_scoring'))
+
+@bp.route('/toggle_status/<int:id>', methods=['POST'])
+def toggle_status(id):
+    rule = Rule.query.get_or_404(id)
+    data = request.get_json()
+    rule.active = data['active']
+    rule.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M')
+    rule.updated_by = session.get('user_name', 'Admin')
+    db.session.commit()
+    invalidate_rules()
+    return jsonify({'success': True})
@@ -0,0 +1,659 @@
+"""
+Team pages and API: teams, join / leave requests, member roles and the team
+chat.
+"""
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, redirect, render_template, request, session, url_for
+from werkzeug.utils import secure_filename
+
+from extensions import db
+from models import Team, TeamMessage, TeamRequest, User, calculate_team_score, create_notification
+
+bp = Blueprint('teams', __name__, cli_group=None)
+
+@bp.route('/my-team')
+def my_team():
+    if not session.get('logged_in'):
+        return redirect(url_for('auth.login'))
+    
+    user_id = session.get('user_id')
+    user = User.query.get(user_id)
+    
+    team = None
+    members = []
+    
+    all_teams = []
+    my_requests = []
+    
+    if user.team_id:
+        # Mark chat as read
+        user.last_active_team_chat = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        db.session.commit()
+
+        team = Team.query.get(user.team_id)
+        if team:
+            members = User.query.filter_by(team_id=team.id).all()
+            # Sort: leader=0, vice=1, others=2
+            members.sort(key=lambda x: 0 if x.team_role == 'leader' else (1 if x.team_role == 'vice_leader' else 2))
+        
+        # If leader or vice leader, fetch pending join requests
+        if user.team_role in ['leader', 'vice_leader']:
+             pending_join_requests = TeamRequest.query.filter_by(team_id=team.id, status='pending', type='join').all()
+        else:
+             pending_join_requests = []
+    else:
+        pending_join_requests = []
+        # Fetch available teams and user's requests
+        all_teams = Team.query.all()
+        # Calculate dynamic scores for all teams
+        for t in all_teams:
+            t.dynamic_score = calculate_team_score(t.id)
+            
+        # Create a set of requested team IDs for easy lookup in template
+        pending_reqs = TeamRequest.query.filter_by(user_id=user.id, status='pending').all()
+        my_requests = [r.team_id for r in pending_reqs]
+    
+    # Calculate team score if user has a team
+    calculated_team_score = calculate_team_score(team.id) if team else 0
+
+    return render_template('my_team.html', team=team, members=members, user=user, all_teams=all_teams, my_requests=my_requests, pending_join_requests=pending_join_requests, calculated_team_score=calculated_team_score)
+
+# --- TEAM MANAGEMENT API ---
+
+@bp.route('/api/teams', methods=['GET'])
+def get_teams():
+    teams = Team.query.all()
+    result = []
+    for t in teams:
+        pic_url = t.profile_picture
+        if pic_url and not pic_url.startswith('http'):
+            pic_url = url_for('static', filename='uploads/' + pic_url)
+        elif not pic_url:
+            pic_url = f"https://ui-avatars.com/api/?name={t.name}&background=random"
+            
+        result.append({
+            'id': t.id,
+            'name': t.name,
+            'profile_picture': pic_url,
+            'description': t.description,
+            'role': t.role,
+            'department': t.department,
+            'team_score': calculate_team_score(t.id),
+            'team_tag': t.team_tag,
+            'member_count': len(t.members)
+        })
+    return jsonify({'teams': result})
+
+@bp.route('/api/teams/create', methods=['POST'])
+def create_team():
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    current_user = User.query.get(session.get('user_id'))
+    if current_user.role not in ['ultra_admin', 'super_admin']:
+        return jsonify({'error': 'Only Super Admins and Ultra Admins can create teams.'}), 403
+        
+    leader_id = request.form.get('leader_id')
+    
+    if current_user.team_id and not leader_id:
+        return jsonify({'error': 'You are already in a team. You must assign another user as the leader for this new team.'}), 400
+        
+    # Handling form data for file upload
+    name = request.form.get('name')
+    if not name:
+        return jsonify({'error': 'Team name is required.'}), 400
+        
+    if Team.query.filter_by(name=name).first():
+        return jsonify({'error': 'A team with this name already exists.'}), 400
+        
+    new_team = Team(
+        name=name,
+        description=request.form.get('description', ''),
+        role=request.form.get('role', ''),
+        department=request.form.get('department', ''),
+        team_tag=request.form.get('team_tag', ''),
+        created_at=datetime.now().strftime('%Y-%m-%d %H:%M')
+    )
+    
+    # Handle Profile Picture Upload
+    if 'profile_picture' in request.files:
+        file = request.files['profile_picture']
+        if file and file.filename != '':
+            import os
+            from werkzeug.utils import secure_filename
+            filename = secure_filename(file.filename)
+            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+            filename = f"team_{timestamp}_{filename}"
+            file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+            new_team.profile_picture = filename
+
+    db.session.add(new_team)
+    db.session.flush() # Get the ID
+    
+    # Assignment of leadership
+    if leader_id:
+        target_leader = User.query.get(leader_id)
+        if target_leader:
+            if target_leader.team_id:
+                return jsonify({'error': f'User {target_leader.name} is already in a team and cannot be assigned as the leader.'}), 400
+            target_leader.team_id = new_team.id
+            target_leader.team_role = 'leader'
+    else:
+        # Creator becomes leader
+        current_user.team_id = new_team.id
+        current_user.team_role = 'leader'
+    
+    db.session.commit()
+    
+    create_notification(
+        'account',
+        'New Team Created',
+        f'Team {new_team.name} has been created by {current_user.username}.',
+        target_roles=['super_admin', 'admin']
+    )
+    
+    return jsonify({'success': True, 'team_id': new_team.id})
+
+@bp.route('/api/teams/request-action', methods=['POST'])
+def team_request_action():
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    data = request.get_json()
+    action_type = data.get('type') # join, move, invite
+    target_user_id = int(data.get('user_id'))
+    target_team_id = data.get('team_id')
+    if target_team_id and target_team_id != 'none':
+        target_team_id = int(target_team_id)
+    
+    current_user = User.query.get(session.get('user_id'))
+    target_user = User.query.get(target_user_id)
+    
+    # Leadership Integrity Check for Removal
+    if (not target_team_id or str(target_team_id).lower() == 'none') and target_user.team_id:
+        if target_user.team_role == 'leader':
+            others_count = User.query.filter(User.team_id == target_user.team_id, User.id != target_user.id).count()
+            if others_count > 0:
+                return jsonify({'error': f'Leadership Integrity: {target_user.name} is the team leader. You cannot remove the leader while there are other members in the team. Please transfer leadership first.'}), 400
+
+    # Handle removal (no team)
+    if not target_team_id or str(target_team_id).lower() == 'none':
+        if current_user.role == 'ultra_admin' or (current_user.role == 'super_admin' and target_user.role in ['admin', 'agent']) or (current_user.role == 'admin' and target_user.id == current_user.id):
+             target_user.team_id = None
+             target_user.team_role = None
+             db.session.commit()
+             return jsonify({'success': True, 'message': 'User removed from team.'})
+        return jsonify({'error': 'Permission denied for team removal.'}), 403
+
+    target_team = Team.query.get(target_team_id)
+    if not target_team:
+        return jsonify({'error': 'Target team not found.'}), 404
+
+    # Leadership Integrity Check for Moving
+    if target_user.team_id and target_user.team_role == 'leader' and target_user.team_id != target_team_id:
+        others_count = User.query.filter(User.team_id == target_user.team_id, User.id != target_user.id).count()
+        if others_count > 0:
+             return jsonify({'error': f'Leadership Integrity: {target_user.name} is the team leader. You cannot move the leader to a new team while there are other members present. Please transfer leadership first.'}), 400
+
+    # Permission Checks
+    can_perform = False
+    needs_approval = True
+    
+    if action_type == 'join':
+        # Agents can request to join
+        if current_user.role == 'agent' or current_user.role == 'admin':
+            can_perform = True
+        # Super Admins joining themselves requires leader permission
+        elif current_user.role == 'super_admin' and target_user_id == current_user.id:
+            can_perform = True
+        # Ultra Admin joining themselves require no permission
+        elif current_user.role == 'ultra_admin' and target_user_id == current_user.id:
+            can_perform = True
+            needs_approval = False
+            
+    elif action_type == 'move':
+        # Ultra Admins can move anyone
+        if current_user.role == 'ultra_admin':
+            can_perform = True
+            needs_approval = False
+        # Super Admins can move admins or agents
+        elif current_user.role == 'super_admin' and target_user.role in ['admin', 'agent']:
+            can_perform = True
+            needs_approval = False
+        # Admins can request to move any agent
+        elif current_user.role == 'admin' and target_user.role == 'agent':
+            can_perform = True
+            
+    elif action_type == 'invite':
+        # Leaders and Vice Leaders can invite
+        if current_user.team_id == target_team_id and current_user.team_role in ['leader', 'vice_leader']:
+            can_perform = True
+
+    if not can_perform:
+        return jsonify({'error': 'Forbidden: You do not have permission for this action.'}), 403
+
+    if not needs_approval:
+        target_user.team_id = target_team_id
+        target_user.team_role = 'member'
+        db.session.commit()
+        return jsonify({'success': True, 'message': 'Action completed successfully.'})
+    
+    # Create request
+    new_req = TeamRequest(
+        user_id=target_user_id,
+        team_id=target_team_id,
+        requester_id=current_user.id,
+        type=action_type,
+        created_at=datetime.now().strftime('%Y-%m-%d %H:%M')
+    )
+    db.session.add(new_req)
+    db.session.commit()
+    
+    # Notify team leader
+    leaders = User.query.filter_by(team_id=target_team_id, team_role='leader').all()
+    for leader in leaders:
+        create_notification(
+            'account',
+            'Team Request',
+            f'{current_user.username} requested {action_type} for {target_user.username}.',
+            target_user_id=leader.id
+        )
+        
+    return jsonify({'success': True, 'message': 'Request sent successfully.'})
+
+@bp.route('/api/teams/handle-request', methods=['POST'])
+def handle_team_request():
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    data = request.get_json()
+    req_id = data.get('request_id')
+    # JS sends 'action' (approve/reject), DB/logic expects 'status' (approved/rejected)
+    action = data.get('action') 
+    
+    if action == 'approve':
+        status = 'approved'
+    elif action == 'reject':
+        status = 'rejected'
+    else:
+        status = data.get('status') # Fallback
+    
+    if not status:
+         return jsonify({'error': 'Missing action or status'}), 400
+
+    req = TeamRequest.query.get_or_404(req_id)
+    current_user = User.query.get(session.get('user_id'))
+    
+    # Only team leader can approve/reject
+    if current_user.team_id != req.team_id or current_user.team_role != 'leader':
+        return jsonify({'error': 'Forbidden: Only the team leader can handle requests.'}), 403
+        
+    req.status = status
+    if status == 'approved':
+        # Add user to the team
+        target_user = User.query.get(req.user_id)
+        target_user.team_id = req.team_id
+        target_user.team_role = 'member'
+        
+        # Remove any other pending requests from this user? or just this one is done.
+        
+    db.session.commit()
+    
+    # Notify requester and user
+    try:
+        create_notification(
+            'account',
+            f'Team Request {status.title()}',
+            f'Request for {req.target_user.username} to join {req.target_team.name} was {status}.',
+            target_user_id=req.requester_id
+        )
+    except Exception as e:
+        print(f"Notification error: {e}")
+    
+    return jsonify({'success': True})
+
+@bp.route('/api/teams/leave', methods=['POST'])
+def leave_team():
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    current_user = User.query.get(session.get('user_id'))
+    if not current_user.team_id:
+        return jsonify({'error': 'You are not in a team.'}), 400
+        
+    # If the user is the ONLY leader, they might need to assign another one or team must have at least one leader.
+    # The prompt says: "A team MUST have atleast one leader."
+    if current_user.team_role == 'leader':
+        # Absolute Rule: Leaders must manually transfer leadership if there are other members
+        others_count = User.query.filter(User.team_id == current_user.team_id, User.id != current_user.id).count()
+        if others_count > 0:
+            return jsonify({'error': 'Leadership Integrity: You are the team leader. You must transfer your leadership to another member before leaving the team.'}), 400
+
+    current_user.team_id = None
+    current_user.team_role = None
+    db.session.commit()
+    
+    return jsonify({'success': True})
+
+@bp.route('/api/teams/kick', methods=['POST'])
+def kick_member():
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    data = request.get_json()
+    username = data.get('username')
+    
+    current_user = User.query.get(session.get('user_id'))
+    target_user = User.query.filter_by(username=username).first_or_404()
+    
+    if current_user.team_id != target_user.team_id:
+        return jsonify({'error': 'User is not in your team.'}), 400
+        
+    # Hierarchy: Leaders, Vice Leaders (for members), and all Admins can kick
+    is_leader = (current_user.team_id == target_user.team_id and current_user.team_role == 'leader')
+    is_vice = (current_user.team_id == target_user.team_id and current_user.team_role == 'vice_leader')
+    is_any_admin = current_user.role in ['ultra_admin', 'super_admin', 'admin']
+    
+    # Vice leaders can only kick members
+    if is_vice and target_user.team_role != 'member':
+        return jsonify({'error': 'Vice leaders can only kick regular members.'}), 403
+        
+    if not is_leader and not is_vice and not is_any_admin:
+        return jsonify({'error': 'Only leaders, vice leaders (for members), or admins can kick members.'}), 403
+        
+    # Leaders can only kick agents (non-admin accounts)
+    if is_leader and not is_any_admin and target_user.role != 'agent':
+        return jsonify({'error': 'Leaders can only kick regular agents.'}), 403
+
+    # Leadership Integrity Check for Kick (if kicking a leader)
+    if target_user.team_role == 'leader':
+        others_count = User.query.filter(User.team_id == target_user.team_id, User.id != target_user.id).count()
+        if others_count > 0:
+            return jsonify({'error': f'Leadership Integrity: {target_user.name} is the team leader. You cannot kick the leader while there are other members in the team. Please transfer leadership first.'}), 400
+
+    target_user.team_id = None
+    target_user.team_role = None
+    db.session.commit()
+    return jsonify({'success': True})
+
+@bp.route('/api/teams/my-requests', methods=['GET'])
+def get_my_team_requests():
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    current_user = User.query.get(session.get('user_id'))
+    if not current_user.team_id or current_user.team_role not in ['leader', 'vice_leader']:
+        return jsonify({'requests': []})
+        
+    requests = TeamRequest.query.filter_by(team_id=current_user.team_id, status='pending').all()
+    result = []
+    for r in requests:
+        result.append({
+            'id': r.id,
+            'user_id': r.user_id,
+            'user_name': r.target_user.username if r.target_user else 'Unknown',
+            'type': r.type,
+            'created_at': r.created_at
+        })
+    return jsonify({'requests': result})
+
+@bp.route('/api/teams/<int:team_id>/details', methods=['GET'])
+def get_team_details(team_id):
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    team = Team.query.get_or_404(team_id)
+    members = User.query.filter_by(team_id=team.id).all()
+    
+    member_list = []
+    for m in members:
+        member_list.append({
+            'id': m.id,
+            'name': m.name,
+            'username': m.username,
+            'role': m.role, # system role
+            'team_role': m.team_role or 'member',
+            'pic': m.profile_picture
+        })
+        
+    pic_url = team.profile_picture
+
+    return jsonify({
+        'team': {
+            'id': team.id,
+            'name': team.name,
+            'profile_picture': pic_url,
+            'description': team.description,
+            'role': team.role,
+            'department': team.department,
+            'team_score': calculate_team_score(team.id),
+            'team_tag': team.team_tag
+        },
+        'members': member_list
+    })
+
+@bp.route('/api/teams/<int:team_id>/delete', methods=['POST'])
+def delete_team(team_id):
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    current_user = User.query.get(session.get('user_id'))
+    team = Team.query.get_or_404(team_id)
+    
+    # Permission: Ultra/Super Admin OR Team Leader
+    is_admin = current_user.role in ['ultra_admin', 'super_admin']
+    is_leader = current_user.team_id == team.id and current_user.team_role == 'leader'
+    
+    if not is_admin and not is_leader:
+        return jsonify({'error': 'Forbidden: Only admins or team leaders can delete this team.'}), 403
+        
+    # Unassign all members
+    User.query.filter_by(team_id=team.id).update({'team_id': None, 'team_role': None})
+    
+    # Delete requests
+    TeamRequest.query.filter_by(team_id=team.id).delete()
+    
+    db.session.delete(team)
+    db.session.commit()
+    
+    return jsonify({'success': True})
+
+@bp.route('/api/teams/<int:team_id>/update', methods=['POST'])
+def update_team(team_id):
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    current_user = User.query.get(session.get('user_id'))
+    team = Team.query.get_or_404(team_id)
+    
+    if not (current_user.role in ['ultra_admin', 'super_admin'] or (current_user.team_id == team.id and current_user.team_role == 'leader')):
+        return jsonify({'error': 'Forbidden'}), 403
+        
+    team.name = request.form.get('name', team.name)
+    team.description = request.form.get('description', team.description)
+    team.role = request.form.get('role', team.role)
+    team.department = request.form.get('department', team.department)
+    team.team_tag = request.form.get('team_tag', team.team_tag)
+    # Team score is now calculated automatically, not manually edited
+    
+    # Handle Profile Picture Upload
+    if 'profile_picture' in request.files:
+        file = request.files['profile_picture']
+        if file and file.filename != '':
+            filename = secure_filename(file.filename)
+            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+            filename = f"team_{timestamp}_{filename}"
+            file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+            team.profile_picture = filename
+        
+    db.session.commit()
+    return jsonify({'success': True})
+
+@bp.route('/api/teams/member-action', methods=['POST'])
+def team_member_action():
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    data = request.get_json()
+    action = data.get('action') # promote_vice, transfer_leader, demote
+    target_username = data.get('username')
+    
+    current_user = User.query.get(session.get('user_id'))
+    target_user = User.query.filter_by(username=target_username).first_or_404()
+    
+    if current_user.team_id != target_user.team_id and current_user.role not in ['ultra_admin', 'super_admin']:
+        return jsonify({'error': 'User is not in your team.'}), 400
+        
+    # Hierarchy Check
+    is_ultra_super = current_user.role in ['ultra_admin', 'super_admin']
+    is_any_admin = is_ultra_super or current_user.role == 'admin'
+    is_leader = (current_user.team_role == 'leader' or is_ultra_super)
+    
+    # Transfer Leadership is restricted to Leader/Ultra/Super only
+    if action == 'transfer_leader' and not is_leader:
+        return jsonify({'error': 'Forbidden: Only leaders or ultra/super admins can transfer leadership.'}), 403
+
+    # Promote/Demote allowed for Leader or Any Admin
+    if not is_leader and not is_any_admin:
+        return jsonify({'error': 'Forbidden: Only leaders or admins can perform this action.'}), 403
+
+    if action == 'promote_vice':
+        if target_user.team_role == 'leader':
+             return jsonify({'error': 'Cannot demote the team leader directly. Please transfer leadership to another member first.'}), 400
+        target_user.team_role = 'vice_leader'
+    elif action == 'demote':
+        if target_user.team_role == 'leader':
+             return jsonify({'error': 'Cannot demote the team leader directly. Please transfer leadership to another member first.'}), 400
+        target_user.team_role = 'member'
+    elif action == 'transfer_leader': 
+        # Logic for performing transfer
+        # 1. Find the current leader(s)
+        current_leader = User.query.filter_by(team_id=target_user.team_id, team_role='leader').first()
+        
+        if current_leader:
+            current_leader.team_role = 'vice_leader'
+        
+        target_user.team_role = 'leader'
+        
+    db.session.commit()
+    return jsonify({'success': True})
+
+
+ # --- NOTIFICATIONS API ---
+
+@bp.route('/api/teams/<int:team_id>/chat', methods=['GET', 'POST'])
+def api_team_chat(team_id):
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session.get('user_id')
+    user = User.query.get(user_id)
+    
+    # Must be in team or super/ultra admin
+    if user.team_id != team_id and user.role not in ['ultra_admin', 'super_admin']:
+         return jsonify({'error': 'Forbidden'}), 403
+
+    if request.method == 'GET':
+        since_id = request.args.get('since', 0, type=int)
+        
+        query = TeamMessage.query.filter_by(team_id=team_id)
+        if since_id > 0:
+            query = query.filter(TeamMessage.id > since_id)
+        
+        # If fetching initial history (since=0), limit to last 50
+        if since_id == 0:
+            total = query.count()
+            if total > 50:
+                # We need to slice the query. SQLAlchemy slice/offset
+                # Wait, simpler: order by desc limit 50 then reverse?
+                # Or just fetch all if not too many. Let's do fetch all but verify count.
+                # If > 50, fetch latest 50.
+                pass 
+                # Actually, simpler logic:
+                # If since_id is 0, we want the most recent messages.
+                # query.order_by(TeamMessage.created_at.desc()).limit(50) -> reverse
+                # But IDs are sequential usually.
+        
+        # Implementing simple logic: if since_id > 0, get ones > since_id.
+        # If since_id == 0, get ALL (or last 100). Let's do ALL for now, simpler.
+        messages = query.all()
+        
+        result = []
+        for m in messages:
+            # Need user link. The model has backref 'user'.
+            result.append({
+                'id': m.id,
+                'user_id': m.user_id,
+                'name': m.user.name if m.user else 'Unknown',
+                'pic': m.user.profile_picture if m.user else None,
+                'message': m.message,
+                'created_at': m.created_at
+            })
+        
+        return jsonify({'messages': result})
+
+    elif request.method == 'POST':
+        data = request.get_json()
+        msg_text = data.get('message')
+        if not msg_text:
+            return jsonify({'error': 'Message required'}), 400
+        
+        import datetime
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        new_msg = TeamMessage(
+            team_id=team_id,
+            user_id=user_id,
+            message=msg_text,
+            created_at=now
+        )
+        db.session.add(new_msg)
+        db.session.commit()
+        
+        return jsonify({'success': True})
+
+@bp.route('/api/teams/message/<int:message_id>/edit', methods=['POST'])
+def api_team_edit_message(message_id):
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    user_id = session.get('user_id')
+    msg = TeamMessage.query.get_or_404(message_id)
+    user = User.query.get(user_id)
+    
+    # Hierarchy: ONLY Owners can edit their own messages
+    is_owner = msg.user_id == user_id
+    
+    if not is_owner:
+        return jsonify({'error': 'Forbidden: You can only edit your own messages.'}), 403
+        
+    data = request.get_json()
+    new_text = data.get('message')
+    if not new_text or not new_text.strip():
+        return jsonify({'error': 'Message cannot be empty.'}), 400
+
+    msg.message = new_text.strip()
+    db.session.commit()
+    return jsonify({'success': True, 'message': msg.message})
+
+@bp.route('/api/teams/message/<int:message_id>/delete', methods=['POST'])
+def api_team_delete_message(message_id):
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Unauthorized'}), 401
+        
+    user_id = session.get('user_id')
+    msg = TeamMessage.query.get_or_404(message_id)
+    user = User.query.get(user_id)
+    
+    # Hierarchy: Owners and ALL Admins (Ultra, Super, Regular) can delete
+    is_any_admin = user.role in ['ultra_admin', 'super_admin', 'admin']
+    is_owner = msg.user_id == user_id
+    
+    if not (is_any_admin or is_owner):
+        return jsonify({'error': 'Forbidden: Only owners and admins can delete messages.'}), 403
+        
+    db.session.delete(msg)
+    db.session.commit()
+    return jsonify({'success': True, 'id': msg.id})
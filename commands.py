@@ -0,0 +1,199 @@
+"""
+Database CLI commands: schema setup and migrations, seeding, synthetic load
+data, and the batch rebuilds and rollups of derived tables. They live on a
+route-less blueprint so they are registered with the app like everything
+else (`flask init-db`, `flask seed`, `flask generate-data`), whichever route
+blueprints the process serves.
+"""
+import time
+
+import click
+from flask import Blueprint
+
+import datagen
+from extensions import db
+from models import (CacheVersion, ChatSession, LEAD_SCORES, backfill_contact_identities, backfill_customer_tags,
+                    prune_faq_logs, rebuild_customer_summaries, rebuild_metrics, refresh_lead_scores,
+                    resolve_inquiry_reps, rollup_faq_clicks, summarize_chat_sessions)
+from schema import MIGRATIONS, upgrade_schema
+from seed import seed_admin, seed_chat_data
+from services import migrations
+
+commands = Blueprint('commands', __name__, cli_group=None)
+
+@commands.cli.command('init-db')
+@click.option('--to', 'target', type=int, default=None, help='Stop after this migration version (default: latest).')
+def init_db_command(target):
+    """Create the tables (or apply pending migrations) and the built-in accounts. Run once per deploy."""
+    try:
+        applied = upgrade_schema(target)
+    except migrations.MigrationError as e:
+        raise click.ClickException(str(e))
+    for migration in applied:
+        click.echo(f"Applied {migration.version}: {migration.description}")
+    seed_admin()
+    click.echo(f"Schema at version {migrations.current_version(db.session.connection())}")
+
+@commands.cli.command('seed')
+def seed_command():
+    """Add the demo chat conversations (only into an empty chat history)."""
+    seed_chat_data()
+    click.echo(f"{ChatSession.query.count()} chat sessions")
+
+@commands.cli.command('generate-data')
+@click.option('--scale', type=click.Choice(list(datagen.SCALES)), default='1k', show_default=True,
+              help='Preset volumes, named by the number of chat messages.')
+@click.option('--users', type=int, help='Agent accounts (overrides the scale).')
+@click.option('--teams', type=int, help='Teams (overrides the scale).')
+@click.option('--customers', type=int, help='Customers (overrides the scale).')
+@click.option('--inquiries', type=int, help='Inquiries (overrides the scale).')
+@click.option('--sessions', type=int, help='Chat sessions (overrides the scale).')
+@click.option('--messages', type=int, help='Chat messages, spread evenly over the sessions (overrides the scale).')
+@click.option('--notifications', type=int, help='Notifications (overrides the scale).')
+@click.option('--seed', type=int, default=42, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--batch-size', type=int, default=20000, show_default=True, help='Rows per insert statement.')
+@click.option('--days', type=int, default=90, show_default=True, help='Spread the rows over this many days up to today.')
+@click.option('--no-rebuild', is_flag=True, help='Skip rebuilding tags, lead scores, summaries and metrics afterwards.')
+def generate_data_command(scale, seed, batch_size, days, no_rebuild, **overrides):
+    """Bulk-load synthetic users, teams, customers, inquiries, chats and notifications for load testing."""
+    volumes = datagen.scale_volumes(datagen.SCALES[scale])
+    volumes.update({table: count for table, count in overrides.items() if count is not None})
+    started = time.perf_counter()
+    def progress(table, rows):
+        click.echo(f"{rows:>10} {table} ({time.perf_counter() - started:.1f}s)")
+    datagen.generate(volumes, seed=seed, batch_size=batch_size, days=days, progress=progress)
+    click.echo(f"Loaded in {time.perf_counter() - started:.1f}s")
+    if not no_rebuild:
+        started = time.perf_counter()
+        datagen.rebuild_derived_tables(progress=lambda step, result: click.echo(
+            f"Rebuilt {step} ({time.perf_counter() - started:.1f}s)"))
+
+@commands.cli.command('db-upgrade')
+@click.option('--to', 'target', type=int, default=None, help='Stop after this version (default: latest).')
+def db_upgrade_command(target):
+    """Apply pending schema migrations."""
+    try:
+        applied = upgrade_schema(target)
+    except migrations.MigrationError as e:
+        raise click.ClickException(str(e))
+    for migration in applied:
+        click.echo(f"Applied {migration.version}: {migration.description}")
+    click.echo(f"Schema at version {migrations.current_version(db.session.connection())}")
+
+@commands.cli.command('db-downgrade')
+@click.argument('target', type=int)
+def db_downgrade_command(target):
+    """Revert schema migrations above TARGET, newest first."""
+    try:
+        reverted = migrations.downgrade(db.session, MIGRATIONS, target)
+    except migrations.MigrationError as e:
+        raise click.ClickException(str(e))
+    for migration in reverted:
+        click.echo(f"Reverted {migration.version}: {migration.description}")
+    click.echo(f"Schema at version {migrations.current_version(db.session.connection())}")
+
+@commands.cli.command('db-status')
+def db_status_command():
+    """Show the applied schema version and pending migrations."""
+    connection = db.session.connection()
+    click.echo(f"Schema at version {migrations.current_version(connection)}")
+    for migration in migrations.pending(connection, MIGRATIONS):
+        click.echo(f"Pending {migration.version}: {migration.description}")
+
+@commands.cli.command('db-check')
+def db_check_command():
+    """Compare the live tables, columns and indexes with the models; exits 1 on any difference."""
+    differences = migrations.schema_differences(db.session.connection(), db.metadata)
+    for difference in differences:
+        click.echo(difference)
+    if differences:
+        raise SystemExit(1)
+    click.echo('Schema matches the models')
+
+@commands.cli.command('rebuild-metrics')
+def rebuild_metrics_command():
+    """Recompute the daily dashboard metrics from existing data."""
+    click.echo(f"Rebuilt {rebuild_metrics()} metric buckets")
+
+@commands.cli.command('summarize-sessions')
+@click.option('--full', is_flag=True, help='Recompute every session instead of only those with new messages.')
+def summarize_sessions_command(full):
+    """Update the per-session first-response / bot-deflection summaries."""
+    click.echo(f"Summarized {summarize_chat_sessions(full=full)} chat sessions")
+
+# Incremental jobs `flask maintain` runs on every pass (each picks up from its own watermark)
+MAINTENANCE_JOBS = [
+    ('lead scores', refresh_lead_scores),
+    ('session summaries', summarize_chat_sessions),
+    ('FAQ click rollups', rollup_faq_clicks),
+]
+
+@commands.cli.command('maintain')
+@click.option('--every', type=float, default=60, show_default=True, help='Seconds between passes.')
+@click.option('--once', is_flag=True, help='Run a single pass and exit (for cron).')
+def maintain_command(every, once):
+    """Keep the derived stats current: run the incremental background jobs in a loop (render.yaml starts it)."""
+    while True:
+        for name, job in MAINTENANCE_JOBS:
+            try:
+                count = job()
+            except Exception as e:
+                db.session.rollback()
+                click.echo(f"{name} failed: {e}", err=True)
+                continue
+            if count:
+                click.echo(f"{name}: {count}")
+        db.session.remove()
+        if once:
+            return
+        time.sleep(every)
+
+@commands.cli.command('backfill-customer-tags')
+def backfill_customer_tags_command():
+    """Rebuild the customer tag join table from Customer.tags."""
+    processed = backfill_customer_tags()
+    db.session.commit()
+    click.echo(f"Indexed tags for {processed} customers")
+
+@commands.cli.command('backfill-contact-identities')
+def backfill_contact_identities_command():
+    """Rebuild the email/phone identity index from Customer.email and Customer.phone."""
+    processed = backfill_contact_identities()
+    db.session.commit()
+    click.echo(f"Indexed contacts for {processed} customers")
+
+@commands.cli.command('rebuild-customer-summaries')
+def rebuild_customer_summaries_command():
+    """Recompute the per-customer profile aggregates (e.g. after bulk-loading data outside the app)."""
+    refresh_lead_scores()
+    processed = rebuild_customer_summaries()
+    db.session.commit()
+    click.echo(f"Summarised {processed} customers")
+
+@commands.cli.command('resolve-inquiry-reps')
+def resolve_inquiry_reps_command():
+    """Link inquiries whose rep is only known by username or display name to the user."""
+    linked = resolve_inquiry_reps()
+    db.session.commit()
+    click.echo(f"Linked {linked} inquiries to their rep")
+
+@commands.cli.command('rescore-leads')
+def rescore_leads_command():
+    """Rescore every chat session (e.g. after bulk-loading sessions outside the app)."""
+    scored = db.session.get(CacheVersion, LEAD_SCORES)
+    if scored is not None:
+        db.session.delete(scored)
+        db.session.commit()
+    click.echo(f"Rescored {refresh_lead_scores()} chat sessions")
+
+@commands.cli.command('rollup-faq-clicks')
+def rollup_faq_clicks_command():
+    """Fold new FAQ click logs into the daily rollup table (safe to run from cron)."""
+    click.echo(f"Rolled up {rollup_faq_clicks()} FAQ click logs.")
+
+@commands.cli.command('prune-faq-logs')
+@click.option('--keep-days', default=30, show_default=True, help='Keep raw click logs newer than this.')
+def prune_faq_logs_command(keep_days):
+    """Delete raw FAQ click logs that have already been rolled up."""
+    rollup_faq_clicks()
+    click.echo(f"Deleted {prune_faq_logs(keep_days)} FAQ click logs.")
@@ -0,0 +1,99 @@
+"""
+Application settings, read from the environment.
+
+Every setting has a default so a bare checkout runs; deployments override
+them with environment variables of the same name. create_app() loads these
+first and then applies any overrides it was given.
+"""
+import os
+
+from services import engine_profile
+
+
+def load_config(app):
+    # Route areas this process serves, comma separated (see blueprints/__init__.py); empty = all of them
+    app.config['APP_BLUEPRINTS'] = os.environ.get('APP_BLUEPRINTS', '')
+
+    # Database Configuration - use ENV var if available for Render/Cloud deployment
+    app.config['SQLALCHEMY_DATABASE_URI'] = engine_profile.normalize_database_url(os.environ.get('DATABASE_URL', 'sqlite:///database.db'))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Upload Folder Configuration
+    app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', 'static/uploads')
+
+    # How often (seconds) each worker checks whether another worker changed the auto-reply data
+    app.config['AUTO_REPLY_VERSION_CHECK_SECONDS'] = float(os.environ.get('AUTO_REPLY_VERSION_CHECK_SECONDS', 2))
+    # FAQ fallback: how many ranked answers to return and the minimum BM25 score to count as a match
+    app.config['FAQ_MATCH_TOP_K'] = int(os.environ.get('FAQ_MATCH_TOP_K', 3))
+    app.config['FAQ_MATCH_MIN_SCORE'] = float(os.environ.get('FAQ_MATCH_MIN_SCORE', 0.3))
+    # Typo tolerance for template/rule keywords: max edits for long words (5-7 letter words get 1, shorter get 0)
+    app.config['FUZZY_MATCH_MAX_EDITS'] = int(os.environ.get('FUZZY_MATCH_MAX_EDITS', 2))
+    app.config['FUZZY_MATCH_MIN_LENGTH'] = int(os.environ.get('FUZZY_MATCH_MIN_LENGTH', 5))
+    # Per-worker LRU cache of auto-reply results for repeated (normalized) messages; size 0 disables it
+    app.config['REPLY_CACHE_SIZE'] = int(os.environ.get('REPLY_CACHE_SIZE', 2048))
+    app.config['REPLY_CACHE_TTL'] = float(os.environ.get('REPLY_CACHE_TTL', 300))
+    # Template usage / FAQ click counters are buffered in memory and written in batches
+    app.config['USAGE_FLUSH_SECONDS'] = float(os.environ.get('USAGE_FLUSH_SECONDS', 5))
+    app.config['USAGE_FLUSH_MAX_PENDING'] = int(os.environ.get('USAGE_FLUSH_MAX_PENDING', 500))
+    # Seconds a worker reuses the computed dashboard stats
+    app.config['DASHBOARD_STATS_TTL'] = float(os.environ.get('DASHBOARD_STATS_TTL', 10))
+    # List APIs count matching rows exactly up to this many, then report "at least" this many
+    app.config['COUNT_ESTIMATE_CAP'] = int(os.environ.get('COUNT_ESTIMATE_CAP', 10000))
+    # Rows fetched per round trip by the streaming exports
+    app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    # Rows written per transaction by the bulk customer import
+    app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 2000))
+    # Country calling code for phone numbers entered without + or 00 (national numbers)
+    app.config['DEFAULT_COUNTRY_CODE'] = os.environ.get('DEFAULT_COUNTRY_CODE', '60')
+    # How many of the highest scoring leads the dashboard lists
+    app.config['DASHBOARD_LEADS_LIMIT'] = int(os.environ.get('DASHBOARD_LEADS_LIMIT', 60))
+    # Pending lead scores a page rescores before reading them (the rest waits for `flask maintain`); 0 = none
+    app.config['LEAD_SCORE_READ_BATCH'] = int(os.environ.get('LEAD_SCORE_READ_BATCH', 200))
+    # SQLite connection pragmas (see services/engine_profile.py); ignored for other databases
+    app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+    app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'normal')
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+    # PostgreSQL: pool per process (each gunicorn worker holds up to size + overflow connections) and session timeouts
+    app.config['PG_POOL_SIZE'] = int(os.environ.get('PG_POOL_SIZE', 5))
+    app.config['PG_MAX_OVERFLOW'] = int(os.environ.get('PG_MAX_OVERFLOW', 5))
+    app.config['PG_POOL_TIMEOUT'] = float(os.environ.get('PG_POOL_TIMEOUT', 10))
+    app.config['PG_POOL_RECYCLE'] = int(os.environ.get('PG_POOL_RECYCLE', 1800))
+    app.config['PG_STATEMENT_TIMEOUT_MS'] = int(os.environ.get('PG_STATEMENT_TIMEOUT_MS', 15000))
+    app.config['PG_LOCK_TIMEOUT_MS'] = int(os.environ.get('PG_LOCK_TIMEOUT_MS', 5000))
+    app.config['PG_IDLE_IN_TRANSACTION_TIMEOUT_MS'] = int(os.environ.get('PG_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000))
+    # Exports stream for as long as the client downloads; 0 = no statement timeout for them
+    app.config['EXPORT_STATEMENT_TIMEOUT_MS'] = int(os.environ.get('EXPORT_STATEMENT_TIMEOUT_MS', 0))
+    # Write transactions that still find the database locked are rerun this many times, backing off from this delay
+    app.config['WRITE_RETRY_ATTEMPTS'] = int(os.environ.get('WRITE_RETRY_ATTEMPTS', 3))
+    app.config['WRITE_RETRY_BASE_DELAY'] = float(os.environ.get('WRITE_RETRY_BASE_DELAY', 0.05))
+    # A signed-in user's last_active is written at most this often (presence only shows minutes)
+    app.config['LAST_ACTIVE_WRITE_SECONDS'] = int(os.environ.get('LAST_ACTIVE_WRITE_SECONDS', 60))
+
+    app.secret_key = os.environ.get('SECRET_KEY', 'secure_admin_key_2026')
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database (PostgreSQL pool and timeouts; none for SQLite)."""
+    if not config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        return {}
+    return engine_profile.postgres_engine_options(
+        pool_size=config['PG_POOL_SIZE'],
+        max_overflow=config['PG_MAX_OVERFLOW'],
+        pool_timeout=config['PG_POOL_TIMEOUT'],
+        pool_recycle=config['PG_POOL_RECYCLE'],
+        statement_timeout_ms=config['PG_STATEMENT_TIMEOUT_MS'],
+        lock_timeout_ms=config['PG_LOCK_TIMEOUT_MS'],
+        idle_in_transaction_timeout_ms=config['PG_IDLE_IN_TRANSACTION_TIMEOUT_MS'],
+    )
+
+
+def sqlite_pragmas(config):
+    return engine_profile.sqlite_pragmas(
+        journal_mode=config['SQLITE_JOURNAL_MODE'],
+        synchronous=config['SQLITE_SYNCHRONOUS'],
+        busy_timeout_ms=config['SQLITE_BUSY_TIMEOUT_MS'],
+        cache_size_kb=config['SQLITE_CACHE_SIZE_KB'],
+        mmap_size=config['SQLITE_MMAP_SIZE'],
+    )
@@ -0,0 +1,279 @@
+"""
+Synthetic load data for performance testing (`flask generate-data`).
+
+Every row comes from one seeded random generator, so the same volumes, seed
+and end date always produce the same data. Rows are written with Core
+executemany inserts, batch_size at a time; ids are allocated above the
+current maximum so foreign keys need no round trips, and chat text is drawn
+from a pool of pre-built sentences, so a million messages load in seconds.
+
+Core inserts skip the session flush hooks, so rebuild_derived_tables()
+brings the tag, contact identity, lead score, customer summary, daily metric
+and session summary tables up to date afterwards.
+"""
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import (ChatMessage, ChatSession, Customer, Inquiry, LeadScore, Notification, Team, User,
+                    backfill_contact_identities, backfill_customer_tags, rebuild_customer_summaries, rebuild_metrics,
+                    refresh_lead_scores, summarize_chat_sessions)
+from services import engine_profile
+
+WORDS = (
+    "price pricing plan premium enterprise demo trial discount invoice refund billing upgrade "
+    "integration api salesforce support account password login setup onboarding contract "
+    "partnership urgent asap budget cheap free quote delivery shipping order cancel team users"
+).split()
+
+FILLER = "hi hello thanks please can you tell me about the for our we need is there a how much what".split()
+
+FIRST_NAMES = ["Ananya", "Marcus", "Priya", "Jake", "Sara", "Wei", "Nur", "Arjun", "Chloe", "Daniel"]
+LAST_NAMES = ["Chen", "Sharma", "Tan", "Lim", "Williams", "Ravikumar", "Lee", "Wong", "Smith", "Ng"]
+
+STATUSES = ['New', 'In Progress', 'Urgent', 'Resolved']
+TYPES = ['Sales', 'Support', 'Product']
+
+LOCATIONS = ['Singapore', 'Kuala Lumpur', 'Jakarta', 'Bangkok', 'New York', 'London', 'Sydney']
+CUSTOMER_TAGS = ['VIP', 'New', 'Returning', 'Hot Lead', 'Cold Lead', 'Premium', 'Enterprise']
+CUSTOMER_STATUSES = ['Active', 'Active', 'Pending', 'Inactive']
+DEPARTMENTS = ['Sales', 'Support', 'Marketing', 'Success']
+NOTIFICATION_TYPES = [('announcement', '📢'), ('customer', '👤'), ('inquiry', '📩'), ('rule', '⚡')]
+
+# Named scales: total chat messages (scale_volumes derives the rest)
+SCALES = {
+    '1k': 1000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+
+SENTENCE_POOL_BITS = 12  # 4096 pre-built sentences, picked with one getrandbits() call
+
+
+def scale_volumes(messages):
+    """Rows per generated table for a number of chat messages."""
+    users = max(10, min(500, messages // 2000))
+    return {
+        'teams': max(2, users // 10),
+        'users': users,
+        'customers': max(20, messages // 20),
+        'inquiries': max(20, messages // 20),
+        'sessions': max(10, messages // 10),
+        'messages': messages,
+        'notifications': max(50, messages // 10),
+    }
+
+
+def sentence(rng, n_words):
+    words = []
+    for _ in range(n_words):
+        words.append(rng.choice(WORDS) if rng.random() < 0.3 else rng.choice(FILLER))
+    return " ".join(words)
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def next_id(connection, model):
+    table = model.__table__
+    return (connection.execute(db.select(db.func.max(table.c.id))).scalar() or 0) + 1
+
+
+def generate(volumes, seed=42, batch_size=20000, end=None, days=90, password='password', progress=None):
+    """
+    Insert volumes ({'users': n, ...}, as from scale_volumes) of synthetic rows
+    into the current database in one transaction, dated over the days before
+    end (default: today). Generated agents sign in as agent<id> with password.
+    progress(table, rows) is called after each table. Returns {table: rows}.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    span = max(1, days * 24 * 60)  # minutes
+    connection = db.session.connection()
+    engine_profile.set_local_timeouts(connection)
+    counts = {}
+
+    stamps = ({}, {})
+    def at(minute, seconds=False):
+        """Timestamp string for a minute offset from start (cached: a million messages share ~130k minutes)."""
+        cache = stamps[seconds]
+        if minute not in cache:
+            cache[minute] = (start + timedelta(minutes=minute)).strftime('%Y-%m-%d %H:%M:%S' if seconds else '%Y-%m-%d %H:%M')
+        return cache[minute]
+
+    def insert(model, rows):
+        table = model.__table__
+        inserted = 0
+        for batch in batched(rows, batch_size):
+            connection.execute(table.insert(), batch)
+            inserted += len(batch)
+        counts[table.name] = counts.get(table.name, 0) + inserted
+        if progress:
+            progress(table.name, inserted)
+
+    def person():
+        return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+    # --- Teams and agents ---
+    first_team = next_id(connection, Team)
+    team_ids = list(range(first_team, first_team + volumes.get('teams', 0)))
+    insert(Team, ({
+        'id': team_id, 'name': f"Team {team_id}", 'description': sentence(rng, 8),
+        'role': f"{rng.choice(DEPARTMENTS)} Team", 'department': rng.choice(DEPARTMENTS), 'team_score': 0,
+        'team_tag': f"T{team_id}", 'created_at': at(rng.randrange(span))
+    } for team_id in team_ids))
+
+    # One hash for every generated account: hashing per row would dominate the load
+    password_hash = generate_password_hash(password)
+    first_user = next_id(connection, User)
+    agents = []
+    user_rows = []
+    for i in range(volumes.get('users', 0)):
+        user_id = first_user + i
+        name = "%s %s" % person()
+        agents.append((user_id, f"agent{user_id}", name))
+        user_rows.append({
+            'id': user_id, 'username': f"agent{user_id}", 'password': password_hash, 'name': name, 'bio': '',
+            'role': 'super_admin' if i % 25 == 24 else 'agent',
+            'team_id': team_ids[i % len(team_ids)] if team_ids else None,
+            'team_role': ('leader' if i < len(team_ids) else 'member') if team_ids else None,
+            'preferences': '{}', 'last_active': at(span - rng.randrange(60 * 24), seconds=True)
+        })
+    insert(User, user_rows)
+    if not agents:
+        # Assign work to the accounts that already exist
+        agents = [tuple(row) for row in connection.execute(db.select(User.id, User.username, User.name))]
+
+    # --- Customers and inquiries ---
+    first_customer = next_id(connection, Customer)
+    customers = []
+    customer_rows = []
+    for i in range(volumes.get('customers', 0)):
+        customer_id = first_customer + i
+        first, last = person()
+        created = rng.randrange(span)
+        customers.append((customer_id, f"{first} {last}", f"{first}.{last}{customer_id}@example.com".lower()))
+        customer_rows.append({
+            'id': customer_id, 'name': customers[-1][1], 'email': customers[-1][2],
+            'phone': f"+6012{customer_id % 10_000_000:07d}", 'location': rng.choice(LOCATIONS),
+            'assigned_staff': rng.choice(agents)[2] if agents else None, 'status': rng.choice(CUSTOMER_STATUSES),
+            'tags': ','.join(rng.sample(CUSTOMER_TAGS, rng.randint(0, 2))), 'notes': '',
+            'created_at': at(created), 'created_by': 'generate-data',
+            'last_contact': at(min(span - 1, created + rng.randrange(60 * 24 * 7)))
+        })
+    insert(Customer, customer_rows)
+
+    def inquiry_rows():
+        for _ in range(volumes.get('inquiries', 0)):
+            customer_id, customer_name, _email = rng.choice(customers) if customers else (None, "%s %s" % person(), None)
+            agent_id, username, _name = rng.choice(agents) if agents else (None, None, None)
+            created = rng.randrange(span)
+            yield {
+                'customer': customer_name, 'customer_id': customer_id, 'assigned_rep': username,
+                'assigned_user_id': agent_id, 'inquiry_type': rng.choice(TYPES), 'status': rng.choice(STATUSES),
+                'description': sentence(rng, 12), 'created_at': at(created), 'created_by': 'generate-data',
+                'updated_at': at(min(span - 1, created + rng.randrange(60 * 24)))
+            }
+    insert(Inquiry, inquiry_rows())
+
+    # --- Chat sessions and messages ---
+    # Each session gets messages // sessions messages (the first sessions one more);
+    # a third are linked to a customer and half are taken over by an agent
+    n_sessions = volumes.get('sessions', 0)
+    n_messages = volumes.get('messages', 0) if n_sessions else 0
+    per_session, extra = divmod(n_messages, n_sessions) if n_sessions else (0, 0)
+    first_session = next_id(connection, ChatSession)
+    sessions = []
+    session_rows = []
+    for i in range(n_sessions):
+        session_id = first_session + i
+        created = rng.randrange(span)
+        length = per_session + (1 if i < extra else 0)
+        customer = rng.choice(customers) if customers and rng.random() < 0.33 else None
+        agent = rng.choice(agents) if agents and rng.random() < 0.5 else None
+        visitor = customer[1] if customer else "%s %s" % person()
+        sessions.append((session_id, visitor, agent, created, length))
+        status = 'bot' if agent is None else ('closed' if rng.random() < 0.3 else 'agent_active')
+        session_rows.append({
+            'id': session_id, 'visitor_name': visitor,
+            'visitor_email': customer[2] if customer else f"visitor{session_id}@example.com",
+            'status': status, 'linked_customer_id': customer[0] if customer else None,
+            'assigned_agent_id': agent[0] if agent else None,
+            'created_at': at(created), 'updated_at': at(min(span - 1, created + length)),
+            'tags': '', 'archived': status == 'closed' and rng.random() < 0.5, 'pinned': False,
+            'transfer_status': 'none'
+        })
+    insert(ChatSession, session_rows)
+    # Queue every new session for scoring, as mark_lead_scores_pending would
+    insert(LeadScore, ({'session_id': session[0], 'score': 0, 'pending': 1} for session in sessions))
+
+    pool = [sentence(rng, rng.randint(4, 16)) for _ in range(1 << SENTENCE_POOL_BITS)]
+    pick = rng.getrandbits
+    def message_rows():
+        for session_id, visitor, agent, created, length in sessions:
+            takeover = rng.randint(3, 6) if agent else length
+            for j in range(length):
+                if j == 0:
+                    sender = ('bot', 'Chatbot', 'Hello! 👋 Welcome to our support. How can I help you today?')
+                elif j == takeover:
+                    sender = ('system', 'System', f"🟢 {agent[2]} has taken over this conversation.")
+                elif j % 2:
+                    sender = ('customer', visitor, pool[pick(SENTENCE_POOL_BITS)])
+                elif j > takeover:
+                    sender = ('agent', agent[2], pool[pick(SENTENCE_POOL_BITS)])
+                else:
+                    sender = ('bot', 'Chatbot', pool[pick(SENTENCE_POOL_BITS)])
+                yield {'session_id': session_id, 'sender_type': sender[0], 'sender_name': sender[1],
+                       'text': sender[2], 'timestamp': at(created + j, seconds=True)}
+    insert(ChatMessage, message_rows())
+
+    # --- Notifications ---
+    recipients = [agent[0] for agent in agents]
+    def notification_rows():
+        for _ in range(volumes.get('notifications', 0) if recipients else 0):
+            kind, icon = rng.choice(NOTIFICATION_TYPES)
+            yield {
+                'user_id': rng.choice(recipients), 'type': kind, 'title': f"New {kind}", 'message': pool[pick(SENTENCE_POOL_BITS)],
+                'icon': icon, 'created_by': 'System', 'created_at': at(rng.randrange(span)),
+                'is_read': rng.random() < 0.7
+            }
+    insert(Notification, notification_rows())
+
+    engine_profile.sync_sequences(connection, [Team.__table__, User.__table__, Customer.__table__,
+                                               Inquiry.__table__, ChatSession.__table__])
+    db.session.commit()
+    return counts
+
+
+def rebuild_derived_tables(progress=None):
+    """
+    Rebuild everything the flush hooks would have kept up to date for rows
+    inserted with Core statements. progress(step, result) is called after
+    each step. Returns {step: result of its rebuild function}.
+    """
+    steps = [
+        ('customer tags', backfill_customer_tags),
+        ('contact identities', backfill_contact_identities),
+        ('lead scores', refresh_lead_scores),
+        ('customer summaries', rebuild_customer_summaries),
+        ('daily metrics', rebuild_metrics),
+        ('session summaries', summarize_chat_sessions),
+    ]
+    results = {}
+    for name, rebuild in steps:
+        results[name] = rebuild()
+        db.session.commit()
+        if progress:
+            progress(name, results[name])
+    return results
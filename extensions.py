@@ -0,0 +1,7 @@
+"""
+Flask extension objects, created unbound so models and blueprints can import
+them without an application; create_app() binds them with init_app().
+"""
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
@@ -0,0 +1,19 @@
+# Picked up automatically by `gunicorn app:app` (see render.yaml)
+import sys
+
+
+def post_fork(server, worker):
+    # With preload_app the master has already imported app (and opened pooled
+    # connections); each worker must start with a pool of its own
+    if 'app' in sys.modules:
+        from app import app, db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # Write buffered template usage / FAQ click counters before the worker goes away
+    # (only processes serving the auto_reply blueprint have any)
+    auto_reply = sys.modules.get('blueprints.auto_reply')
+    if auto_reply is not None:
+        auto_reply.usage_counters.shutdown()
@@ -1,11 +1,14 @@
-from app import app, db, Customer, Inquiry, Rule, Message
+from app import app, db
+from models import Customer, Inquiry, Rule, Message
+from schema import upgrade_schema
 import random
 
-def seed_data():
+def seed_data(seed=42):
+    rng = random.Random(seed)  # same seed, same data
     with app.app_context():
         # 1. Clear existing data so we don't get duplicates
         db.drop_all()
-        db.create_all()
+        upgrade_schema()
 
         print("Creating fresh database...")
 
@@ -17,20 +20,19 @@ def seed_data():
 
         customers = []
         for i in range(12):  # Create 12 fake customers
-            f = random.choice(first_names)
-            l = random.choice(last_names)
+            f = rng.choice(first_names)
+            l = rng.choice(last_names)
             name = f"{f} {l}"
             c = Customer(
                 name=name,
-                email=f"{f.lower()}.{l.lower()}@example.com",
-                phone=f"+65 {random.randint(80000000, 99999999)}",
-                location=random.choice(locations),
-                assigned_staff=random.choice(["Karina", "Winter", "Giselle"]),
-                status=random.choice(["Active", "Pending", "Inactive"]),
-                tags=",".join(random.sample(tags_options, random.randint(1, 3))),
+                email=f"{f.lower()}.{l.lower()}{i}@example.com",
+                phone=f"+65 {rng.randint(80000000, 99999999)}",
+                location=rng.choice(locations),
+                assigned_staff=rng.choice(["Karina", "Winter", "Giselle"]),
+                status=rng.choice(["Active", "Pending", "Inactive"]),
+                tags=",".join(rng.sample(tags_options, rng.randint(1, 3))),
                 notes="Met at the regional conference last month."
             )
-            db.session.add(c)
             customers.append(c)
 
         # --- SEED RULES (Lead Scoring) ---
@@ -39,31 +41,26 @@ def seed_data():
             Rule(name="Budget Alert", keywords="cheap, discount, free", score=20, operation="-"),
             Rule(name="Urgent Inquiry", keywords="asap, immediately, urgent", score=30, operation="+"),
         ]
-        for r in rules:
-            db.session.add(r)
+        db.session.add_all(customers + rules)
 
         # --- SEED INQUIRIES & MESSAGES ---
         for i in range(5):
-            cust = random.choice(customers)
+            cust = rng.choice(customers)
             inq = Inquiry(
                 customer=cust.name,
                 assigned_rep=cust.assigned_staff,
-                inquiry_type=random.choice(["Sales", "Support", "Product"]),
-                status=random.choice(["New", "In Progress", "Urgent"]),
-                description="User is asking about pricing tiers and API integration limits."
+                inquiry_type=rng.choice(["Sales", "Support", "Product"]),
+                status=rng.choice(["New", "In Progress", "Urgent"]),
+                description="User is asking about pricing tiers and API integration limits.",
+                # A welcome message on each inquiry, inserted with it in the same flush
+                messages=[Message(
+                    sender="System",
+                    text=f"Welcome {cust.name}! How can we help you today?",
+                    time="10:00 AM",
+                    is_agent=True
+                )]
             )
             db.session.add(inq)
-            db.session.flush() # Gets the ID for the inquiry
-
-            # Add a welcome message to each inquiry
-            msg = Message(
-                inquiry_id=inq.id,
-                sender="System",
-                text=f"Welcome {cust.name}! How can we help you today?",
-                time="10:00 AM",
-                is_agent=True
-            )
-            db.session.add(msg)
 
         db.session.commit()
         print("Database Seeded Successfully! 🚀")
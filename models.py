@@ -0,0 +1,1470 @@
+"""
+Database models and the data-layer logic bound to them.
+
+Besides the model classes this holds everything that runs inside a flush or
+a maintenance job rather than a request: the session flush hooks that keep
+the derived tables (tags, contact identities, summaries, lead scores, daily
+metrics) in step, and the batch rebuilds behind the CLI commands. Nothing
+here needs an application until a query runs, so importing it is cheap.
+"""
+import logging
+from datetime import datetime
+
+from flask import current_app, has_request_context, session
+from sqlalchemy import event, or_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from services import contacts, engine_profile, metrics, session_analytics
+from services.scoring import CompiledRules
+from services.versioned import VersionedCache
+
+logger = logging.getLogger(__name__)
+
+
+def pg_trgm_installed(ddl, target, bind, **kw):
+    return bind is not None and engine_profile.has_extension(bind, 'pg_trgm')
+
+def trigram_index(name, column):
+    """GIN trigram index serving ilike '%term%' searches; PostgreSQL with pg_trgm only."""
+    column_name = getattr(column, 'name', column)
+    return (db.Index(name, column, postgresql_using='gin', postgresql_ops={column_name: 'gin_trgm_ops'})
+            .ddl_if(dialect='postgresql', callable_=pg_trgm_installed))
+
+# --- 1. MODELS (All models must be defined before create_all) ---
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    name = db.Column(db.String(100), default='Admin')
+    bio = db.Column(db.Text, default='')
+    profile_picture = db.Column(db.String(200), default='https://ui-avatars.com/api/?name=Admin&background=random')
+    role = db.Column(db.String(20), default='agent') # super_admin, agent
+    preferences = db.Column(db.Text, default='{}') # Stores dashboard layout/stats as JSON
+    last_active = db.Column(db.String(50))
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=True, index=True)
+    team_role = db.Column(db.String(20)) # leader, vice_leader, member
+    last_active_team_chat = db.Column(db.String(50)) # Timestamp of last time user viewed team chat
+
+    @property
+    def is_online(self):
+        return self.status_display == "Active"
+
+    @property
+    def status_display(self):
+        if not self.last_active:
+            return "Inactive"
+        try:
+            from datetime import datetime
+            last = datetime.strptime(self.last_active, '%Y-%m-%d %H:%M:%S')
+            now = datetime.now()
+            diff = now - last
+            minutes = divmod(diff.total_seconds(), 60)[0]
+            
+            if minutes < 5:
+                return "Active"
+            elif minutes < 60:
+                return f"Last active {int(minutes)} mins ago"
+            elif minutes < 1440:
+                return f"Last active {int(minutes // 60)} hours ago"
+            else:
+                return f"Last active {int(minutes // 1440)} days ago"
+        except:
+            return "Inactive"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class PromotionRequest(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    target_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    requester_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), default='pending') # pending, approved, rejected
+    approvals = db.Column(db.Text, default='[]') # JSON list of user_ids who approved
+    created_at = db.Column(db.String(50))
+    target_role = db.Column(db.String(20), default='super_admin')
+    
+    target_user = db.relationship('User', foreign_keys=[target_user_id], backref='promotion_requests')
+    requester = db.relationship('User', foreign_keys=[requester_id], backref='sent_promotion_requests')
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class Team(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    profile_picture = db.Column(db.String(255), default='https://ui-avatars.com/api/?name=Team&background=random')
+    description = db.Column(db.Text, default='')
+    role = db.Column(db.String(50)) # e.g., "Corporate Sales", "Customer Support"
+    department = db.Column(db.String(50))
+    team_score = db.Column(db.Integer, default=0)
+    team_tag = db.Column(db.String(50))
+    created_at = db.Column(db.String(50))
+    
+    # Relationship to members
+    members = db.relationship('User', backref='team_obj', foreign_keys='User.team_id', lazy=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class TeamRequest(db.Model):
+    __table_args__ = (db.Index('ix_team_request_team_status', 'team_id', 'status'),
+                      db.Index('ix_team_request_user_status', 'user_id', 'status'))
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=True) # nullable if it's a request to leave? No, leave is automatic. 
+    requester_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    type = db.Column(db.String(20)) # join, move, invite
+    status = db.Column(db.String(20), default='pending') # pending, approved, rejected
+    created_at = db.Column(db.String(50))
+    
+    target_user = db.relationship('User', foreign_keys=[user_id], backref='team_requests')
+    target_team = db.relationship('Team', backref='team_requests')
+    requester = db.relationship('User', foreign_keys=[requester_id], backref='initiated_team_requests')
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class Rule(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    keywords = db.Column(db.String(200), nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False, default='+') 
+    active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.String(50))
+    created_by = db.Column(db.String(100))
+    updated_at = db.Column(db.String(50))
+    updated_by = db.Column(db.String(100))
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class Inquiry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    customer = db.Column(db.String(100), nullable=False)
+    assigned_rep = db.Column(db.String(50))
+    inquiry_type = db.Column(db.String(50))
+    status = db.Column(db.String(20), default='New')
+    description = db.Column(db.Text)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.String(50))
+    created_by = db.Column(db.String(100))
+    updated_at = db.Column(db.String(50))
+    updated_by = db.Column(db.String(100))
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)
+    # The rep as a user; assigned_rep keeps the username the forms send (see resolve_inquiry_reps)
+    assigned_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
+    
+    messages = db.relationship('Message', backref='inquiry', cascade="all, delete-orphan")
+    linked_customer = db.relationship('Customer', backref='inquiries')
+    assigned_user = db.relationship('User', foreign_keys=[assigned_user_id])
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+# Repository sort orders (see get_inquiries); each has an index ending in id for keyset paging
+INQUIRY_SORTS = {
+    'id': Inquiry.id,
+    'customer': Inquiry.customer,
+    'status': db.func.coalesce(Inquiry.status, db.literal_column("''")),
+    'created': db.func.coalesce(Inquiry.created_at, db.literal_column("''")),
+    'updated': db.func.coalesce(Inquiry.updated_at, db.literal_column("''")),
+}
+db.Index('ix_inquiry_customer_name_id', INQUIRY_SORTS['customer'], Inquiry.id)
+db.Index('ix_inquiry_status_id', INQUIRY_SORTS['status'], Inquiry.id)
+db.Index('ix_inquiry_created_id', INQUIRY_SORTS['created'], Inquiry.id)
+db.Index('ix_inquiry_updated_id', INQUIRY_SORTS['updated'], Inquiry.id)
+db.Index('ix_inquiry_status', Inquiry.status)
+db.Index('ix_inquiry_type', Inquiry.inquiry_type)
+# Repository and global search: ilike on customer, rep and description
+trigram_index('ix_inquiry_customer_trgm', Inquiry.customer)
+trigram_index('ix_inquiry_assigned_rep_trgm', Inquiry.assigned_rep)
+trigram_index('ix_inquiry_description_trgm', Inquiry.description)
+
+INQUIRY_STATUS_POINTS = {'New': 1, 'In Progress': 3, 'Urgent': 5, 'Resolved': 0}
+INQUIRY_TYPE_POINTS = {'Sales': 4, 'Support': 2, 'Product': 3}
+
+def workload_score(user_ids):
+    """
+    Score for the inquiries and chats assigned to these users:
+    - each inquiry: status points + type points
+    - each chat: 6, plus its lead score / 10 rounded up when positive
+    """
+    import math
+
+    if not user_ids:
+        return 0
+    total_score = 0
+
+    # 1. Inquiries, counted per (status, type) through the assigned user index
+    for status, inquiry_type, count in (db.session.query(Inquiry.status, Inquiry.inquiry_type, db.func.count(Inquiry.id))
+                                        .filter(Inquiry.assigned_user_id.in_(user_ids))
+                                        .group_by(Inquiry.status, Inquiry.inquiry_type)):
+        total_score += count * (INQUIRY_STATUS_POINTS.get(status, 0) + INQUIRY_TYPE_POINTS.get(inquiry_type, 0))
+
+    # 2. Chat sessions, with their stored lead scores
+    catch_up_lead_scores()
+    chats = db.session.query(db.func.count(ChatSession.id)).filter(ChatSession.assigned_agent_id.in_(user_ids)).scalar()
+    total_score += 6 * chats
+    lead_scores = (db.session.query(LeadScore.score)
+                   .join(ChatSession, ChatSession.id == LeadScore.session_id)
+                   .filter(ChatSession.assigned_agent_id.in_(user_ids), LeadScore.score > 0))
+    for (score,) in lead_scores:
+        total_score += math.ceil(score / 10)
+
+    return total_score
+
+def calculate_team_score(team_id):
+    """
+    Calculate team score based on:
+    - Inquiries assigned to team members (status + type points)
+    - Chat sessions assigned to team members (6 base + lead score/10)
+    """
+    if not Team.query.get(team_id):
+        return 0
+    member_ids = [user_id for (user_id,) in db.session.query(User.id).filter_by(team_id=team_id)]
+    return workload_score(member_ids)
+
+def calculate_agent_score(user_id):
+    """
+    Calculate individual agent score based on:
+    - Inquiries assigned to the agent (status + type points)
+    - Chat sessions assigned to the agent (6 base + lead score/10)
+    """
+    if not User.query.get(user_id):
+        return 0
+    return workload_score([user_id])
+
+class Message(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    inquiry_id = db.Column(db.Integer, db.ForeignKey('inquiry.id'), nullable=False, index=True)
+    sender = db.Column(db.String(50))
+    text = db.Column(db.Text)
+    time = db.Column(db.String(50))
+    is_agent = db.Column(db.Boolean, default=False)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class TeamMessage(db.Model):
+    # Team chat reads "this team's messages after id N"
+    __table_args__ = (db.Index('ix_team_message_team_id', 'team_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.String(50)) 
+    
+    user = db.relationship('User', backref='team_messages')
+    team = db.relationship('Team', backref='messages')
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class Customer(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True)
+    phone = db.Column(db.String(20))
+    location = db.Column(db.String(100))
+    assigned_staff = db.Column(db.String(100))
+    status = db.Column(db.String(50), default="Active")
+    tags = db.Column(db.String(200)) # Stored as "VIP,New,Returning"
+    notes = db.Column(db.Text)
+    last_contact = db.Column(db.String(50))
+    created_at = db.Column(db.String(50))
+    created_by = db.Column(db.String(100))
+    updated_at = db.Column(db.String(50))
+    updated_by = db.Column(db.String(100))
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+# Directory sort orders (see api_customer_directory); each has an index ending in id for keyset paging.
+# Nullable columns sort as '' so the index expression and the ORDER BY are identical.
+CUSTOMER_SORTS = {
+    'id': Customer.id,
+    'name': Customer.name,
+    'last_contact': db.func.coalesce(Customer.last_contact, db.literal_column("''")),
+    'created': db.func.coalesce(Customer.created_at, db.literal_column("''")),
+}
+db.Index('ix_customer_name_id', CUSTOMER_SORTS['name'], Customer.id)
+db.Index('ix_customer_last_contact_id', CUSTOMER_SORTS['last_contact'], Customer.id)
+db.Index('ix_customer_created_id', CUSTOMER_SORTS['created'], Customer.id)
+db.Index('ix_customer_status', Customer.status)
+db.Index('ix_customer_location', Customer.location)
+trigram_index('ix_customer_name_trgm', Customer.name)
+trigram_index('ix_customer_email_trgm', Customer.email)
+
+class Tag(db.Model):
+    # Normalized customer tags; customer_count is maintained by sync_customer_tags
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    customer_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class CustomerTag(db.Model):
+    # Join table mirroring Customer.tags, so tag filters are indexed lookups
+    __table_args__ = (db.Index('ix_customer_tag_tag_customer', 'tag_id', 'customer_id'),)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class ContactIdentity(db.Model):
+    # Normalised email / E.164 phone -> customer, one customer per identifier (see sync_contact_identities)
+    __table_args__ = (db.UniqueConstraint('kind', 'value', name='uq_contact_identity'),)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # email, phone
+    value = db.Column(db.String(120), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False, index=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class AutoReplyTemplate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    usage_count = db.Column(db.Integer, default=0)
+    keywords = db.Column(db.Text)  # Stored as comma-separated string
+    created_at = db.Column(db.String(50))
+    created_by = db.Column(db.String(100))
+    updated_at = db.Column(db.String(50))
+    updated_by = db.Column(db.String(100))
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class FAQ(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    question = db.Column(db.String(200), nullable=False)
+    answer = db.Column(db.Text, nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    click_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.String(50))
+    created_by = db.Column(db.String(100))
+    updated_at = db.Column(db.String(50))
+    updated_by = db.Column(db.String(100))
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class FAQLog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    faq_id = db.Column(db.Integer, db.ForeignKey('faq.id'))
+    clicked_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class FAQDailyStat(db.Model):
+    # Per-FAQ, per-day click totals rolled up from FAQLog (see rollup_faq_clicks)
+    __table_args__ = (db.UniqueConstraint('faq_id', 'day', name='uq_faq_daily_stat'),)
+    id = db.Column(db.Integer, primary_key=True)
+    faq_id = db.Column(db.Integer, db.ForeignKey('faq.id'), nullable=False, index=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    clicks = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class RollupWatermark(db.Model):
+    # Highest source row id already folded into a rollup table
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class CacheVersion(db.Model):
+    # Shared version stamps so every worker knows when its in-memory caches are stale
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class MetricDaily(db.Model):
+    # One row per metric per day: number of events and the sum of their values (see services/metrics.py)
+    __table_args__ = (db.UniqueConstraint('metric', 'day', name='uq_metric_daily'),)
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(40), nullable=False)
+    day = db.Column(db.Date, nullable=False, index=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class LeadScore(db.Model):
+    # Stored lead score per chat session; pending counts changes not yet rescored (see refresh_lead_scores)
+    session_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    score = db.Column(db.Float, nullable=False, default=0, index=True)
+    pending = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class ChatSessionSummary(db.Model):
+    # Response analytics per chat session, written by summarize_chat_sessions()
+    session_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    agent_id = db.Column(db.Integer, index=True)
+    day = db.Column(db.Date, index=True)
+    customer_messages = db.Column(db.Integer, nullable=False, default=0)
+    bot_messages = db.Column(db.Integer, nullable=False, default=0)
+    agent_messages = db.Column(db.Integer, nullable=False, default=0)
+    first_response_seconds = db.Column(db.Float)
+    takeover_delay_seconds = db.Column(db.Float)
+    bot_only = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class CustomerSummary(db.Model):
+    # Per-customer aggregates for the profile pages, kept current by refresh_customer_summaries
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), primary_key=True, autoincrement=False)
+    lead_score = db.Column(db.Float, nullable=False, default=0)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    open_inquiries = db.Column(db.Integer, nullable=False, default=0)
+    active_agent_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    last_contact = db.Column(db.String(50))
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class Announcement(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(150), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    priority = db.Column(db.String(20), nullable=False, default='normal')  # low, normal, high, urgent
+    created_at = db.Column(db.String(50))
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class ChatSession(db.Model):
+    # The inbox lists by (archived, pinned desc, id desc); the dashboard by (archived, updated_at desc)
+    __table_args__ = (db.Index('ix_chat_session_list', 'archived', 'pinned', 'id'),
+                      db.Index('ix_chat_session_archived_updated', 'archived', 'updated_at'),
+                      db.Index('ix_chat_session_assigned_agent', 'assigned_agent_id', 'transfer_status'),
+                      trigram_index('ix_chat_session_visitor_name_trgm', 'visitor_name'))
+    id = db.Column(db.Integer, primary_key=True)
+    visitor_name = db.Column(db.String(100), nullable=False)
+    visitor_email = db.Column(db.String(120))
+    visitor_phone = db.Column(db.String(20))  # E.164; phone channels such as WhatsApp key chats by it
+    status = db.Column(db.String(20), default='bot')  # bot, agent_active, closed
+    linked_customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True, index=True)
+    linked_inquiry_id = db.Column(db.Integer, db.ForeignKey('inquiry.id'), nullable=True, index=True)
+    created_at = db.Column(db.String(50))
+    updated_at = db.Column(db.String(50))
+    tags = db.Column(db.String(200), default='')  # comma-separated: impt,waiting,completed
+    archived = db.Column(db.Boolean, default=False)
+    pinned = db.Column(db.Boolean, default=False)
+    assigned_agent_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    requested_agent_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    transfer_status = db.Column(db.String(20), default='none')  # none, pending
+    chat_messages = db.relationship('ChatMessage', backref='session', cascade="all, delete-orphan", order_by='ChatMessage.id')
+    linked_customer = db.relationship('Customer', backref='chat_sessions')
+    linked_inquiry = db.relationship('Inquiry', backref='chat_sessions')
+    assigned_agent = db.relationship('User', foreign_keys=[assigned_agent_id], backref='assigned_chats')
+    requested_agent = db.relationship('User', foreign_keys=[requested_agent_id], backref='requested_chats')
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class ChatMessage(db.Model):
+    # Messages are always read per session in id order
+    __table_args__ = (db.Index('ix_chat_message_session_id', 'session_id', 'id'),
+                      trigram_index('ix_chat_message_text_trgm', 'text'))
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
+    sender_type = db.Column(db.String(20), nullable=False)  # customer, bot, agent, system
+    sender_name = db.Column(db.String(100))
+    text = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.String(50))
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+class Notification(db.Model):
+    # The bell lists a user's recent notifications newest first
+    __table_args__ = (db.Index('ix_notification_user_id', 'user_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    type = db.Column(db.String(30), nullable=False)  # announcement, customer, inquiry, rule
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    icon = db.Column(db.String(10), default='🔔')
+    created_by = db.Column(db.String(100), default='System')
+    created_at = db.Column(db.String(50))
+    is_read = db.Column(db.Boolean, default=False)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+# Helper to create notifications
+# Helper to create notifications
+def create_notification(notif_type, title, message, icon='🔔', created_by=None, target_user_id=None, target_roles=None):
+    if created_by is None:
+        created_by = session.get('user_name', 'System') if has_request_context() else 'System'
+    
+    from datetime import datetime
+    now = datetime.now().strftime('%Y-%m-%d %H:%M')
+    
+    u_ids = []
+    if target_user_id:
+        u_ids = [target_user_id]
+    elif target_roles:
+        # Target specific roles
+        users = User.query.filter(User.role.in_(target_roles)).all()
+        u_ids = [u.id for u in users]
+    else:
+        # Broadcast to all registered users
+        u_ids = [u.id for u in User.query.all()]
+        
+    for uid in u_ids:
+        # Avoid duplicate notifications if logic overlaps, though set() would require hashable items
+        notif = Notification(
+            user_id=uid,
+            type=notif_type,
+            title=title,
+            message=message,
+            icon=icon,
+            created_by=created_by,
+            created_at=now
+        )
+        db.session.add(notif)
+    
+    db.session.commit()
+
+# Helpers for the shared cache version stamps
+def get_cache_version(name):
+    row = db.session.get(CacheVersion, name)
+    return row.version if row else 0
+
+def bump_cache_version(name):
+    """Increment a shared version stamp so other workers drop their cached copy. Returns the new version."""
+    try:
+        updated = CacheVersion.query.filter_by(name=name).update({CacheVersion.version: CacheVersion.version + 1})
+        if not updated:
+            db.session.add(CacheVersion(name=name, version=1))
+        db.session.commit()
+    except IntegrityError:
+        # Another worker inserted the row first
+        db.session.rollback()
+        CacheVersion.query.filter_by(name=name).update({CacheVersion.version: CacheVersion.version + 1})
+        db.session.commit()
+    return get_cache_version(name)
+
+def upsert_add(table, keys, rows, connection=None):
+    """
+    Insert rows into table, adding the non-key columns onto any existing row
+    with the same key columns. Runs in the current transaction.
+    """
+    if not rows:
+        return
+    conn = connection if connection is not None else db.session.connection()
+    columns = [c for c in rows[0] if c not in keys]
+    insert = dialect_insert(conn)
+    if insert is not None:
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={c: table.c[c] + stmt.excluded[c] for c in columns}
+        )
+        conn.execute(stmt, rows)
+        return
+    # Generic fallback: update existing rows, insert the rest
+    for row in rows:
+        match = db.and_(*(table.c[k] == row[k] for k in keys))
+        updated = conn.execute(table.update().where(match).values({c: table.c[c] + row[c] for c in columns}))
+        if not updated.rowcount:
+            conn.execute(table.insert(), [row])
+
+def insert_missing(table, keys, rows, connection=None):
+    """Insert the rows whose key columns are not taken yet; existing rows are left alone."""
+    if not rows:
+        return
+    conn = connection if connection is not None else db.session.connection()
+    insert = dialect_insert(conn)
+    if insert is not None:
+        conn.execute(insert(table).on_conflict_do_nothing(index_elements=keys), rows)
+        return
+    for row in rows:
+        match = db.and_(*(table.c[k] == row[k] for k in keys))
+        if conn.execute(db.select(db.literal(1)).where(match).limit(1)).first() is None:
+            conn.execute(table.insert(), [row])
+
+def dialect_insert(connection):
+    """The dialect's insert() with ON CONFLICT support, or None to use the generic fallbacks."""
+    if connection.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    return None
+
+def run_write(work):
+    """
+    Run work() and commit as one transaction. If SQLite reports the database
+    locked, roll back and run it again (bounded, with backoff), so work must
+    be safe to repeat: re-read what it needs instead of closing over results.
+    """
+    def attempt():
+        result = work()
+        db.session.commit()
+        return result
+    return engine_profile.retry_on_lock(attempt, db.session.rollback,
+                                        attempts=current_app.config['WRITE_RETRY_ATTEMPTS'],
+                                        base_delay=current_app.config['WRITE_RETRY_BASE_DELAY'])
+
+# --- DAILY METRICS ---
+# Leads, new customers, conversions and agent response times are counted into
+# MetricDaily as the rows are flushed, in the same transaction, so the
+# dashboard graphs never have to scan sessions or messages.
+
+def metric_day(value, default=None):
+    parsed = metrics.parse_timestamp(value)
+    return (parsed or default or datetime.now()).date()
+
+def waiting_since(connection, message):
+    """Timestamp of the oldest visitor message in the session not yet answered before this agent message."""
+    table = ChatMessage.__table__
+    last_reply = (db.select(db.func.max(table.c.id))
+                  .where(table.c.session_id == message.session_id,
+                         table.c.sender_type == 'agent',
+                         table.c.id < message.id)
+                  .scalar_subquery())
+    return connection.execute(
+        db.select(table.c.timestamp)
+        .where(table.c.session_id == message.session_id,
+               table.c.sender_type == 'customer',
+               table.c.id > db.func.coalesce(last_reply, 0),
+               table.c.id < message.id)
+        .order_by(table.c.id)
+        .limit(1)
+    ).scalar()
+
+@event.listens_for(db.session, 'after_flush')
+def record_flush_metrics(flush_session, flush_context):
+    buckets = metrics.MetricBuckets()
+    connection = None
+    for obj in flush_session.new:
+        if isinstance(obj, ChatSession):
+            # Sessions opened from the CRM for an existing customer are not leads
+            if obj.linked_customer_id is None:
+                buckets.add(metrics.LEADS, metric_day(obj.created_at))
+        elif isinstance(obj, Customer):
+            buckets.add(metrics.NEW_CUSTOMERS, metric_day(obj.created_at))
+        elif isinstance(obj, ChatMessage) and obj.sender_type == 'agent':
+            if connection is None:
+                connection = flush_session.connection()
+            replied_at = metrics.parse_timestamp(obj.timestamp) or datetime.now()
+            waited = metrics.parse_timestamp(waiting_since(connection, obj), default_date=replied_at.date())
+            minutes = metrics.response_minutes(waited, replied_at)
+            if minutes is not None:
+                buckets.add(metrics.RESPONSE_TIME, replied_at, minutes)
+    for obj in flush_session.dirty:
+        if isinstance(obj, ChatSession):
+            history = db.inspect(obj).attrs.linked_customer_id.history
+            if history.added and history.added[0] is not None and not any(history.deleted):
+                buckets.add(metrics.CONVERSIONS, metric_day(obj.updated_at))
+    if buckets:
+        upsert_add(MetricDaily.__table__, ['metric', 'day'], buckets.rows(),
+                   connection=connection or flush_session.connection())
+
+@event.listens_for(db.session, 'after_flush')
+def mark_lead_scores_pending(flush_session, flush_context):
+    """Queue sessions whose visitor text changed for rescoring (see refresh_lead_scores)."""
+    changed, removed = set(), set()
+    for obj in flush_session.new:
+        if isinstance(obj, ChatSession):
+            changed.add(obj.id)
+        elif isinstance(obj, ChatMessage) and obj.sender_type == 'customer':
+            changed.add(obj.session_id)
+    for obj in flush_session.dirty:
+        if isinstance(obj, ChatMessage) and obj.sender_type == 'customer' and flush_session.is_modified(obj):
+            changed.add(obj.session_id)
+    for obj in flush_session.deleted:
+        if isinstance(obj, ChatSession):
+            removed.add(obj.id)
+        elif isinstance(obj, ChatMessage) and obj.sender_type == 'customer':
+            changed.add(obj.session_id)
+    changed -= removed
+    if not changed and not removed:
+        return
+    table = LeadScore.__table__
+    connection = flush_session.connection()
+    if removed:
+        connection.execute(table.delete().where(table.c.session_id.in_(removed)))
+    if changed:
+        upsert_add(table, ['session_id'], [{'session_id': sid, 'score': 0, 'pending': 1} for sid in changed],
+                   connection=connection)
+
+def rebuild_metrics(batch_size=10000):
+    """
+    Recompute every MetricDaily bucket from the sessions, customers and
+    messages in the database. Needed once for data that predates the metrics,
+    or after rows were bulk-inserted without going through the ORM.
+    """
+    buckets = metrics.MetricBuckets()
+
+    for (created_at,) in db.session.query(Customer.created_at).yield_per(batch_size):
+        buckets.add(metrics.NEW_CUSTOMERS, metric_day(created_at))
+
+    # A session created in the same minute as its customer was opened from the CRM
+    sessions = (db.session.query(ChatSession.created_at, ChatSession.updated_at,
+                                 ChatSession.linked_customer_id, Customer.created_at)
+                .outerjoin(Customer, Customer.id == ChatSession.linked_customer_id)
+                .yield_per(batch_size))
+    for created_at, updated_at, customer_id, customer_created_at in sessions:
+        if customer_id is not None and customer_created_at == created_at:
+            continue
+        buckets.add(metrics.LEADS, metric_day(created_at))
+        if customer_id is not None:
+            buckets.add(metrics.CONVERSIONS, metric_day(updated_at, metrics.parse_timestamp(created_at)))
+
+    # Stream messages in session order and replay the waiting/answered state
+    messages = (db.session.query(ChatMessage.session_id, ChatMessage.sender_type, ChatMessage.timestamp,
+                                 ChatSession.created_at)
+                .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+                .order_by(ChatMessage.session_id, ChatMessage.id)
+                .yield_per(batch_size))
+    current = waiting = last_seen = None
+    for session_id, sender_type, timestamp, session_created_at in messages:
+        if session_id != current:
+            current, waiting = session_id, None
+            last_seen = metrics.parse_timestamp(session_created_at)
+        stamp = metrics.parse_timestamp(timestamp, default_date=last_seen.date() if last_seen else None)
+        if stamp is not None:
+            last_seen = stamp
+        if sender_type == 'customer':
+            if waiting is None:
+                waiting = stamp
+        elif sender_type == 'agent':
+            minutes = metrics.response_minutes(waiting, stamp)
+            if minutes is not None:
+                buckets.add(metrics.RESPONSE_TIME, stamp, minutes)
+            waiting = None
+
+    MetricDaily.query.delete()
+    upsert_add(MetricDaily.__table__, ['metric', 'day'], buckets.rows())
+    db.session.commit()
+    return len(buckets.buckets)
+
+def metric_buckets_since(day):
+    """{(metric, day): (count, total)} for every bucket from day onwards; one row per metric per day."""
+    rows = (db.session.query(MetricDaily.metric, MetricDaily.day, MetricDaily.count, MetricDaily.total)
+            .filter(MetricDaily.day >= day)
+            .all())
+    return {(metric, d): (count, total) for metric, d, count, total in rows}
+
+def get_rollup_watermark(name):
+    row = db.session.get(RollupWatermark, name)
+    return row.last_id if row else 0
+
+# --- FAQ CLICK ROLLUPS ---
+
+FAQ_ROLLUP = 'faq_clicks'
+
+def upsert_faq_daily_counts(counts):
+    """Add {(faq_id, day): clicks} onto FAQDailyStat in the current transaction."""
+    if not counts:
+        return
+    rows = [{'faq_id': faq_id, 'day': day, 'clicks': n} for (faq_id, day), n in counts.items()]
+    upsert_add(FAQDailyStat.__table__, ['faq_id', 'day'], rows)
+
+def rollup_faq_clicks(batch_size=50000):
+    """
+    Aggregate FAQLog rows added since the last run into FAQDailyStat.
+
+    The watermark is advanced with a compare-and-set in the same transaction as
+    the counts, so concurrent runs in several workers never double count.
+    Returns the number of log rows folded in.
+    """
+    total = 0
+    while True:
+        last_id = get_rollup_watermark(FAQ_ROLLUP)
+        logs = (db.session.query(FAQLog.id, FAQLog.faq_id, FAQLog.clicked_at)
+                .filter(FAQLog.id > last_id)
+                .order_by(FAQLog.id)
+                .limit(batch_size)
+                .all())
+        if not logs:
+            return total
+
+        counts = {}
+        for _, faq_id, clicked_at in logs:
+            if faq_id is None or clicked_at is None:
+                continue
+            key = (faq_id, clicked_at.date())
+            counts[key] = counts.get(key, 0) + 1
+        new_last_id = logs[-1][0]
+
+        try:
+            upsert_faq_daily_counts(counts)
+            if last_id:
+                moved = RollupWatermark.query.filter_by(name=FAQ_ROLLUP, last_id=last_id).update(
+                    {RollupWatermark.last_id: new_last_id}, synchronize_session=False)
+            else:
+                moved = 1
+                db.session.add(RollupWatermark(name=FAQ_ROLLUP, last_id=new_last_id))
+            if not moved:
+                # Another worker rolled this range up first
+                db.session.rollback()
+                continue
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            continue
+        total += len(logs)
+        if len(logs) < batch_size:
+            return total
+
+def prune_faq_logs(keep_days=30):
+    """Delete raw FAQLog rows that are already rolled up and older than keep_days."""
+    from datetime import timedelta
+    cutoff = datetime.utcnow() - timedelta(days=keep_days)
+    deleted = FAQLog.query.filter(
+        FAQLog.id <= get_rollup_watermark(FAQ_ROLLUP),
+        FAQLog.clicked_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+def faq_daily_clicks(start):
+    """{faq_id: {day: clicks}} from start (a date) onwards: rollups plus any logs not yet rolled up. Read-only."""
+    clicks = {}
+    for faq_id, day, n in db.session.query(FAQDailyStat.faq_id, FAQDailyStat.day, FAQDailyStat.clicks).filter(
+            FAQDailyStat.day >= start).all():
+        daily = clicks.setdefault(faq_id, {})
+        daily[day] = daily.get(day, 0) + n
+    tail = db.session.query(FAQLog.faq_id, FAQLog.clicked_at).filter(
+        FAQLog.id > get_rollup_watermark(FAQ_ROLLUP),
+        FAQLog.clicked_at >= datetime(start.year, start.month, start.day))
+    for faq_id, clicked_at in tail:
+        if faq_id is None:
+            continue
+        daily = clicks.setdefault(faq_id, {})
+        daily[clicked_at.date()] = daily.get(clicked_at.date(), 0) + 1
+    return clicks
+
+def faq_clicks_since(day):
+    """FAQ clicks from day (inclusive) onwards: rollups plus any logs not yet rolled up."""
+    rolled = db.session.query(db.func.coalesce(db.func.sum(FAQDailyStat.clicks), 0)).filter(
+        FAQDailyStat.day >= day).scalar()
+    start = datetime(day.year, day.month, day.day)
+    tail = FAQLog.query.filter(FAQLog.id > get_rollup_watermark(FAQ_ROLLUP), FAQLog.clicked_at >= start).count()
+    return int(rolled) + tail
+
+# --- SESSION RESPONSE ANALYTICS ---
+# Batch job (flask summarize-sessions, e.g. from cron) that keeps one
+# ChatSessionSummary row per session; the dashboard and agent profiles only
+# read that table, never the messages.
+
+SESSION_SUMMARY_ROLLUP = 'session_summaries'
+
+def summarize_chat_sessions(full=False, sessions_per_batch=1000):
+    """
+    Recompute the summaries of every session that received messages since the
+    last run (every session with full=True). Messages are streamed in session
+    order, one batch of sessions at a time. Returns the number of sessions summarized.
+    """
+    last_id = 0 if full else get_rollup_watermark(SESSION_SUMMARY_ROLLUP)
+    high_id = db.session.query(db.func.max(ChatMessage.id)).scalar() or 0
+    if high_id <= last_id:
+        return 0
+    session_ids = sorted(sid for (sid,) in db.session.query(ChatMessage.session_id)
+                         .filter(ChatMessage.id > last_id, ChatMessage.id <= high_id)
+                         .distinct())
+
+    summarized = 0
+    for start in range(0, len(session_ids), sessions_per_batch):
+        summarized += write_session_summaries(session_ids[start:start + sessions_per_batch], high_id)
+
+    moved = RollupWatermark.query.filter(RollupWatermark.name == SESSION_SUMMARY_ROLLUP,
+                                         RollupWatermark.last_id < high_id).update(
+        {RollupWatermark.last_id: high_id}, synchronize_session=False)
+    if not moved and not db.session.get(RollupWatermark, SESSION_SUMMARY_ROLLUP):
+        db.session.add(RollupWatermark(name=SESSION_SUMMARY_ROLLUP, last_id=high_id))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+    return summarized
+
+def write_session_summaries(session_ids, high_id=None):
+    """
+    Replace the summaries of session_ids from their messages (up to message id
+    high_id, default all) and commit. Used by the batch run and when a chat is
+    closed, so its stats show up without waiting for the next run.
+    Returns the number of sessions summarized.
+    """
+    table = ChatSessionSummary.__table__
+    owners = {sid: (agent_id, created_at) for sid, agent_id, created_at in
+              db.session.query(ChatSession.id, ChatSession.assigned_agent_id, ChatSession.created_at)
+              .filter(ChatSession.id.in_(session_ids))}
+    # Only system messages need their text (to spot takeovers)
+    messages = (db.session.query(ChatMessage.session_id, ChatSession.created_at, ChatMessage.sender_type,
+                                 db.case((ChatMessage.sender_type == 'system', ChatMessage.text), else_=None),
+                                 ChatMessage.timestamp)
+                .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+                .filter(ChatMessage.session_id.in_(session_ids))
+                .order_by(ChatMessage.session_id, ChatMessage.id))
+    if high_id is not None:
+        messages = messages.filter(ChatMessage.id <= high_id)
+    rows = []
+    for session_id, summary in session_analytics.summarize_sessions(messages.yield_per(5000)):
+        agent_id, created_at = owners.get(session_id, (None, None))
+        rows.append(dict(summary, session_id=session_id, agent_id=agent_id, day=metric_day(created_at)))
+    try:
+        db.session.execute(table.delete().where(table.c.session_id.in_(session_ids)))
+        if rows:
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent run wrote the same sessions
+        db.session.rollback()
+    return len(rows)
+
+def session_response_stats(since_day=None, agent_id=None):
+    """First-response / takeover percentiles and bot deflection rate from ChatSessionSummary."""
+    query = db.session.query(ChatSessionSummary.first_response_seconds, ChatSessionSummary.takeover_delay_seconds,
+                             ChatSessionSummary.bot_only, ChatSessionSummary.customer_messages)
+    if since_day is not None:
+        query = query.filter(ChatSessionSummary.day >= since_day)
+    if agent_id is not None:
+        query = query.filter(ChatSessionSummary.agent_id == agent_id)
+    return session_analytics.aggregate(query.all())
+
+# --- CUSTOMER TAGS ---
+# Customer.tags stays the comma string the templates display; CustomerTag and
+# Tag.customer_count are kept in step with it from the flush hooks below.
+
+def parse_tags(raw):
+    """Split a comma-separated tag string into unique, trimmed names (order kept)."""
+    names = []
+    for name in (raw or '').split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+def sync_customer_tags(connection, tags_by_customer):
+    """Make CustomerTag match {customer_id: [tag names]} and adjust Tag.customer_count by the difference."""
+    if not tags_by_customer:
+        return
+    tags = Tag.__table__
+    links = CustomerTag.__table__
+    names = {name for tag_names in tags_by_customer.values() for name in tag_names}
+    if names:
+        # Adding 0 to an existing row makes this an insert-if-missing
+        upsert_add(tags, ['name'], [{'name': name, 'customer_count': 0} for name in names], connection=connection)
+    tag_ids = dict(connection.execute(db.select(tags.c.name, tags.c.id).where(tags.c.name.in_(names))).all()) if names else {}
+
+    current = {}
+    rows = connection.execute(db.select(links.c.customer_id, links.c.tag_id)
+                              .where(links.c.customer_id.in_(list(tags_by_customer))))
+    for customer_id, tag_id in rows:
+        current.setdefault(customer_id, set()).add(tag_id)
+
+    added, removed, deltas = [], [], {}
+    for customer_id, tag_names in tags_by_customer.items():
+        wanted = {tag_ids[name] for name in tag_names}
+        have = current.get(customer_id, set())
+        for tag_id in wanted - have:
+            added.append({'customer_id': customer_id, 'tag_id': tag_id})
+            deltas[tag_id] = deltas.get(tag_id, 0) + 1
+        for tag_id in have - wanted:
+            removed.append((customer_id, tag_id))
+            deltas[tag_id] = deltas.get(tag_id, 0) - 1
+
+    if added:
+        connection.execute(links.insert(), added)
+    for customer_id, tag_id in removed:
+        connection.execute(links.delete().where(links.c.customer_id == customer_id, links.c.tag_id == tag_id))
+    deltas = [{'b_tag_id': tag_id, 'b_delta': delta} for tag_id, delta in deltas.items() if delta]
+    if deltas:
+        connection.execute(tags.update()
+                           .where(tags.c.id == db.bindparam('b_tag_id'))
+                           .values(customer_count=tags.c.customer_count + db.bindparam('b_delta')), deltas)
+
+@event.listens_for(db.session, 'before_flush')
+def unlink_deleted_customer_tags(flush_session, flush_context, instances):
+    # Before the customer rows go, so the join rows never point at a missing customer
+    deleted = {obj.id: [] for obj in flush_session.deleted if isinstance(obj, Customer) and obj.id is not None}
+    if deleted:
+        sync_customer_tags(flush_session.connection(), deleted)
+
+@event.listens_for(db.session, 'after_flush')
+def link_customer_tags(flush_session, flush_context):
+    changed = {}
+    for obj in flush_session.new:
+        if isinstance(obj, Customer):
+            changed[obj.id] = parse_tags(obj.tags)
+    for obj in flush_session.dirty:
+        if isinstance(obj, Customer) and db.inspect(obj).attrs.tags.history.has_changes():
+            changed[obj.id] = parse_tags(obj.tags)
+    if changed:
+        sync_customer_tags(flush_session.connection(), changed)
+
+def backfill_customer_tags(batch_size=1000):
+    """Rebuild CustomerTag and the tag counts from every Customer.tags string (the caller commits). Returns customers processed."""
+    db.session.execute(CustomerTag.__table__.delete())
+    db.session.execute(Tag.__table__.update().values(customer_count=0))
+    connection = db.session.connection()
+    processed = 0
+    last_id = 0
+    while True:
+        rows = (db.session.query(Customer.id, Customer.tags)
+                .filter(Customer.id > last_id)
+                .order_by(Customer.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+        sync_customer_tags(connection, {customer_id: parse_tags(tags) for customer_id, tags in rows})
+        processed += len(rows)
+        last_id = rows[-1][0]
+    return processed
+
+def customers_with_tags(names):
+    """Subquery of customer ids carrying any of the given tag names (exact match, via the tag index)."""
+    return (db.select(CustomerTag.customer_id)
+            .join(Tag, Tag.id == CustomerTag.tag_id)
+            .where(Tag.name.in_(names)))
+
+# --- CONTACT IDENTITIES ---
+# ContactIdentity holds every customer's lower-cased email and E.164 phone
+# under a unique (kind, value) index, so "which customer is this?" is a single
+# indexed lookup for chats, imports and manual linking. The flush hooks keep it
+# in step with Customer.email / Customer.phone; when two customers share an
+# identifier the one indexed first keeps it.
+
+def contact_keys(email=None, phone=None):
+    """[(kind, normalised value)] for the identifiers given, email first."""
+    keys = []
+    email, phone = contacts.normalize_email(email), contacts.normalize_phone(phone, current_app.config['DEFAULT_COUNTRY_CODE'])
+    if email:
+        keys.append(('email', email))
+    if phone:
+        keys.append(('phone', phone))
+    return keys
+
+def resolve_contacts(keys, connection=None):
+    """{(kind, value): customer_id} for those of the keys that belong to a customer."""
+    if not keys:
+        return {}
+    conn = connection if connection is not None else db.session.connection()
+    table = ContactIdentity.__table__
+    by_kind = {}
+    for kind, value in keys:
+        by_kind.setdefault(kind, set()).add(value)
+    rows = conn.execute(
+        db.select(table.c.kind, table.c.value, table.c.customer_id)
+        .where(or_(*(db.and_(table.c.kind == kind, table.c.value.in_(values)) for kind, values in by_kind.items()))))
+    return {(kind, value): customer_id for kind, value, customer_id in rows}
+
+def find_customer_id(email=None, phone=None, connection=None):
+    """Id of the customer owning this email (preferred) or phone, else None."""
+    keys = contact_keys(email, phone)
+    matches = resolve_contacts(keys, connection)
+    return next((matches[key] for key in keys if key in matches), None)
+
+def sync_contact_identities(connection, contacts_by_customer):
+    """Re-index {customer_id: (email, phone)}; identifiers already owned by another customer are skipped."""
+    if not contacts_by_customer:
+        return
+    table = ContactIdentity.__table__
+    connection.execute(table.delete().where(table.c.customer_id.in_(list(contacts_by_customer))))
+    rows = [{'kind': kind, 'value': value, 'customer_id': customer_id}
+            for customer_id, (email, phone) in contacts_by_customer.items()
+            for kind, value in contact_keys(email, phone)]
+    insert_missing(table, ['kind', 'value'], rows, connection=connection)
+
+@event.listens_for(db.session, 'before_flush')
+def unlink_deleted_customer_contacts(flush_session, flush_context, instances):
+    deleted = [obj.id for obj in flush_session.deleted if isinstance(obj, Customer) and obj.id is not None]
+    if deleted:
+        table = ContactIdentity.__table__
+        flush_session.connection().execute(table.delete().where(table.c.customer_id.in_(deleted)))
+
+@event.listens_for(db.session, 'before_flush')
+def link_inbound_chats(flush_session, flush_context, instances):
+    """Store visitor phones as E.164 and attach new chats from a known email/phone to that customer."""
+    for obj in flush_session.new:
+        if not isinstance(obj, ChatSession):
+            continue
+        if obj.visitor_phone:
+            obj.visitor_phone = contacts.normalize_phone(obj.visitor_phone, current_app.config['DEFAULT_COUNTRY_CODE']) or obj.visitor_phone
+        if obj.linked_customer_id is None and (obj.visitor_email or obj.visitor_phone):
+            obj.linked_customer_id = find_customer_id(obj.visitor_email, obj.visitor_phone,
+                                                      connection=flush_session.connection())
+
+@event.listens_for(db.session, 'after_flush')
+def index_customer_contacts(flush_session, flush_context):
+    changed = {}
+    for obj in flush_session.new:
+        if isinstance(obj, Customer):
+            changed[obj.id] = (obj.email, obj.phone)
+    for obj in flush_session.dirty:
+        if isinstance(obj, Customer):
+            attrs = db.inspect(obj).attrs
+            if attrs.email.history.has_changes() or attrs.phone.history.has_changes():
+                changed[obj.id] = (obj.email, obj.phone)
+    if changed:
+        sync_contact_identities(flush_session.connection(), changed)
+
+def backfill_contact_identities(batch_size=1000):
+    """Rebuild ContactIdentity from every customer, lowest id first (the caller commits). Returns customers processed."""
+    db.session.execute(ContactIdentity.__table__.delete())
+    connection = db.session.connection()
+    processed = 0
+    last_id = 0
+    while True:
+        rows = (db.session.query(Customer.id, Customer.email, Customer.phone)
+                .filter(Customer.id > last_id)
+                .order_by(Customer.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+        sync_contact_identities(connection, {customer_id: (email, phone) for customer_id, email, phone in rows})
+        processed += len(rows)
+        last_id = rows[-1][0]
+    return processed
+
+# --- CUSTOMER SUMMARIES ---
+# CustomerSummary caches what the profile pages show about a customer's
+# activity: total lead score of the linked chats, the agent on the first
+# agent-run chat, open inquiries, session count and last contact. Rows are
+# recomputed for the customers touched by each flush, and refresh_lead_scores
+# pushes new scores in, so a profile view is one primary-key lookup.
+
+def refresh_customer_summaries(connection, customer_ids):
+    """Recompute the summary rows of these customers (dropping rows of customers that no longer exist)."""
+    ids = sorted({customer_id for customer_id in customer_ids if customer_id is not None})
+    if not ids:
+        return
+    customers = Customer.__table__
+    sessions = ChatSession.__table__
+    inquiries = Inquiry.__table__
+    summaries = CustomerSummary.__table__
+
+    rows = {}
+    for customer_id, last_contact in connection.execute(
+            db.select(customers.c.id, customers.c.last_contact).where(customers.c.id.in_(ids))):
+        rows[customer_id] = {'customer_id': customer_id, 'lead_score': 0, 'session_count': 0,
+                             'open_inquiries': 0, 'active_agent_id': None, 'last_contact': last_contact}
+    connection.execute(summaries.delete().where(summaries.c.customer_id.in_(ids)))
+    if not rows:
+        return
+    ids = list(rows)
+
+    for customer_id, count, latest in connection.execute(
+            db.select(sessions.c.linked_customer_id, db.func.count(sessions.c.id), db.func.max(sessions.c.updated_at))
+            .where(sessions.c.linked_customer_id.in_(ids))
+            .group_by(sessions.c.linked_customer_id)):
+        row = rows[customer_id]
+        row['session_count'] = count
+        # The later of the recorded last contact and the latest chat activity
+        recorded = metrics.parse_timestamp(row['last_contact'])
+        latest_chat = metrics.parse_timestamp(latest)
+        if latest_chat and (recorded is None or latest_chat > recorded):
+            row['last_contact'] = latest
+
+    for customer_id, score in connection.execute(
+            db.select(sessions.c.linked_customer_id, db.func.sum(LeadScore.__table__.c.score))
+            .join(LeadScore.__table__, LeadScore.__table__.c.session_id == sessions.c.id)
+            .where(sessions.c.linked_customer_id.in_(ids))
+            .group_by(sessions.c.linked_customer_id)):
+        rows[customer_id]['lead_score'] = score or 0
+
+    # Same pick as the profile template made: the customer's first session being handled by an agent
+    first_active = (db.select(db.func.min(sessions.c.id))
+                    .where(sessions.c.linked_customer_id.in_(ids), sessions.c.status == 'agent_active')
+                    .group_by(sessions.c.linked_customer_id))
+    for customer_id, agent_id in connection.execute(
+            db.select(sessions.c.linked_customer_id, sessions.c.assigned_agent_id)
+            .where(sessions.c.id.in_(first_active))):
+        rows[customer_id]['active_agent_id'] = agent_id
+
+    for customer_id, count in connection.execute(
+            db.select(inquiries.c.customer_id, db.func.count(inquiries.c.id))
+            .where(inquiries.c.customer_id.in_(ids), inquiries.c.status.isnot(None), inquiries.c.status != 'Resolved')
+            .group_by(inquiries.c.customer_id)):
+        rows[customer_id]['open_inquiries'] = count
+
+    connection.execute(summaries.insert(), list(rows.values()))
+
+def refresh_customer_lead_scores(connection, session_ids):
+    """Re-total CustomerSummary.lead_score for the customers linked to these sessions."""
+    sessions = ChatSession.__table__
+    scores = LeadScore.__table__
+    summaries = CustomerSummary.__table__
+    customer_ids = (db.select(sessions.c.linked_customer_id)
+                    .where(sessions.c.id.in_(list(session_ids)), sessions.c.linked_customer_id.isnot(None)))
+    total = (db.select(db.func.coalesce(db.func.sum(scores.c.score), 0))
+             .select_from(sessions.join(scores, scores.c.session_id == sessions.c.id))
+             .where(sessions.c.linked_customer_id == summaries.c.customer_id)
+             .scalar_subquery())
+    connection.execute(summaries.update()
+                       .where(summaries.c.customer_id.in_(customer_ids))
+                       .values(lead_score=total))
+
+def summary_customer_ids(obj, attribute, fields, added_or_deleted):
+    """Customer ids (old and new) affected by obj being added, deleted, or changed in any of fields."""
+    state = db.inspect(obj)
+    if not added_or_deleted and not any(state.attrs[f].history.has_changes() for f in fields):
+        return set()
+    history = state.attrs[attribute].history
+    return {getattr(obj, attribute)} | set(history.deleted or ())
+
+@event.listens_for(db.session, 'before_flush')
+def drop_deleted_customer_summaries(flush_session, flush_context, instances):
+    deleted = [obj.id for obj in flush_session.deleted if isinstance(obj, Customer) and obj.id is not None]
+    if deleted:
+        table = CustomerSummary.__table__
+        flush_session.connection().execute(table.delete().where(table.c.customer_id.in_(deleted)))
+
+@event.listens_for(db.session, 'after_flush')
+def refresh_changed_customer_summaries(flush_session, flush_context):
+    changed = set()
+    for obj in list(flush_session.new) + list(flush_session.dirty) + list(flush_session.deleted):
+        added_or_deleted = obj in flush_session.new or obj in flush_session.deleted
+        if isinstance(obj, ChatSession):
+            changed |= summary_customer_ids(obj, 'linked_customer_id',
+                                            ('linked_customer_id', 'status', 'assigned_agent_id', 'updated_at'),
+                                            added_or_deleted)
+        elif isinstance(obj, Inquiry):
+            changed |= summary_customer_ids(obj, 'customer_id', ('customer_id', 'status'), added_or_deleted)
+        elif isinstance(obj, Customer) and obj not in flush_session.deleted:
+            changed |= summary_customer_ids(obj, 'id', ('last_contact',), added_or_deleted)
+    if changed:
+        refresh_customer_summaries(flush_session.connection(), changed)
+
+def rebuild_customer_summaries(batch_size=1000):
+    """Recompute every CustomerSummary row from the stored lead scores (the caller commits). Returns customers processed."""
+    connection = db.session.connection()
+    processed = 0
+    last_id = 0
+    while True:
+        ids = [customer_id for (customer_id,) in (db.session.query(Customer.id)
+                                                  .filter(Customer.id > last_id)
+                                                  .order_by(Customer.id)
+                                                  .limit(batch_size))]
+        if not ids:
+            break
+        refresh_customer_summaries(connection, ids)
+        processed += len(ids)
+        last_id = ids[-1]
+    return processed
+
+def customer_summary(customer_id):
+    """(CustomerSummary or None, active agent name or None) in one query, from the stored lead scores."""
+    catch_up_lead_scores()
+    row = (db.session.query(CustomerSummary, User.name)
+           .outerjoin(User, User.id == CustomerSummary.active_agent_id)
+           .filter(CustomerSummary.customer_id == customer_id)
+           .first())
+    return row if row else (None, None)
+
+def customer_summary_dict(summary):
+    return {
+        'lead_score': summary.lead_score if summary else 0,
+        'session_count': summary.session_count if summary else 0,
+        'open_inquiries': summary.open_inquiries if summary else 0,
+        'last_contact': summary.last_contact if summary else None,
+    }
+
+def visitor_phone(chat_session):
+    """The visitor's phone: the one the chat came in on, else the linked customer's."""
+    if chat_session.visitor_phone:
+        return chat_session.visitor_phone
+    if chat_session.linked_customer_id and chat_session.linked_customer:
+        return chat_session.linked_customer.phone
+    return None
+
+# --- INQUIRY REPS ---
+# Inquiry.assigned_user_id is the rep as a foreign key; assigned_rep stays the
+# username string the forms and API send. Older rows may hold a display name
+# instead, which resolve_inquiry_reps() maps onto the user once.
+
+def rep_user(connection, rep):
+    """(id, username) of the user whose username (preferred) or display name is rep, or None."""
+    if not rep:
+        return None
+    users = User.__table__
+    return connection.execute(
+        db.select(users.c.id, users.c.username)
+        .where(or_(users.c.username == rep, users.c.name == rep))
+        .order_by((users.c.username == rep).desc(), users.c.id)
+        .limit(1)
+    ).first()
+
+@event.listens_for(db.session, 'before_flush')
+def link_inquiry_reps(flush_session, flush_context, instances):
+    for obj in list(flush_session.new) + list(flush_session.dirty):
+        if not isinstance(obj, Inquiry):
+            continue
+        if obj in flush_session.new or db.inspect(obj).attrs.assigned_rep.history.has_changes():
+            user = rep_user(flush_session.connection(), obj.assigned_rep)
+            obj.assigned_user_id = user.id if user else None
+            if user:
+                obj.assigned_rep = user.username
+
+def resolve_inquiry_reps():
+    """
+    Point assigned_user_id at the user named by each inquiry's assigned_rep:
+    usernames first, then legacy display names, then store the username.
+    Unknown names stay unassigned. Runs in the caller's transaction (the
+    caller commits). Returns the number of inquiries linked.
+    """
+    inquiries = Inquiry.__table__
+    users = User.__table__
+    unresolved = db.and_(inquiries.c.assigned_user_id.is_(None), inquiries.c.assigned_rep.isnot(None))
+    linked = 0
+    for match in (users.c.username == inquiries.c.assigned_rep, users.c.name == inquiries.c.assigned_rep):
+        user_id = db.select(db.func.min(users.c.id)).where(match).scalar_subquery()
+        linked += db.session.execute(
+            inquiries.update().where(unresolved, db.exists().where(match)).values(assigned_user_id=user_id)
+        ).rowcount
+    username = db.select(users.c.username).where(users.c.id == inquiries.c.assigned_user_id).scalar_subquery()
+    db.session.execute(inquiries.update()
+                       .where(inquiries.c.assigned_user_id.isnot(None), inquiries.c.assigned_rep != username)
+                       .values(assigned_rep=username))
+    return linked
+
+# --- SCORING RULES ---
+# Every worker keeps the active rules compiled; a rule write bumps the
+# CacheVersion row so the others recompile on their next version check.
+
+RULES_CACHE = 'rules'
+
+def build_compiled_rules(version):
+    rules = [
+        {'id': r.id, 'keywords': r.keywords, 'score': r.score, 'operation': r.operation}
+        for r in Rule.query.filter_by(active=True).order_by(Rule.id).all()
+    ]
+    return CompiledRules(
+        rules,
+        max_edits=current_app.config['FUZZY_MATCH_MAX_EDITS'],
+        min_length=current_app.config['FUZZY_MATCH_MIN_LENGTH']
+    )
+
+# check_interval is set from AUTO_REPLY_VERSION_CHECK_SECONDS by create_app()
+compiled_rules = VersionedCache(
+    build_compiled_rules,
+    lambda: get_cache_version(RULES_CACHE)
+)
+
+def invalidate_rules():
+    """Call after any rule write so every worker recompiles its scoring rules."""
+    bump_cache_version(RULES_CACHE)
+    compiled_rules.invalidate()
+
+def calculate_session_score(session):
+    # Consolidate visitor messages
+    visitor_text = " ".join([m.text.lower() for m in session.chat_messages if m.sender_type == 'customer'])
+    
+    # If ANY keyword of a rule (or a close misspelling) is in the visitor text, apply it
+    return compiled_rules.get().score(visitor_text)
+
+# --- STORED LEAD SCORES ---
+# LeadScore keeps every session's score so the dashboard can read the top N
+# through the score index. New visitor messages bump LeadScore.pending (in
+# mark_lead_scores_pending) and refresh_lead_scores() rescores only those
+# rows; a rules change rescores everything once. Pages that read the scores
+# first rescore up to LEAD_SCORE_READ_BATCH pending rows (catch_up_lead_scores),
+# so new chats score without any background process; `flask maintain` works
+# through the rest, such as the full rescore after a rules edit, in bulk.
+
+LEAD_SCORES = 'lead_scores'  # CacheVersion row holding the rules version the stored scores were computed with
+
+def refresh_lead_scores(batch_size=5000, max_batches=None):
+    """
+    Bring LeadScore up to date with the current rules and visitor messages,
+    batch_size sessions per transaction (stopping after max_batches, if
+    given). Returns the number of sessions rescored.
+    """
+    table = LeadScore.__table__
+    rules_version = get_cache_version(RULES_CACHE)
+    rules = compiled_rules.get()
+    if compiled_rules.version != rules_version:
+        rules = compiled_rules.rebuild(rules_version)
+
+    scored = db.session.get(CacheVersion, LEAD_SCORES)
+    if scored is None or scored.version != rules_version:
+        # First run or the rules changed: every session needs a new score,
+        # including sessions that were bulk-inserted without a LeadScore row.
+        # Claimed with a compare-and-set on the stored version so only one
+        # process queues the rescore.
+        if scored is None:
+            db.session.add(CacheVersion(name=LEAD_SCORES, version=rules_version))
+            claimed = True
+        else:
+            claimed = CacheVersion.query.filter_by(name=LEAD_SCORES, version=scored.version).update(
+                {CacheVersion.version: rules_version}, synchronize_session=False)
+        if claimed:
+            db.session.execute(table.update().values(pending=table.c.pending + 1))
+            missing = (db.select(ChatSession.id, db.literal(0), db.literal(1))
+                       .where(~db.exists().where(table.c.session_id == ChatSession.id)))
+            db.session.execute(table.insert().from_select(['session_id', 'score', 'pending'], missing))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another process claimed the same rescore
+            db.session.rollback()
+
+    # Only rows still holding the changes we saw: a message that arrives meanwhile (or another
+    # process rescoring the same row) leaves it pending for the next pass
+    update = (table.update()
+              .where(table.c.session_id == db.bindparam('b_session_id'), table.c.pending == db.bindparam('b_seen'))
+              .values(score=db.bindparam('b_score'), pending=0))
+    rescored = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        batch = dict(db.session.query(LeadScore.session_id, LeadScore.pending)
+                     .filter(LeadScore.pending > 0)
+                     .limit(batch_size)
+                     .all())
+        if not batch:
+            return rescored
+        texts = {session_id: [] for session_id in batch}
+        messages = (db.session.query(ChatMessage.session_id, ChatMessage.text)
+                    .filter(ChatMessage.session_id.in_(batch), ChatMessage.sender_type == 'customer')
+                    .order_by(ChatMessage.session_id, ChatMessage.id))
+        for session_id, text in messages:
+            texts[session_id].append(text.lower())
+        db.session.execute(update, [
+            {'b_session_id': session_id, 'b_score': rules.score(" ".join(texts[session_id])), 'b_seen': seen}
+            for session_id, seen in batch.items()
+        ])
+        refresh_customer_lead_scores(db.session.connection(), batch)
+        db.session.commit()
+        rescored += len(batch)
+    return rescored
+
+def catch_up_lead_scores():
+    """
+    Rescore up to LEAD_SCORE_READ_BATCH pending sessions; called by the pages
+    that read the stored scores. A failure is logged and never fails the page.
+    """
+    batch_size = current_app.config['LEAD_SCORE_READ_BATCH']
+    if batch_size <= 0:
+        return 0
+    try:
+        return refresh_lead_scores(batch_size=batch_size, max_batches=1)
+    except Exception:
+        db.session.rollback()
+        logger.warning("Lead score catch-up failed; `flask maintain` rescores the pending sessions", exc_info=True)
+        return 0
@@ -0,0 +1,121 @@
+"""
+The application's schema migrations (see services/migrations.py for the runner).
+
+upgrade_schema() is what `flask init-db` and `flask db-upgrade` run; nothing
+here executes at import time, so web workers never touch the schema.
+"""
+from extensions import db
+from models import (ChatMessage, ChatSession, ContactIdentity, Customer, CustomerSummary, CustomerTag, Inquiry,
+                    Message, Notification, TeamMessage, TeamRequest, User, backfill_contact_identities,
+                    backfill_customer_tags, rebuild_customer_summaries, resolve_inquiry_reps)
+from services import engine_profile, migrations
+
+# --- SCHEMA MIGRATIONS ---
+# create_all() only adds missing tables, so every change to an existing table
+# (new columns, new indexes, backfills of derived tables) is a numbered
+# migration below. The applied versions live in schema_version; steps are
+# idempotent, so databases that predate the table simply replay them all.
+# Append new migrations; never renumber or edit applied ones.
+
+def upgrade_visitor_phone(connection):
+    migrations.add_column(connection, ChatSession.__table__.c.visitor_phone)
+
+def downgrade_visitor_phone(connection):
+    migrations.drop_column(connection, 'chat_session', 'visitor_phone')
+
+def upgrade_inquiry_rep_id(connection):
+    migrations.add_column(connection, Inquiry.__table__.c.assigned_user_id)
+    migrations.create_indexes(connection, Inquiry.__table__, 'ix_inquiry_assigned_user_id')
+    # Only touches unlinked inquiries, so a rerun after a failed attempt finishes the backfill
+    resolve_inquiry_reps()
+
+def downgrade_inquiry_rep_id(connection):
+    migrations.drop_indexes(connection, 'ix_inquiry_assigned_user_id')
+    migrations.drop_column(connection, 'inquiry', 'assigned_user_id')
+
+LIST_INDEXES = {
+    Customer: ('ix_customer_name_id', 'ix_customer_last_contact_id', 'ix_customer_created_id',
+               'ix_customer_status', 'ix_customer_location'),
+    Inquiry: ('ix_inquiry_customer_name_id', 'ix_inquiry_status_id', 'ix_inquiry_created_id',
+              'ix_inquiry_updated_id', 'ix_inquiry_status', 'ix_inquiry_type'),
+}
+
+# Foreign keys and filters behind the chat inbox, team chat, notifications and dashboards
+HOT_PATH_INDEXES = {
+    User: ('ix_user_team_id',),
+    TeamRequest: ('ix_team_request_team_status', 'ix_team_request_user_status'),
+    Message: ('ix_message_inquiry_id',),
+    TeamMessage: ('ix_team_message_team_id', 'ix_team_message_user_id'),
+    ChatSession: ('ix_chat_session_list', 'ix_chat_session_archived_updated', 'ix_chat_session_assigned_agent',
+                  'ix_chat_session_linked_customer_id', 'ix_chat_session_linked_inquiry_id'),
+    ChatMessage: ('ix_chat_message_session_id',),
+    Notification: ('ix_notification_user_id',),
+}
+
+def index_migration(indexes):
+    """(upgrade, downgrade) creating / dropping {model: index names}."""
+    def upgrade(connection):
+        for model, names in indexes.items():
+            migrations.create_indexes(connection, model.__table__, *names)
+
+    def downgrade(connection):
+        for names in indexes.values():
+            migrations.drop_indexes(connection, *names)
+    return upgrade, downgrade
+
+def backfill_derived_tables(connection):
+    """Fill the tag, contact identity and summary tables for customers created before they existed."""
+    if not db.session.query(CustomerTag.query.exists()).scalar() and \
+            db.session.query(Customer.query.filter(Customer.tags != '', Customer.tags.isnot(None)).exists()).scalar():
+        backfill_customer_tags()
+    if not db.session.query(ContactIdentity.query.exists()).scalar() and \
+            db.session.query(Customer.query.exists()).scalar():
+        backfill_contact_identities()
+    if not db.session.query(CustomerSummary.query.exists()).scalar() and \
+            db.session.query(Customer.query.exists()).scalar():
+        rebuild_customer_summaries()
+
+# PostgreSQL only: trigram indexes for the ilike searches (skipped when pg_trgm cannot be installed)
+TRIGRAM_INDEXES = {
+    Customer: ('ix_customer_name_trgm', 'ix_customer_email_trgm'),
+    Inquiry: ('ix_inquiry_customer_trgm', 'ix_inquiry_assigned_rep_trgm', 'ix_inquiry_description_trgm'),
+    ChatSession: ('ix_chat_session_visitor_name_trgm',),
+    ChatMessage: ('ix_chat_message_text_trgm',),
+}
+
+create_trigram_indexes, drop_trigram_indexes = index_migration(TRIGRAM_INDEXES)
+
+def upgrade_trigram_indexes(connection):
+    if engine_profile.create_extension(connection, 'pg_trgm'):
+        create_trigram_indexes(connection)
+
+MIGRATIONS = [
+    migrations.Migration(1, 'chat_session.visitor_phone', upgrade_visitor_phone, downgrade_visitor_phone),
+    migrations.Migration(2, 'inquiry.assigned_user_id foreign key', upgrade_inquiry_rep_id, downgrade_inquiry_rep_id),
+    migrations.Migration(3, 'customer and inquiry list indexes', *index_migration(LIST_INDEXES)),
+    migrations.Migration(4, 'hot path foreign key indexes', *index_migration(HOT_PATH_INDEXES)),
+    # Irreversible: the rows it fills are read at every version, so downgrades stop at 5
+    migrations.Migration(5, 'backfill customer tags, contacts and summaries', backfill_derived_tables),
+    migrations.Migration(6, 'postgresql trigram search indexes', upgrade_trigram_indexes, drop_trigram_indexes),
+]
+
+def upgrade_schema(target=None):
+    """
+    Create missing tables and apply pending migrations up to target. A brand-new
+    database is built from the current models and stamped as current, so an
+    older target is refused there instead of being silently ignored.
+    """
+    fresh = not db.inspect(db.engine).has_table(User.__tablename__)
+    if fresh and target is not None and target < MIGRATIONS[-1].version:
+        raise migrations.MigrationError(
+            f"An empty database is created at the latest version ({MIGRATIONS[-1].version}); "
+            f"it cannot be built at version {target}")
+    if fresh:
+        # Before create_all, so it can build the trigram indexes
+        with db.engine.begin() as connection:
+            engine_profile.create_extension(connection, 'pg_trgm')
+    db.create_all()
+    if fresh:
+        migrations.stamp(db.session, MIGRATIONS)
+        return []
+    return migrations.upgrade(db.session, MIGRATIONS, target)
@@ -0,0 +1,107 @@
+"""
+Seed data: the built-in accounts and the demo chat conversations.
+
+Run explicitly with `flask init-db` (accounts) and `flask seed` (demo chats).
+Load-testing volumes come from `flask generate-data` (datagen.py).
+"""
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import ChatMessage, ChatSession, User
+
+
+def seed_admin():
+    if not User.query.filter_by(username='252499L').first():
+        admin = User(
+            username='252499L', 
+            password=generate_password_hash('fjr1300A15'), 
+            name='Admin User', 
+            bio='System Administrator',
+            role='ultra_admin'
+        )
+        db.session.add(admin)
+        db.session.commit()
+    
+    # Create the second user account if it doesn't exist
+    if not User.query.filter_by(username='252435M').first():
+        new_user = User(
+            username='252435M',
+            password=generate_password_hash('akshaya')
+            # name, bio, profile_picture will use defaults
+        )
+        db.session.add(new_user)
+        db.session.commit()
+
+def seed_chat_data():
+    """Seed sample chat conversations if none exist."""
+    if ChatSession.query.count() > 0:
+        return
+
+    from datetime import datetime
+    now = datetime.now().strftime('%Y-%m-%d %H:%M')
+
+    # Chat 1 – Ananya asking about pricing (keyword: "pricing")
+    s1 = ChatSession(visitor_name='Ananya Ravikumar', visitor_email='ananya.r@gmail.com',
+                     status='bot', created_at=now, updated_at=now)
+    s1.chat_messages = [ChatMessage(sender_type=msg[0], sender_name=msg[1], text=msg[2], timestamp=msg[3]) for msg in [
+        ('bot', 'Chatbot', 'Hello! 👋 Welcome to our support. How can I help you today?', '12:01 PM'),
+        ('customer', 'Ananya Ravikumar', "Hi! I'm interested in the pricing for the premium plan.", '12:02 PM'),
+        ('bot', 'Chatbot', "Great question! Our Premium plan starts at $49/month. Would you like more details?", '12:02 PM'),
+        ('customer', 'Ananya Ravikumar', "Yes, what features are included? I want to compare it with the enterprise option.", '12:03 PM'),
+        ('bot', 'Chatbot', "The Premium plan includes unlimited users, priority support, and advanced analytics. For enterprise pricing, I'd recommend speaking with our sales team.", '12:03 PM'),
+        ('customer', 'Ananya Ravikumar', "That sounds good. Can I get a demo scheduled?", '12:05 PM'),
+        ('bot', 'Chatbot', "Absolutely! I can help you schedule a demo. Could you share your preferred date and time?", '12:05 PM'),
+    ]]
+
+    # Chat 2 – Marcus with a complaint
+    s2 = ChatSession(visitor_name='Marcus Chen', visitor_email='marcus.chen@outlook.com',
+                     status='bot', created_at=now, updated_at=now)
+    s2.chat_messages = [ChatMessage(sender_type=msg[0], sender_name=msg[1], text=msg[2], timestamp=msg[3]) for msg in [
+        ('bot', 'Chatbot', 'Hello! How can I assist you today?', '11:30 AM'),
+        ('customer', 'Marcus Chen', "I have an issue with my recent invoice. I was overcharged.", '11:31 AM'),
+        ('bot', 'Chatbot', "I'm sorry to hear that. Could you provide your invoice number so I can look into it?", '11:31 AM'),
+        ('customer', 'Marcus Chen', "It's INV-2024-0892. I was charged twice for the same service.", '11:32 AM'),
+        ('bot', 'Chatbot', "Thank you for providing that. Let me check our records... I can see the duplicate charge. Let me connect you with our billing team for a refund.", '11:33 AM'),
+        ('customer', 'Marcus Chen', "Thanks. I'd also like to upgrade my subscription while we're at it.", '11:34 AM'),
+    ]]
+
+    # Chat 3 – Priya asking about integration (keyword: "integration")
+    s3 = ChatSession(visitor_name='Priya Sharma', visitor_email='priya.sharma@techcorp.io',
+                     status='bot', created_at=now, updated_at=now)
+    s3.chat_messages = [ChatMessage(sender_type=msg[0], sender_name=msg[1], text=msg[2], timestamp=msg[3]) for msg in [
+        ('bot', 'Chatbot', 'Welcome! How can I help you today?', '10:15 AM'),
+        ('customer', 'Priya Sharma', "Hi, I need help with API integration for our platform.", '10:16 AM'),
+        ('bot', 'Chatbot', "Of course! We support REST APIs with full documentation. What platform are you integrating with?", '10:16 AM'),
+        ('customer', 'Priya Sharma', "We use Salesforce. Do you have a direct integration?", '10:17 AM'),
+        ('bot', 'Chatbot', "Yes! We have a native Salesforce integration. I can share the setup guide with you.", '10:17 AM'),
+        ('customer', 'Priya Sharma', "That would be great. Also, what about the pricing for the API access?", '10:19 AM'),
+        ('bot', 'Chatbot', "API access is included in our Professional and Enterprise plans. Would you like to discuss pricing options?", '10:19 AM'),
+        ('customer', 'Priya Sharma', "Yes please. We're looking at an enterprise deal for 200+ users.", '10:20 AM'),
+    ]]
+
+    # Chat 4 – Jake just browsing (short chat)
+    s4 = ChatSession(visitor_name='Jake Thompson', visitor_email='jake.t@email.com',
+                     status='bot', created_at=now, updated_at=now)
+    s4.chat_messages = [ChatMessage(sender_type=msg[0], sender_name=msg[1], text=msg[2], timestamp=msg[3]) for msg in [
+        ('bot', 'Chatbot', 'Hello! Welcome. How can I assist you?', '9:45 AM'),
+        ('customer', 'Jake Thompson', "Just browsing for now. What products do you offer?", '9:46 AM'),
+        ('bot', 'Chatbot', "We offer CRM solutions, marketing automation, and analytics tools. Would you like to learn more about any of these?", '9:46 AM'),
+        ('customer', 'Jake Thompson', "Maybe later. Thanks!", '9:47 AM'),
+    ]]
+
+    # Chat 5 – Sara interested in a demo and partnership (keywords: "demo", "partnership")
+    s5 = ChatSession(visitor_name='Sara Williams', visitor_email='sara.w@innovate.co',
+                     status='bot', created_at=now, updated_at=now)
+    s5.chat_messages = [ChatMessage(sender_type=msg[0], sender_name=msg[1], text=msg[2], timestamp=msg[3]) for msg in [
+        ('bot', 'Chatbot', 'Hi there! 👋 How can I help you today?', '2:00 PM'),
+        ('customer', 'Sara Williams', "Hello! I'd like to schedule a demo of your platform.", '2:01 PM'),
+        ('bot', 'Chatbot', "We'd love to show you around! Are you looking at this for your team or organization?", '2:01 PM'),
+        ('customer', 'Sara Williams', "For our organization. We're also interested in a potential partnership opportunity.", '2:02 PM'),
+        ('bot', 'Chatbot', "That's exciting! Partnership inquiries are handled by our business development team. Let me get someone who can help.", '2:03 PM'),
+        ('customer', 'Sara Williams', "Great. We have about 500 employees and need an enterprise solution with custom pricing.", '2:04 PM'),
+        ('bot', 'Chatbot', "Understood! For enterprise deals of that scale, I'll connect you with a dedicated account manager. Please hold.", '2:04 PM'),
+    ]]
+
+    # One flush for every session and message (ids come back in a single round trip per table)
+    db.session.add_all([s1, s2, s3, s4, s5])
+    db.session.commit()
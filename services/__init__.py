@@ -0,0 +1 @@
+"""In-process helpers used by the routes in blueprints/ (matching, caching, analytics)."""
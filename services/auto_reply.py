@@ -0,0 +1,109 @@
+"""
+Precompiled auto-reply matcher.
+
+Template keywords are compiled once into a keyword matcher (exact + typo
+tolerant) and FAQs into a BM25 index, so that a visitor message can be matched
+without touching the database. The engine keeps the compiled index in memory
+and rebuilds it when the shared version stamp changes (another worker edited
+templates/FAQs) or when this worker edits templates; FAQ edits made by this
+worker are applied in place. Results for repeated messages are served from an
+optional ReplyCache tied to the same version.
+"""
+from services.faq_search import FAQSearchIndex
+from services.keywords import compile_keywords
+from services.reply_cache import normalize_message
+from services.versioned import VersionedCache
+
+
+class AutoReplyIndex:
+    """Compiled templates (immutable) plus the FAQ search index (updated in place)."""
+
+    def __init__(self, templates, faqs, version=0, max_edits=2, min_length=5):
+        # templates: [{'id', 'message', 'keywords'}], faqs: [{'id', 'question', 'answer'}]
+        self.version = version
+        self.templates = {t['id']: t for t in templates}
+        # Preserve the original (id) ordering of template replies
+        self._template_order = {t['id']: i for i, t in enumerate(templates)}
+
+        self._template_matcher = compile_keywords(
+            ((t.get('keywords'), t['id']) for t in templates),
+            max_edits=max_edits,
+            min_length=min_length
+        )
+        self.faq_index = FAQSearchIndex(faqs)
+
+    def match_templates(self, message):
+        ids = self._template_matcher.search(message)
+        return [self.templates[i] for i in sorted(ids, key=self._template_order.__getitem__)]
+
+    def match_faqs(self, message, top_k=3, min_score=0.0):
+        return [
+            {'id': faq_id, 'answer': answer, 'score': score}
+            for faq_id, answer, score in self.faq_index.search(message, top_k=top_k, min_score=min_score)
+        ]
+
+    def match(self, message, top_k=3, min_score=0.0):
+        """Return (source, entries) where source is 'template', 'faq' or None."""
+        templates = self.match_templates(message)
+        if templates:
+            return 'template', templates
+        faqs = self.match_faqs(message, top_k=top_k, min_score=min_score)
+        if faqs:
+            return 'faq', faqs
+        return None, []
+
+
+class AutoReplyEngine(VersionedCache):
+    """
+    Holds the current AutoReplyIndex for this process.
+
+    loader() returns (templates, faqs) as plain dicts; it is only called when a
+    rebuild is due, never while matching a message.
+    """
+
+    def __init__(self, loader, version_getter, check_interval=2.0, max_edits=2, min_length=5, cache=None):
+        self._loader = loader
+        self.max_edits = max_edits
+        self.min_length = min_length
+        self.cache = cache
+        super().__init__(self._build_index, version_getter, check_interval=check_interval)
+
+    def _build_index(self, version):
+        templates, faqs = self._loader()
+        return AutoReplyIndex(templates, faqs, version=version, max_edits=self.max_edits, min_length=self.min_length)
+
+    def get_index(self):
+        return self.get()
+
+    def apply_faq_change(self, faq_id, faq, version):
+        """
+        Update a single FAQ in place after a local write (faq=None means deleted).
+
+        Only safe when our index is exactly one version behind, i.e. no other
+        worker changed anything in between; otherwise fall back to a rebuild.
+        """
+        with self._lock:
+            index = self._value
+            if self._stale or index is None or version != self._version + 1:
+                self._stale = True
+                return
+            if faq is None:
+                index.faq_index.remove(faq_id)
+            else:
+                index.faq_index.upsert(faq)
+            index.version = self._version = version
+
+    def match(self, message, top_k=3, min_score=0.0):
+        """Match the normalized message, reusing a cached result for the current version if there is one."""
+        index = self.get_index()
+        text = normalize_message(message)
+        if self.cache is None:
+            return index.match(text, top_k=top_k, min_score=min_score)
+
+        key = (text, top_k, min_score)
+        version = index.version
+        result = self.cache.get(key, version)
+        if result is None:
+            result = index.match(text, top_k=top_k, min_score=min_score)
+            self.cache.put(key, version, result)
+        return result
@@ -0,0 +1,45 @@
+"""
+Normalised contact identifiers, used to recognise the same person across
+imports, chats and manually entered customers.
+
+Emails compare trimmed and lower-cased. Phones compare in E.164 form
+(+<country code><number>). Numbers written with + or 00 are international,
+and so are bare digits that already start with the caller's default country
+code (the app's DEFAULT_COUNTRY_CODE) and are long enough to hold a national
+number after it -- the form WhatsApp reports senders in. Anything else is a
+national number in that country, with or without its leading trunk 0.
+"""
+import re
+
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_PHONE_PUNCTUATION_RE = re.compile(r'[\s\-().\/]')
+# Shortest national number that can follow the country code in a bare international number
+MIN_NATIONAL_DIGITS = 8
+
+
+def normalize_email(value):
+    """Lower-cased email, or None when blank or not shaped like an address."""
+    value = (value or '').strip().lower()
+    if not value or not _EMAIL_RE.match(value):
+        return None
+    return value
+
+
+def normalize_phone(value, country_code):
+    """E.164 phone number, or None when blank or not a plausible number."""
+    value = _PHONE_PUNCTUATION_RE.sub('', (value or '').strip())
+    if not value:
+        return None
+    if value.startswith('+'):
+        digits = value[1:]
+    elif value.startswith('00'):
+        digits = value[2:]
+    elif value.startswith(country_code) and len(value) >= len(country_code) + MIN_NATIONAL_DIGITS:
+        # "60123456789": the country code without the +
+        digits = value
+    else:
+        # "012 345 6789" and "12 345 6789" are the same national number
+        digits = country_code + value.removeprefix('0')
+    if not digits.isdigit() or not 8 <= len(digits) <= 15 or digits.startswith('0'):
+        return None
+    return '+' + digits
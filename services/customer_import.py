@@ -0,0 +1,159 @@
+"""
+Reading and validating customer CSV files for the bulk import.
+
+read_customers() streams a CSV file and yields one ImportRecord per data
+row: either cleaned fields plus the normalised email/phone used to match
+existing customers, or the reason the row was rejected. Nothing here touches
+the database; the batching and upserts live with the models.
+"""
+import csv
+
+from services.contacts import normalize_email, normalize_phone
+
+# Accepted spellings of each column header (compared lower-cased, spaces and dashes as _)
+COLUMN_ALIASES = {
+    'name': ('name', 'full_name', 'customer', 'customer_name', 'contact', 'contact_name'),
+    'email': ('email', 'e_mail', 'email_address', 'mail'),
+    'phone': ('phone', 'phone_number', 'mobile', 'mobile_number', 'tel', 'telephone'),
+    'location': ('location', 'city', 'address', 'region'),
+    'status': ('status',),
+    'tags': ('tags', 'tag', 'labels'),
+    'notes': ('notes', 'note', 'comments'),
+    'assigned_staff': ('assigned_staff', 'staff', 'owner', 'assigned_to'),
+    'last_contact': ('last_contact', 'last_contacted', 'last_contact_date'),
+}
+
+STATUSES = ('Active', 'Inactive')
+
+# Column widths of the Customer table
+MAX_LENGTHS = {'name': 100, 'email': 120, 'phone': 20, 'location': 100,
+               'status': 50, 'tags': 200, 'assigned_staff': 100, 'last_contact': 50}
+
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportRecord:
+    """One CSV row: line number, cleaned fields and match keys, or an error. customer_id is set once matched or created."""
+
+    def __init__(self, line, fields=None, email_key=None, phone_key=None, error=None):
+        self.line = line
+        self.fields = fields or {}
+        self.email_key = email_key
+        self.phone_key = phone_key
+        self.error = error
+        self.customer_id = None
+
+    def keys(self):
+        return [k for k in (('email', self.email_key), ('phone', self.phone_key)) if k[1]]
+
+
+class ImportReport:
+    """Running totals for an import; errors are kept up to MAX_REPORTED_ERRORS."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped_existing = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+
+    def reject(self, line, reason):
+        self.invalid += 1
+        self.error(line, reason)
+
+    def error(self, line, reason):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': reason})
+
+    def add(self, other):
+        """Fold in the totals and errors of a batch written on its own (rows are counted as they are read)."""
+        self.created += other.created
+        self.updated += other.updated
+        self.skipped_existing += other.skipped_existing
+        self.duplicates += other.duplicates
+        self.invalid += other.invalid
+        for error in other.errors:
+            self.error(error['line'], error['error'])
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'skipped_existing': self.skipped_existing,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'errors': self.errors,
+            'errors_truncated': self.invalid + self.duplicates > len(self.errors),
+        }
+
+
+def header_map(header):
+    """Map CSV column positions to Customer fields; unknown columns are ignored."""
+    lookup = {alias: field for field, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    mapping = {}
+    for position, title in enumerate(header):
+        key = (title or '').strip().lower().replace(' ', '_').replace('-', '_')
+        field = lookup.get(key)
+        if field and field not in mapping.values():
+            mapping[position] = field
+    return mapping
+
+
+def clean_record(line, values, country_code):
+    """values: {field: raw string}. Returns an ImportRecord."""
+    fields = {k: (v or '').strip() for k, v in values.items()}
+    fields = {k: v for k, v in fields.items() if v}
+
+    if not fields.get('name'):
+        return ImportRecord(line, error='name is required')
+    if not fields.get('email') and not fields.get('phone'):
+        return ImportRecord(line, error='an email or phone is required')
+
+    email_key = phone_key = None
+    if fields.get('email'):
+        email_key = normalize_email(fields['email'])
+        if email_key is None:
+            return ImportRecord(line, error=f"invalid email '{fields['email']}'")
+        fields['email'] = email_key
+    if fields.get('phone'):
+        phone_key = normalize_phone(fields['phone'], country_code)
+        if phone_key is None:
+            return ImportRecord(line, error=f"invalid phone '{fields['phone']}'")
+        fields['phone'] = phone_key
+    if 'status' in fields:
+        status = fields['status'].capitalize()
+        if status not in STATUSES:
+            return ImportRecord(line, error=f"status must be one of {', '.join(STATUSES)}")
+        fields['status'] = status
+    if 'tags' in fields:
+        fields['tags'] = ','.join(dict.fromkeys(t.strip() for t in fields['tags'].split(',') if t.strip()))
+    for field, limit in MAX_LENGTHS.items():
+        if len(fields.get(field, '')) > limit:
+            return ImportRecord(line, error=f'{field} is longer than {limit} characters')
+
+    return ImportRecord(line, fields, email_key, phone_key)
+
+
+def read_customers(stream, country_code):
+    """
+    stream: text file object. Yields ImportRecord per data row without
+    reading the whole file; raises ValueError when no usable header is found.
+    National phone numbers are read as belonging to country_code.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    mapping = header_map(header or [])
+    if 'name' not in mapping.values():
+        raise ValueError('CSV header must include a name column')
+    if not {'email', 'phone'} & set(mapping.values()):
+        raise ValueError('CSV header must include an email or phone column')
+
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        values = {field: row[position] for position, field in mapping.items() if position < len(row)}
+        # reader.line_num counts physical lines, so quoted newlines keep the numbers right
+        yield clean_record(reader.line_num, values, country_code)
@@ -0,0 +1,157 @@
+"""
+Per-backend database engine settings.
+
+SQLite under several gunicorn workers: every new DBAPI connection gets the
+pragmas from sqlite_pragmas() -- WAL journal (readers and the single writer
+no longer block each other), synchronous=NORMAL (durable at WAL checkpoints,
+safe for WAL), a bigger page cache and mmap window, and busy_timeout so a
+writer waits for the lock instead of failing immediately. Writes that still
+lose the race ("database is locked") are rerun by retry_on_lock() with
+jittered exponential backoff.
+
+PostgreSQL: URLs are pinned to the psycopg2 driver the project depends on,
+each process (gunicorn worker) gets a bounded, pre-pinged connection pool,
+and every session starts with statement / lock / idle-in-transaction
+timeouts so one runaway query cannot hold a worker or a lock indefinitely.
+Long-running jobs (exports, migrations) lift them with set_local_timeouts(),
+and bulk loads that pick their own ids call sync_sequences() afterwards.
+"""
+import logging
+import random
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')
+SYNCHRONOUS_MODES = ('off', 'normal', 'full', 'extra')
+
+LOCK_MESSAGES = ('database is locked', 'database table is locked', 'database schema is locked')
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_pragmas(journal_mode='wal', synchronous='normal', busy_timeout_ms=5000, cache_size_kb=20000,
+                   mmap_size=128 * 1024 * 1024):
+    """[(pragma, value)] in the order they should run; raises ValueError on unknown modes."""
+    journal_mode, synchronous = journal_mode.lower(), synchronous.lower()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"unknown SQLite journal mode '{journal_mode}'")
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f"unknown SQLite synchronous mode '{synchronous}'")
+    return [
+        # busy_timeout first, so switching the journal mode itself waits for other connections
+        ('busy_timeout', int(busy_timeout_ms)),
+        ('journal_mode', journal_mode),
+        ('synchronous', synchronous),
+        ('cache_size', -int(cache_size_kb)),  # negative = KiB rather than pages
+        ('mmap_size', int(mmap_size)),
+        ('temp_store', 'memory'),
+    ]
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run the pragmas on every new connection of a SQLite engine (no-op for other backends)."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def is_lock_error(exc):
+    """True for SQLite's "database is locked" family of errors."""
+    if not isinstance(exc, OperationalError):
+        return False
+    message = str(exc.orig if exc.orig is not None else exc).lower()
+    return any(text in message for text in LOCK_MESSAGES)
+
+
+def backoff_delay(attempt, base_delay, max_delay=1.0):
+    """Full-jitter exponential backoff: uniform in [0, base * 2**attempt], capped at max_delay."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_on_lock(work, rollback, attempts=3, base_delay=0.05):
+    """
+    Call work() (which must do the whole transaction, commit included) and
+    return its result. On a lock error call rollback() and try again, up to
+    attempts extra times; other errors and the final failure propagate.
+    """
+    for attempt in range(attempts + 1):
+        try:
+            return work()
+        except OperationalError as exc:
+            rollback()
+            if attempt == attempts or not is_lock_error(exc):
+                raise
+            time.sleep(backoff_delay(attempt, base_delay))
+
+
+def normalize_database_url(url):
+    """postgres:// (as Render/Heroku hand out) and driverless postgresql:// become postgresql+psycopg2://."""
+    for prefix in ('postgres://', 'postgresql://'):
+        if url.startswith(prefix):
+            return 'postgresql+psycopg2://' + url[len(prefix):]
+    return url
+
+
+def postgres_engine_options(pool_size=5, max_overflow=5, pool_timeout=10, pool_recycle=1800,
+                            statement_timeout_ms=15000, lock_timeout_ms=5000,
+                            idle_in_transaction_timeout_ms=60000, application_name='crm'):
+    """SQLALCHEMY_ENGINE_OPTIONS for one process; it holds at most pool_size + max_overflow connections."""
+    options = ' '.join(f'-c {name}={int(value)}' for name, value in (
+        ('statement_timeout', statement_timeout_ms),
+        ('lock_timeout', lock_timeout_ms),
+        ('idle_in_transaction_session_timeout', idle_in_transaction_timeout_ms),
+    ))
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': True,
+        'connect_args': {'options': options, 'application_name': application_name, 'connect_timeout': 10},
+    }
+
+
+def set_local_timeouts(connection, statement_timeout_ms=0, idle_in_transaction_timeout_ms=0):
+    """Override the PostgreSQL session timeouts for the current transaction only (0 = no limit)."""
+    if connection.dialect.name != 'postgresql':
+        return
+    connection.execute(text(f'SET LOCAL statement_timeout = {int(statement_timeout_ms)}'))
+    connection.execute(text(f'SET LOCAL idle_in_transaction_session_timeout = {int(idle_in_transaction_timeout_ms)}'))
+
+
+def sync_sequences(connection, tables):
+    """Move PostgreSQL id sequences past rows inserted with explicit ids, so later inserts do not collide."""
+    if connection.dialect.name != 'postgresql':
+        return
+    preparer = connection.dialect.identifier_preparer
+    for table in tables:
+        name = preparer.format_table(table)
+        connection.execute(text(f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                                f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {name}), false)"))
+
+
+def has_extension(connection, name):
+    return connection.execute(text('SELECT 1 FROM pg_extension WHERE extname = :name'), {'name': name}).first() is not None
+
+
+def create_extension(connection, name):
+    """CREATE EXTENSION IF NOT EXISTS, inside a savepoint; False when the server does not ship it or we lack rights."""
+    if connection.dialect.name != 'postgresql':
+        return False
+    try:
+        with connection.begin_nested():
+            connection.execute(text(f'CREATE EXTENSION IF NOT EXISTS {name}'))
+    except DBAPIError as e:
+        logger.warning("PostgreSQL extension %s unavailable: %s", name, e)
+        return False
+    return True
@@ -0,0 +1,71 @@
+"""
+Streaming encoders for the CSV / NDJSON exports.
+
+Everything here works on iterators and yields bytes in chunks of roughly
+CHUNK_SIZE, so an export never holds more than one chunk (plus the database
+driver's fetch batch) in memory regardless of how many rows it covers.
+"""
+import csv
+import io
+import json
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+
+
+def csv_chunks(header, rows, chunk_size=CHUNK_SIZE):
+    """rows: iterable of sequences. Yields UTF-8 encoded CSV text."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(['' if value is None else value for value in row])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_chunks(records, chunk_size=CHUNK_SIZE):
+    """records: iterable of JSON-serialisable dicts, one per line."""
+    parts = []
+    size = 0
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield ''.join(parts).encode('utf-8')
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a byte stream on the fly into a single gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def group_rows(rows, key_length):
+    """
+    Group consecutive rows sharing their first key_length columns, e.g. a
+    session joined to its messages ordered by session. Yields (key, [rest]).
+    """
+    current = None
+    members = []
+    for row in rows:
+        key, rest = tuple(row[:key_length]), tuple(row[key_length:])
+        if key != current:
+            if current is not None:
+                yield current, members
+            current, members = key, []
+        members.append(rest)
+    if current is not None:
+        yield current, members
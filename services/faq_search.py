@@ -0,0 +1,119 @@
+"""
+Ranked FAQ retrieval.
+
+A small in-memory BM25 index over FAQ questions and answers. Question terms are
+weighted higher than answer terms, stopwords are dropped, and the index can be
+updated one FAQ at a time so edits don't require a full rebuild.
+"""
+import math
+import re
+import threading
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you
+your yours yourself yourselves hi hello hey please thanks thank u im ive id dont cant
+""".split())
+
+
+def tokenize(text):
+    """Lowercase, split on non-alphanumerics, drop stopwords and fold simple plurals."""
+    tokens = []
+    for tok in TOKEN_RE.findall((text or '').lower()):
+        if tok in STOPWORDS:
+            continue
+        if len(tok) > 3 and tok.endswith('s') and not tok.endswith('ss'):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+class FAQSearchIndex:
+    """BM25 index keyed by FAQ id, safe to update while other threads search."""
+
+    def __init__(self, faqs=(), k1=1.2, b=0.75, question_weight=2):
+        self.k1 = k1
+        self.b = b
+        self.question_weight = question_weight
+        self._docs = {}        # faq_id -> {'answer', 'length', 'tf'}
+        self._postings = {}    # term -> {faq_id: weighted tf}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        for faq in faqs:
+            self.upsert(faq)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, faq_id):
+        return faq_id in self._docs
+
+    def _term_frequencies(self, faq):
+        tf = Counter()
+        for tok in tokenize(faq.get('question')):
+            tf[tok] += self.question_weight
+        for tok in tokenize(faq.get('answer')):
+            tf[tok] += 1
+        return tf
+
+    def upsert(self, faq):
+        """Add or replace one FAQ ({'id', 'question', 'answer'})."""
+        tf = self._term_frequencies(faq)
+        with self._lock:
+            self._remove_locked(faq['id'])
+            length = sum(tf.values())
+            self._docs[faq['id']] = {'answer': faq.get('answer'), 'length': length, 'tf': tf}
+            self._total_length += length
+            for term, freq in tf.items():
+                self._postings.setdefault(term, {})[faq['id']] = freq
+
+    def remove(self, faq_id):
+        with self._lock:
+            self._remove_locked(faq_id)
+
+    def _remove_locked(self, faq_id):
+        doc = self._docs.pop(faq_id, None)
+        if not doc:
+            return
+        self._total_length -= doc['length']
+        for term in doc['tf']:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(faq_id, None)
+            if not posting:
+                del self._postings[term]
+
+    def search(self, query, top_k=3, min_score=0.0):
+        """Return up to top_k (faq_id, answer, score) tuples with score >= min_score, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_length = (self._total_length / n_docs) or 1.0
+            scores = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for faq_id, freq in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._docs[faq_id]['length'] / avg_length)
+                    scores[faq_id] = scores.get(faq_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+
+            ranked = sorted(
+                (item for item in scores.items() if item[1] >= min_score),
+                key=lambda item: (-item[1], item[0])
+            )[:top_k]
+            return [(faq_id, self._docs[faq_id]['answer'], round(score, 4)) for faq_id, score in ranked]
@@ -0,0 +1,224 @@
+"""
+Keyword matching for auto-reply templates and lead-scoring rules.
+
+Exact keywords are found by substring with an Aho-Corasick automaton. On top of
+that every keyword token is indexed by its deletion neighbourhood (SymSpell
+style), so a misspelt message word ("pricng", "intergration") finds its keyword
+with a fixed number of dictionary lookups, however many keywords are indexed.
+
+Fuzzy hits rank below exact ones: a message word that is itself a keyword
+token never fuzzy-matches another keyword, and a word that is equally close
+to several keyword tokens matches none of them. Words under five letters are
+only matched exactly, since one edit turns most of them into another common
+word ("sale"/"same", "demo"/"memo", "cost"/"most").
+"""
+import re
+from collections import deque
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Keywords with other characters ("c++", "24/7") depend on them, so they only match exactly
+FUZZY_KEYWORD_RE = re.compile(r"[a-z0-9]+(?: [a-z0-9]+)*")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds every keyword contained in a text in one pass."""
+
+    def __init__(self, keywords):
+        # keywords: iterable of (keyword, payload)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+
+        for keyword, payload in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state].add(payload)
+
+        # Breadth-first pass to wire failure links and merge outputs
+        # (children of the root always fail back to the root)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def search(self, text):
+        """Return the set of payloads whose keyword occurs anywhere in text."""
+        found = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+def split_keywords(raw):
+    """Normalise a comma-separated keyword string the same way the old matcher did."""
+    if not raw:
+        return []
+    return [k.strip() for k in raw.lower().split(',') if k.strip()]
+
+# Message words longer than this are never fuzzy-matched (bounds the work per word)
+MAX_FUZZY_TOKEN_LENGTH = 24
+
+
+def allowed_edits(length, max_edits, min_length=5):
+    """Edits tolerated for a word of this length: none for short words, more for long ones."""
+    if max_edits <= 0 or length < min_length:
+        return 0
+    if length < 8:
+        return 1
+    return max_edits
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+def _deletes(word, depth):
+    """All strings reachable from word by removing up to depth characters (word included)."""
+    result = {word}
+    frontier = {word}
+    for _ in range(depth):
+        nxt = set()
+        for w in frontier:
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1:])
+        nxt -= result
+        result |= nxt
+        frontier = nxt
+    return result
+
+
+class FuzzyKeywordIndex:
+    """Deletion-neighbourhood index over keyword tokens; phrases must match as consecutive words."""
+
+    # Message words repeat a lot, so remember each word's matches (cleared when full)
+    MEMO_SIZE = 50000
+
+    def __init__(self, keywords, max_edits=2, min_length=5):
+        # keywords: iterable of (keyword, payload)
+        self.max_edits = max_edits
+        self.min_length = min_length
+        self._tokens = set()    # every keyword token
+        self._variants = {}     # deletion variant -> {keyword token}
+        self._phrases = {}      # first token -> [(tokens, payload)]
+        self._memo = {}         # message word -> frozenset of matching keyword tokens
+
+        for keyword, payload in keywords:
+            keyword = ' '.join((keyword or '').lower().split())
+            if not FUZZY_KEYWORD_RE.fullmatch(keyword):
+                continue
+            tokens = keyword.split()
+            self._phrases.setdefault(tokens[0], []).append((tokens, payload))
+            self._tokens.update(tokens)
+            for tok in tokens:
+                depth = allowed_edits(len(tok), max_edits, min_length)
+                if depth:
+                    for variant in _deletes(tok, depth):
+                        self._variants.setdefault(variant, set()).add(tok)
+
+    def _token_matches(self, word):
+        """The word itself, plus the one keyword token closest to it within the allowed edit distance."""
+        matches = self._memo.get(word)
+        if matches is not None:
+            return matches
+        matches = {word}
+        # Exact keyword words never fuzzy-match a different keyword
+        if word not in self._tokens and self.max_edits > 0 and self.min_length - 1 <= len(word) <= MAX_FUZZY_TOKEN_LENGTH:
+            candidates = set()
+            for variant in _deletes(word, self.max_edits):
+                candidates |= self._variants.get(variant, set())
+            best, closest = self.max_edits + 1, []
+            for tok in candidates:
+                limit = allowed_edits(len(tok), self.max_edits, self.min_length)
+                distance = edit_distance(word, tok, limit)
+                if distance > limit or distance > best:
+                    continue
+                if distance < best:
+                    best, closest = distance, []
+                closest.append(tok)
+            # Equally close to several keywords: ambiguous, so match none of them
+            if len(closest) == 1:
+                matches.add(closest[0])
+        if len(self._memo) >= self.MEMO_SIZE:
+            self._memo.clear()
+        matches = self._memo[word] = frozenset(matches)
+        return matches
+
+    def search(self, text):
+        """Return the set of payloads whose keyword (or a close misspelling) appears in text."""
+        words = TOKEN_RE.findall((text or '').lower())
+        if not words or not self._phrases:
+            return set()
+        hits = [self._token_matches(w) for w in words]
+        found = set()
+        for i, matched in enumerate(hits):
+            for first in matched:
+                for tokens, payload in self._phrases.get(first, ()):
+                    if payload in found or i + len(tokens) > len(hits):
+                        continue
+                    if all(tokens[j] in hits[i + j] for j in range(1, len(tokens))):
+                        found.add(payload)
+        return found
+
+
+class KeywordMatcher:
+    """Exact substring matching plus typo-tolerant token matching over the same keywords."""
+
+    def __init__(self, keywords, max_edits=2, min_length=5):
+        keywords = list(keywords)
+        self._exact = KeywordAutomaton(keywords)
+        self._fuzzy = FuzzyKeywordIndex(keywords, max_edits=max_edits, min_length=min_length) if max_edits > 0 else None
+
+    def search(self, text):
+        text = (text or '').lower()
+        found = self._exact.search(text)
+        if self._fuzzy is not None:
+            found |= self._fuzzy.search(text)
+        return found
+
+
+def compile_keywords(items, max_edits=2, min_length=5):
+    """Build a KeywordMatcher from (comma-separated keywords, payload) pairs."""
+    return KeywordMatcher(
+        ((kw, payload) for raw, payload in items for kw in split_keywords(raw)),
+        max_edits=max_edits,
+        min_length=min_length
+    )
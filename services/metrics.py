@@ -0,0 +1,131 @@
+"""
+Daily metric buckets for the dashboard graphs.
+
+Every metric is kept as one row per day holding the number of events and the
+sum of their values, so totals and averages over any window are read from at
+most one row per day no matter how much data produced them. The helpers here
+are storage-agnostic: the app accumulates deltas with MetricBuckets and writes
+them with an upsert, then turns the stored rows back into chart series.
+"""
+from datetime import date, datetime, timedelta
+
+LEADS = 'leads'                  # new visitor chat sessions
+NEW_CUSTOMERS = 'new_customers'  # customer records created
+CONVERSIONS = 'conversions'      # visitor sessions linked to a customer
+RESPONSE_TIME = 'response_time'  # minutes from a waiting visitor message to the agent reply
+
+# The formats the app writes into its string timestamp columns
+TIMESTAMP_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%I:%M %p')
+
+# Ignore "response times" that are really a conversation resumed days later
+MAX_RESPONSE_MINUTES = 24 * 60
+
+
+def parse_timestamp(value, default_date=None):
+    """
+    Parse one of the app's timestamp strings into a datetime.
+
+    Time-only values ('%I:%M %p') are placed on default_date (today if not
+    given). Returns None for empty or unrecognised values.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            parsed = datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+        if fmt == '%I:%M %p':
+            day = default_date or date.today()
+            parsed = datetime.combine(day, parsed.time())
+        return parsed
+    return None
+
+
+def response_minutes(waiting_since, replied_at):
+    """Minutes between a visitor message and the reply, or None if it is not a plausible response time."""
+    if waiting_since is None or replied_at is None:
+        return None
+    delta = replied_at - waiting_since
+    if delta.total_seconds() < 0:
+        # Time-only stamps on either side of midnight
+        delta += timedelta(days=1)
+    minutes = delta.total_seconds() / 60.0
+    if minutes > MAX_RESPONSE_MINUTES:
+        return None
+    return minutes
+
+
+class MetricBuckets:
+    """Accumulates {(metric, day): [count, total]} deltas before they are written."""
+
+    def __init__(self):
+        self.buckets = {}
+
+    def add(self, metric, day, value=1.0):
+        if isinstance(day, datetime):
+            day = day.date()
+        bucket = self.buckets.setdefault((metric, day), [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += value
+
+    def rows(self):
+        return [
+            {'metric': metric, 'day': day, 'count': count, 'total': total}
+            for (metric, day), (count, total) in self.buckets.items()
+        ]
+
+    def __bool__(self):
+        return bool(self.buckets)
+
+
+def days_ending(end_day, days):
+    return [end_day - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+
+
+def months_ending(end_day, months):
+    """The first day of each of the last `months` calendar months, oldest first."""
+    year, month = end_day.year, end_day.month
+    starts = []
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return starts[::-1]
+
+
+def daily_counts(buckets, metric, days):
+    """Events per day; buckets is {(metric, day): (count, total)}."""
+    return [buckets.get((metric, day), (0, 0.0))[0] for day in days]
+
+
+def daily_averages(buckets, metric, days, digits=1):
+    """Average value per day, None for days without events."""
+    series = []
+    for day in days:
+        count, total = buckets.get((metric, day), (0, 0.0))
+        series.append(round(total / count, digits) if count else None)
+    return series
+
+
+def monthly_counts(buckets, metric, month_starts):
+    sums = {start: 0 for start in month_starts}
+    for (name, day), (count, _) in buckets.items():
+        if name != metric:
+            continue
+        start = date(day.year, day.month, 1)
+        if start in sums:
+            sums[start] += count
+    return [sums[start] for start in month_starts]
+
+
+def window_sum(buckets, metric, since):
+    count = total = 0
+    for (name, day), (n, value) in buckets.items():
+        if name == metric and day >= since:
+            count += n
+            total += value
+    return count, total
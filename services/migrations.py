@@ -0,0 +1,207 @@
+"""
+Versioned schema migrations.
+
+A Migration is an integer version, a description and upgrade/downgrade
+callables that take a Connection. Applied versions are recorded one row each
+in the schema_version table; upgrade() runs the pending ones in order, each
+committed on its own, and downgrade() reverts them newest first. Migrations
+run inside that transaction, so their steps must not commit.
+
+The schema operations below are idempotent (IF [NOT] EXISTS, column checks),
+so a database built by create_all() before this table existed can be brought
+forward by running every migration from version 0. Indexes limited to one
+backend with Index.ddl_if() are skipped (and not reported) elsewhere.
+
+On PostgreSQL each migration runs without the web statement timeout, since
+index builds and backfills on large tables legitimately take a while.
+"""
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex
+
+from services.engine_profile import set_local_timeouts
+
+VERSION_TABLE = 'schema_version'
+
+version_table = sa.Table(
+    VERSION_TABLE, sa.MetaData(),
+    sa.Column('version', sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column('description', sa.String(200), nullable=False),
+    sa.Column('applied_at', sa.String(50)),
+)
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    """downgrade is None for steps that cannot be reverted; downgrade() refuses to go below them."""
+
+    def __init__(self, version, description, upgrade, downgrade=None):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.downgrade = downgrade
+
+
+def check_sequence(migrations):
+    versions = [m.version for m in migrations]
+    if versions != sorted(set(versions)) or (versions and versions[0] < 1):
+        raise MigrationError('migration versions must be unique, ascending and start above 0')
+
+
+def applied_versions(connection):
+    version_table.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(sa.select(version_table.c.version))}
+
+
+def current_version(connection):
+    return max(applied_versions(connection), default=0)
+
+
+def pending(connection, migrations):
+    applied = applied_versions(connection)
+    return [m for m in migrations if m.version not in applied]
+
+
+def record(connection, migration):
+    if migration.version not in applied_versions(connection):
+        connection.execute(version_table.insert().values(
+            version=migration.version, description=migration.description,
+            applied_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+
+def upgrade(session, migrations, target=None):
+    """Apply pending migrations up to target (default: all). Returns the migrations applied."""
+    check_sequence(migrations)
+    applied = []
+    for migration in pending(session.connection(), migrations):
+        if target is not None and migration.version > target:
+            break
+        set_local_timeouts(session.connection())
+        migration.upgrade(session.connection())
+        record(session.connection(), migration)
+        session.commit()
+        applied.append(migration)
+    return applied
+
+
+def downgrade(session, migrations, target):
+    """Revert applied migrations above target, newest first. Returns the migrations reverted."""
+    check_sequence(migrations)
+    applied = applied_versions(session.connection())
+    to_revert = [m for m in reversed(migrations) if m.version > target and m.version in applied]
+    irreversible = [m for m in to_revert if m.downgrade is None]
+    if irreversible:
+        # Checked up front, so nothing is reverted when the target cannot be reached
+        floor = irreversible[0]
+        raise MigrationError(f'migration {floor.version} ({floor.description}) cannot be reverted;'
+                             f' the lowest reachable version is {floor.version}')
+    reverted = []
+    for migration in to_revert:
+        set_local_timeouts(session.connection())
+        migration.downgrade(session.connection())
+        session.connection().execute(version_table.delete().where(version_table.c.version == migration.version))
+        session.commit()
+        reverted.append(migration)
+    return reverted
+
+
+def stamp(session, migrations):
+    """Mark every migration applied without running it, for a schema just built by create_all()."""
+    check_sequence(migrations)
+    for migration in migrations:
+        record(session.connection(), migration)
+    session.commit()
+
+
+# --- Schema operations ---
+
+def has_column(connection, table_name, column_name):
+    return column_name in {c['name'] for c in sa.inspect(connection).get_columns(table_name)}
+
+
+def add_column(connection, column):
+    """Add a model column (nullable, or with a server default) to its existing table."""
+    if has_column(connection, column.table.name, column.name):
+        return False
+    preparer = connection.dialect.identifier_preparer
+    column_type = column.type.compile(dialect=connection.dialect)
+    references = ''
+    for foreign_key in column.foreign_keys:
+        references = (f' REFERENCES {preparer.quote(foreign_key.column.table.name)}'
+                      f' ({preparer.quote(foreign_key.column.name)})')
+    connection.execute(sa.text(f'ALTER TABLE {preparer.format_table(column.table)}'
+                               f' ADD COLUMN {preparer.format_column(column)} {column_type}{references}'))
+    return True
+
+
+def drop_column(connection, table_name, column_name):
+    if not has_column(connection, table_name, column_name):
+        return False
+    preparer = connection.dialect.identifier_preparer
+    connection.execute(sa.text(f'ALTER TABLE {preparer.quote(table_name)} DROP COLUMN {preparer.quote(column_name)}'))
+    return True
+
+
+def applies_to(index, connection):
+    """False for an index that Index.ddl_if() limits to another backend or an unmet condition."""
+    condition = getattr(index, '_ddl_if', None)
+    return condition is None or condition._should_execute(CreateIndex(index), index, connection)
+
+
+def create_indexes(connection, table, *names):
+    """Create the named indexes declared on a model table (those that apply to this backend)."""
+    declared = {index.name: index for index in table.indexes}
+    for name in names:
+        if name not in declared:
+            raise MigrationError(f'{table.name} declares no index {name}')
+        if applies_to(declared[name], connection):
+            connection.execute(CreateIndex(declared[name], if_not_exists=True))
+
+
+def drop_indexes(connection, *names):
+    preparer = connection.dialect.identifier_preparer
+    for name in names:
+        connection.execute(sa.text(f'DROP INDEX IF EXISTS {preparer.quote(name)}'))
+
+
+# --- Live schema vs models ---
+
+def live_index_names(connection, table_name):
+    """Names of the explicitly created indexes on a table, including expression indexes."""
+    if connection.dialect.name == 'sqlite':
+        # Reflection skips expression indexes on SQLite; origin 'c' excludes PK/UNIQUE autoindexes
+        rows = connection.exec_driver_sql(f'PRAGMA index_list("{table_name}")')
+        return {row[1] for row in rows if row[3] == 'c'}
+    # Skip the indexes that back UNIQUE constraints
+    return {index['name'] for index in sa.inspect(connection).get_indexes(table_name)
+            if 'duplicates_constraint' not in index}
+
+
+def schema_differences(connection, metadata):
+    """Human-readable differences between the live database and the models' tables, columns and indexes."""
+    inspector = sa.inspect(connection)
+    live_tables = set(inspector.get_table_names())
+    differences = []
+    for table in metadata.sorted_tables:
+        if table.name not in live_tables:
+            differences.append(f'missing table {table.name}')
+            continue
+        live_columns = {c['name']: c for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in live_columns:
+                differences.append(f'missing column {table.name}.{column.name}')
+        for name in sorted(set(live_columns) - set(table.columns.keys())):
+            differences.append(f'extra column {table.name}.{name}')
+        declared = {index.name for index in table.indexes if applies_to(index, connection)}
+        live = live_index_names(connection, table.name)
+        for name in sorted(declared - live):
+            differences.append(f'missing index {name} on {table.name}')
+        for name in sorted(live - declared):
+            differences.append(f'extra index {name} on {table.name}')
+    for name in sorted(live_tables - set(metadata.tables) - {VERSION_TABLE}):
+        differences.append(f'extra table {name}')
+    return differences
@@ -0,0 +1,59 @@
+"""
+Opaque cursors for keyset ("seek") pagination.
+
+A cursor records the sort key and the (sort value, id) of the last row on the
+page; the next page continues strictly after that pair, so every page costs
+the same index range scan no matter how deep the client has paged.
+"""
+import base64
+import json
+
+from sqlalchemy import and_, func, or_
+
+
+def encode_cursor(sort, value, row_id):
+    payload = json.dumps({'s': sort, 'v': value, 'id': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort):
+    """Return (value, id) from a cursor made for the same sort key; raises ValueError otherwise."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        value, row_id = data['v'], int(data['id'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('invalid cursor')
+    if data.get('s') != sort:
+        raise ValueError('cursor does not match the requested sort')
+    return value, row_id
+
+
+def keyset_page(query, sort_name, sort_expr, id_column, cursor=None, descending=False, limit=50):
+    """
+    One page of query ordered by (sort_expr, id_column), continuing after cursor.
+    Returns (items, next_cursor); raises ValueError for a bad cursor.
+    """
+    if cursor:
+        value, last_id = decode_cursor(cursor, f"{sort_name}:{'desc' if descending else 'asc'}")
+        if descending:
+            query = query.filter(or_(sort_expr < value, and_(sort_expr == value, id_column < last_id)))
+        else:
+            query = query.filter(or_(sort_expr > value, and_(sort_expr == value, id_column > last_id)))
+    if descending:
+        query = query.order_by(sort_expr.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_expr.asc(), id_column.asc())
+    rows = query.add_columns(sort_expr, id_column).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(f"{sort_name}:{'desc' if descending else 'asc'}", rows[-1][-2], rows[-1][-1])
+    return [row[0] for row in rows], next_cursor
+
+
+def estimate_count(query, id_column, cap):
+    """(count, exact): counts matching rows up to cap, so huge result sets stay cheap."""
+    limited = query.with_entities(id_column).order_by(None).limit(cap + 1).subquery()
+    count = query.session.query(func.count()).select_from(limited).scalar()
+    return min(count, cap), count <= cap
@@ -0,0 +1,79 @@
+"""
+LRU cache of auto-reply results keyed on the normalized visitor message.
+
+The key is exactly the text the matcher sees (normalize_message output), so
+two messages share an entry only when they are matched identically.
+Punctuation is kept: keywords such as "c++" or "24/7" depend on it.
+
+Entries remember the template/FAQ version they were computed against, so any
+template or FAQ change makes them miss. Hit/miss counters are kept so the
+benefit can be measured on real traffic (see /api/auto-reply/cache-stats).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_message(text):
+    """Lowercase and collapse whitespace: '  Hello,  PRICE? ' -> 'hello, price?'. The matcher runs on this text."""
+    return ' '.join((text or '').lower().split())
+
+
+class ReplyCache:
+    def __init__(self, max_entries=2048, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (version, expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, version):
+        """Return the cached value, or None if missing, expired or built for another version."""
+        if self.max_entries <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, expires_at, value = entry
+            if entry_version != version or expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, version, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
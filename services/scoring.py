@@ -0,0 +1,35 @@
+"""Compiled lead-scoring rules, so scoring a session doesn't re-query and re-split every rule."""
+from services.keywords import compile_keywords
+
+
+class CompiledRules:
+    """Active rules in evaluation order plus one keyword matcher over all of them."""
+
+    def __init__(self, rules, max_edits=2, min_length=5):
+        # rules: [{'id', 'keywords', 'score', 'operation'}]
+        self.rules = list(rules)
+        self._matcher = compile_keywords(
+            ((r['keywords'], i) for i, r in enumerate(self.rules)),
+            max_edits=max_edits,
+            min_length=min_length
+        )
+
+    def score(self, visitor_text):
+        matched = self._matcher.search(visitor_text)
+        score = 0
+        # Rules are applied in order because '*' and '/' depend on the running total
+        for i, rule in enumerate(self.rules):
+            if i not in matched:
+                continue
+            try:
+                val = int(rule['score'])
+                op = rule['operation']
+                # Robustly handle symbol ('+') vs verbose ('Add (+)') formats
+                if '+' in op: score += val
+                elif '-' in op: score -= val
+                elif '*' in op: score *= val
+                elif '/' in op:
+                    if val != 0: score /= val
+            except:
+                pass
+        return score
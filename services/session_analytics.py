@@ -0,0 +1,121 @@
+"""
+Per-session response analytics.
+
+summarize_sessions() walks chat messages already ordered by (session_id, id)
+one session at a time and produces a small summary per session:
+
+- first_response_seconds: first visitor message -> first agent message
+- takeover_delay_seconds: first visitor message -> an agent taking the chat
+  over (the takeover system message, or the first agent message if the agent
+  simply replied)
+- bot_only: the visitor talked, the bot answered and no agent ever joined
+
+aggregate() turns a list of those summaries into the dashboard numbers. NumPy
+is used for the percentile maths when it is installed; the pure Python path
+gives the same results.
+"""
+from services.metrics import parse_timestamp
+
+try:
+    import numpy
+except ImportError:  # optional; only speeds up aggregate()
+    numpy = None
+
+TAKEOVER_MARKER = 'has taken over this conversation'
+
+
+def summarize_session(session_created_at, messages):
+    """messages: [(sender_type, text, timestamp)] in id order for one session."""
+    last_seen = parse_timestamp(session_created_at)
+    first_customer = first_agent = takeover = None
+    counts = {'customer': 0, 'bot': 0, 'agent': 0}
+
+    for sender_type, text, timestamp in messages:
+        stamp = parse_timestamp(timestamp, default_date=last_seen.date() if last_seen else None)
+        if stamp is not None:
+            last_seen = stamp
+        if sender_type in counts:
+            counts[sender_type] += 1
+        if sender_type == 'customer' and first_customer is None:
+            first_customer = stamp
+        elif sender_type == 'agent' and first_agent is None:
+            first_agent = stamp
+            if takeover is None:
+                takeover = stamp
+        elif sender_type == 'system' and takeover is None and text and TAKEOVER_MARKER in text:
+            takeover = stamp
+
+    def seconds_after_first_customer(moment):
+        if first_customer is None or moment is None:
+            return None
+        seconds = (moment - first_customer).total_seconds()
+        # An agent can take over before the visitor writes anything
+        return max(seconds, 0.0)
+
+    return {
+        'customer_messages': counts['customer'],
+        'bot_messages': counts['bot'],
+        'agent_messages': counts['agent'],
+        'first_response_seconds': seconds_after_first_customer(first_agent),
+        'takeover_delay_seconds': seconds_after_first_customer(takeover),
+        'bot_only': counts['customer'] > 0 and counts['bot'] > 0 and counts['agent'] == 0 and takeover is None,
+    }
+
+
+def summarize_sessions(rows):
+    """
+    rows: iterable of (session_id, session_created_at, sender_type, text, timestamp)
+    ordered by session_id then message id. Yields (session_id, summary); only
+    one session's messages are held in memory at a time.
+    """
+    current = created_at = None
+    messages = []
+    for session_id, session_created_at, sender_type, text, timestamp in rows:
+        if session_id != current:
+            if current is not None:
+                yield current, summarize_session(created_at, messages)
+            current, created_at, messages = session_id, session_created_at, []
+        messages.append((sender_type, text, timestamp))
+    if current is not None:
+        yield current, summarize_session(created_at, messages)
+
+
+def _percentiles(values, points):
+    if not values:
+        return {p: None for p in points}
+    if numpy is not None:
+        result = numpy.percentile(numpy.asarray(values, dtype=float), points)
+        return {p: float(v) for p, v in zip(points, result)}
+    # Linear interpolation, same as numpy's default
+    ordered = sorted(values)
+    out = {}
+    for p in points:
+        rank = (len(ordered) - 1) * p / 100.0
+        low = int(rank)
+        high = min(low + 1, len(ordered) - 1)
+        out[p] = ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+    return out
+
+
+def _stats(values):
+    values = [v for v in values if v is not None]
+    pct = _percentiles(values, (50, 90))
+    return {
+        'count': len(values),
+        'avg_seconds': round(sum(values) / len(values), 1) if values else None,
+        'p50_seconds': round(pct[50], 1) if values else None,
+        'p90_seconds': round(pct[90], 1) if values else None,
+    }
+
+
+def aggregate(rows):
+    """rows: [(first_response_seconds, takeover_delay_seconds, bot_only, customer_messages)]."""
+    engaged = [r for r in rows if r[3]]
+    bot_only = sum(1 for r in engaged if r[2])
+    return {
+        'sessions': len(engaged),
+        'bot_only': bot_only,
+        'deflection_rate': round(bot_only / len(engaged), 4) if engaged else None,
+        'first_response': _stats(r[0] for r in engaged),
+        'takeover_delay': _stats(r[1] for r in engaged),
+    }
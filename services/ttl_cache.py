@@ -0,0 +1,54 @@
+"""
+Short-TTL per-process cache with request coalescing.
+
+When a value expires and several requests ask for it at once, only the first
+one computes it; the others wait for that result instead of repeating the work.
+"""
+import threading
+import time
+
+
+class CoalescingTTLCache:
+    def __init__(self, ttl=10.0):
+        self.ttl = ttl
+        self._values = {}      # key -> (expires_at, value)
+        self._inflight = {}    # key -> threading.Event
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, compute, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        while True:
+            with self._lock:
+                entry = self._values.get(key)
+                if entry and entry[0] > time.monotonic():
+                    self.hits += 1
+                    return entry[1]
+                event = self._inflight.get(key)
+                if event is None:
+                    # We are the leader for this key
+                    event = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.coalesced += 1
+            # Someone else is computing it; wait and re-check (recompute if they failed)
+            event.wait()
+
+        try:
+            value = compute()
+            with self._lock:
+                self._values[key] = (time.monotonic() + ttl, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
@@ -0,0 +1,186 @@
+"""
+Buffered usage counters.
+
+Hot counters (template usage, FAQ clicks) are aggregated in memory and written
+in one batched transaction every few seconds instead of one commit per hit.
+Pending increments are flushed by a background thread -- every interval, or
+as soon as the buffer grows past a threshold -- and on worker shutdown
+(atexit / gunicorn worker_exit). Requests only ever add to the buffer, so a
+failing flush never fails the request that filled it, and while the database
+is unreachable the counts stay buffered and the flusher backs off.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """
+    flush_fn(counters, events) persists one batch:
+      counters -- {kind: Counter({key: increment})}
+      events   -- {kind: [row dict, ...]}
+    If it raises, the batch is merged back and retried on the next flush, the
+    flusher waiting twice as long after each failure (up to max_backoff
+    intervals). Only row_errors -- errors one bad row can cause, say a click on
+    a since-deleted FAQ -- are ever dropped: after max_attempts of them in a
+    row every counter and event is written on its own and the ones that still
+    fail that way are logged and dropped, so they cannot block later flushes.
+    Anything else (a lock, a lost connection) keeps the whole batch buffered.
+    context, if set, returns a context manager every flush runs inside (e.g.
+    app.app_context, since flushes also run on the flusher thread and at exit).
+    """
+
+    def __init__(self, flush_fn, interval=5.0, max_pending=500, context=None, max_attempts=3,
+                 row_errors=(IntegrityError, DataError), max_backoff=12):
+        self._flush_fn = flush_fn
+        self.context = context
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.row_errors = row_errors
+        self.max_backoff = max_backoff
+        self._counters = {}
+        self._events = {}
+        self._pending = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        atexit.register(self.shutdown)
+
+    def _ensure_thread(self):
+        # Started lazily so a pre-forking master never owns the flusher thread
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='usage-buffer-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._failures:
+                # Backing off: a full buffer does not cut the wait short
+                self._stop.wait(self.retry_delay())
+            else:
+                self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.warning("Usage buffer flush failed (%d in a row), retrying in %.0fs",
+                               self._failures, self.retry_delay(), exc_info=True)
+
+    def retry_delay(self):
+        """Seconds the flusher waits after the current run of failures."""
+        return self.interval * min(2 ** max(self._failures - 1, 0), self.max_backoff)
+
+    def increment(self, kind, key, amount=1):
+        with self._lock:
+            self._counters.setdefault(kind, Counter())[key] += amount
+            self._pending += 1
+            full = self._pending >= self.max_pending
+        self._after_add(full)
+
+    def record(self, kind, row):
+        with self._lock:
+            self._events.setdefault(kind, []).append(row)
+            self._pending += 1
+            full = self._pending >= self.max_pending
+        self._after_add(full)
+
+    def _after_add(self, full):
+        self._ensure_thread()
+        if full:
+            # Hand the full buffer to the flusher thread rather than writing on the request thread
+            self._wake.set()
+
+    def pending(self, kind, key):
+        """Increments for key not yet written to the database (this worker only)."""
+        with self._lock:
+            counter = self._counters.get(kind)
+            return counter[key] if counter else 0
+
+    def flush(self):
+        """Write everything buffered so far in one batch. Returns the number of buffered operations written."""
+        with self._flush_lock:
+            with self._lock:
+                counters, events, pending = self._counters, self._events, self._pending
+                self._counters, self._events, self._pending = {}, {}, 0
+            if not pending:
+                return 0
+            try:
+                self._write(counters, events)
+            except Exception as e:
+                self._failures += 1
+                if not isinstance(e, self.row_errors) or self._failures < self.max_attempts:
+                    self._merge_back(counters, events, pending)
+                    raise
+                logger.exception("Usage buffer batch failed %d times; writing its rows one at a time",
+                                 self._failures)
+                written = self._write_each(counters, events)
+                self._failures = 0
+                return written
+            self._failures = 0
+            return pending
+
+    def _write(self, counters, events):
+        if self.context is None:
+            self._flush_fn(counters, events)
+        else:
+            with self.context():
+                self._flush_fn(counters, events)
+
+    def _write_each(self, counters, events):
+        """
+        Isolate the rows that keep failing: write each one alone and drop (and
+        log) those that fail with a row error. Any other error puts the entries
+        not yet written back into the buffer and is raised.
+        """
+        items = [({kind: Counter({key: n})}, {}) for kind, counter in counters.items() for key, n in counter.items()]
+        items += [({}, {kind: [row]}) for kind, rows in events.items() for row in rows]
+        written = 0
+        for position, (item_counters, item_events) in enumerate(items):
+            try:
+                self._write(item_counters, item_events)
+                written += 1
+            except self.row_errors:
+                logger.exception("Dropping usage buffer entry that cannot be written: %r %r",
+                                 item_counters, item_events)
+            except Exception:
+                rest_counters, rest_events = {}, {}
+                for unwritten_counters, unwritten_events in items[position:]:
+                    for kind, counter in unwritten_counters.items():
+                        rest_counters.setdefault(kind, Counter()).update(counter)
+                    for kind, rows in unwritten_events.items():
+                        rest_events.setdefault(kind, []).extend(rows)
+                self._merge_back(rest_counters, rest_events, len(items) - position)
+                raise
+        return written
+
+    def _merge_back(self, counters, events, pending):
+        with self._lock:
+            for kind, counter in counters.items():
+                self._counters.setdefault(kind, Counter()).update(counter)
+            for kind, rows in events.items():
+                self._events[kind] = rows + self._events.get(kind, [])
+            self._pending += pending
+
+    def shutdown(self, retries=3):
+        """Stop the flusher thread and write whatever is left (graceful worker shutdown)."""
+        self._stop.set()
+        self._wake.set()
+        for attempt in range(retries):
+            try:
+                self.flush()
+                return
+            except Exception:
+                logger.warning("Usage buffer final flush failed (attempt %d)", attempt + 1, exc_info=True)
+                time.sleep(0.2 * (attempt + 1))
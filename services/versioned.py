@@ -0,0 +1,60 @@
+"""
+Per-process caches that follow a shared version stamp.
+
+Each worker keeps a compiled copy of some data set (templates, rules, ...) and
+only asks the database for the current version at most once per check
+interval. A local write calls invalidate() so this worker rebuilds at once;
+other workers notice the bumped version on their next check.
+"""
+import threading
+import time
+
+
+class VersionedCache:
+    """
+    build(version) returns the compiled object for the current data and
+    version_getter() returns the shared version stamp. Neither is called on the
+    fast path, only when a refresh is due.
+    """
+
+    def __init__(self, build, version_getter, check_interval=2.0):
+        self._build = build
+        self._version_getter = version_getter
+        self.check_interval = check_interval
+        self._value = None
+        self._version = None
+        self._stale = True
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def invalidate(self):
+        """Force a rebuild on the next call (used after a local write)."""
+        self._stale = True
+
+    def rebuild(self, version=None):
+        if version is None:
+            version = self._version_getter()
+        self._value = self._build(version)
+        self._version = version
+        self._stale = False
+        self._last_check = time.monotonic()
+        return self._value
+
+    def get(self):
+        """Return a fresh-enough value, rebuilding if this or another worker changed the data."""
+        if not self._stale and self._value is not None and time.monotonic() - self._last_check < self.check_interval:
+            return self._value
+
+        with self._lock:
+            if self._stale or self._value is None:
+                return self.rebuild()
+            if time.monotonic() - self._last_check >= self.check_interval:
+                version = self._version_getter()
+                self._last_check = time.monotonic()
+                if version != self._version:
+                    return self.rebuild(version)
+            return self._value
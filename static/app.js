@@ -519,15 +519,8 @@ window.addEventListener('DOMContentLoaded', () => {
     // B. SETUP SEARCH UI
     setupSearch();
 
-    // C. LOAD DATABASE DATA FROM PYTHON (backendSearchSeed)
-    //    This is the KEY FIX: we load all items from all 3 tables
-    //    immediately, BEFORE any page-specific logic runs.
-    if (window.backendSearchSeed) {
-        window.backendSearchSeed.forEach(item => {
-            window.registerGlobalItem(item.category, item.display, item.page);
-        });
-        console.log("Global Search Ready: " + window.backendSearchSeed.length + " items from database.");
-    }
+    // C. Search results come from /api/global-search as the user types (limited per category),
+    //    so pages no longer embed every customer / inquiry for it.
 
     // D. DASHBOARD SPECIFIC
     if (pageId === 'page-dashboard') {
@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+import pytest
+
+# app.py builds a module-level app on import; keep it off the working database
+_scratch = tempfile.mkdtemp(prefix='crm-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_scratch, 'import.db')
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(_scratch, 'uploads'))
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from extensions import db
+    from schema import upgrade_schema
+    from seed import seed_admin
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}", 'TESTING': True})
+    with app.app_context():
+        upgrade_schema()
+        seed_admin()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    response = client.post('/login', data={'username': '252499L', 'password': 'fjr1300A15'})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,31 @@
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import ChatSession, Customer, CustomerSummary, Inquiry, User, customer_summary
+
+
+def test_deleted_rep_is_not_inherited_by_the_next_account(app, admin_client):
+    bob = User(username='bob1', password=generate_password_hash('pw'), name='Bob', role='agent')
+    customer = Customer(name='Acme')
+    db.session.add_all([bob, customer])
+    db.session.commit()
+    bob_id, customer_id = bob.id, customer.id
+    db.session.add_all([
+        Inquiry(customer='Acme', customer_id=customer_id, status='New', assigned_rep='bob1', assigned_user_id=bob_id),
+        ChatSession(visitor_name='Acme', status='agent_active', assigned_agent_id=bob_id, linked_customer_id=customer_id),
+    ])
+    db.session.commit()
+    assert customer_summary(customer_id) == (db.session.get(CustomerSummary, customer_id), 'Bob')
+
+    assert admin_client.post(f'/admin/delete-account/{bob_id}').get_json() == {'success': True}
+    response = admin_client.post('/admin/create-account', data={
+        'username': 'carol', 'password': 'pw', 'name': 'Carol', 'role': 'agent'})
+    assert response.status_code in (200, 302)
+    db.session.expire_all()
+    assert User.query.filter_by(username='carol').one().id == bob_id  # SQLite hands out the freed id
+
+    inquiry = admin_client.get('/api/inquiries').get_json()['inquiries'][0]
+    assert inquiry['rep_id'] is None
+    assert inquiry['assigned_rep'] == 'bob1'
+    assert Inquiry.query.one().assigned_user_id is None
+    assert customer_summary(customer_id)[1] is None
@@ -0,0 +1,40 @@
+from extensions import db
+from models import ChatSession, Customer
+from services.contacts import normalize_phone
+
+
+def test_national_numbers_get_the_country_code_with_or_without_trunk_zero():
+    assert normalize_phone('091234567', '60') == normalize_phone('91234567', '60') == '+6091234567'
+    assert normalize_phone('012-345 6789', '60') == '+60123456789'
+    assert normalize_phone('(9123) 4567', '65') == '+6591234567'
+
+
+def test_bare_international_form_matches_the_national_form():
+    # WhatsApp reports senders as digits with the country code but no +
+    assert normalize_phone('60123456789', '60') == normalize_phone('012-345 6789', '60') == '+60123456789'
+    assert normalize_phone('6591234567', '65') == normalize_phone('9123 4567', '65') == '+6591234567'
+    # Too short to be the country code plus a national number: a national number that starts with it
+    assert normalize_phone('6512 3456', '65') == '+6565123456'
+
+
+def test_international_numbers_keep_their_own_country_code():
+    assert normalize_phone('+44 20 7946 0958', '60') == '+442079460958'
+    assert normalize_phone('0044 20 7946 0958', '60') == '+442079460958'
+    assert normalize_phone('+1234', '60') is None
+    assert normalize_phone('not a phone', '60') is None
+
+
+def test_chats_match_customers_by_the_configured_country_code(app):
+    app.config['DEFAULT_COUNTRY_CODE'] = '65'
+    customer = Customer(name='Tan', phone='9123 4567')
+    db.session.add(customer)
+    db.session.commit()
+    chat = ChatSession(visitor_name='Tan', visitor_phone='+65 9123 4567', status='bot')
+    db.session.add(chat)
+    db.session.commit()
+    assert chat.visitor_phone == '+6591234567'
+    assert chat.linked_customer_id == customer.id
+    whatsapp = ChatSession(visitor_name='Tan', visitor_phone='6591234567', status='bot')
+    db.session.add(whatsapp)
+    db.session.commit()
+    assert whatsapp.linked_customer_id == customer.id
@@ -0,0 +1,99 @@
+import io
+
+from extensions import db
+from models import ChatSession, ContactIdentity, Customer
+from services.customer_import import read_customers
+
+
+def import_csv(client, text, **options):
+    response = client.post('/api/customers/import', query_string=options, data=text.encode(),
+                           content_type='text/csv')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_import_creates_updates_and_reports_bad_rows(app, admin_client):
+    db.session.add(Customer(name='Ann Old', email='ann@example.com', tags='VIP'))
+    db.session.commit()
+    report = import_csv(admin_client, 'Name,Email,Phone,Tags\n'
+                                      'Ann Lee,ANN@example.com,,Returning\n'
+                                      'Bob,bob@example.com,012-345 6789,\n'
+                                      'Bob again,bob@example.com,,\n'
+                                      ',nobody@example.com,,\n'
+                                      'Cat,not-an-email,,\n')
+    assert (report['rows'], report['created'], report['updated'], report['duplicates'], report['invalid']) == (5, 1, 1, 1, 2)
+    assert [e['line'] for e in report['errors']] == [4, 5, 6]
+
+    ann = Customer.query.filter_by(email='ann@example.com').one()
+    assert (ann.name, ann.tags) == ('Ann Lee', 'VIP,Returning')
+    bob = Customer.query.filter_by(email='bob@example.com').one()
+    assert bob.phone == '+60123456789'
+    assert {i.value for i in ContactIdentity.query.filter_by(customer_id=bob.id)} == {'bob@example.com', '+60123456789'}
+
+
+def test_dry_run_and_skip_write_nothing(app, admin_client):
+    db.session.add(Customer(name='Ann', email='ann@example.com'))
+    db.session.commit()
+    text = 'name,email\nAnn Lee,ann@example.com\nDan,dan@example.com\n'
+    assert import_csv(admin_client, text, dry_run=1)['created'] == 1
+    assert Customer.query.count() == 1
+    report = import_csv(admin_client, text, on_existing='skip')
+    assert (report['created'], report['skipped_existing']) == (1, 1)
+    assert Customer.query.filter_by(email='ann@example.com').one().name == 'Ann'
+
+
+def test_email_missing_from_the_identity_index_is_rejected_not_a_500(app, admin_client):
+    # Inserted with Core, so the flush hooks never indexed the address
+    db.session.execute(Customer.__table__.insert().values(name='Ghost', email='ghost@example.com'))
+    db.session.commit()
+    report = import_csv(admin_client, 'name,email\nGhost Two,ghost@example.com\nEve,eve@example.com\n')
+    assert (report['created'], report['invalid']) == (1, 1)
+    assert report['errors'] == [{'line': 2, 'error': 'email belongs to an existing customer'}]
+    assert Customer.query.filter_by(email='ghost@example.com').one().name == 'Ghost'
+
+
+def test_phone_only_match_fills_blanks_but_keeps_name_and_email(app, admin_client):
+    db.session.add_all([Customer(name='Family Phone', email='mum@example.com', phone='+60123456789'),
+                        Customer(name='No Email', phone='+60198765432')])
+    db.session.commit()
+    report = import_csv(admin_client, 'name,email,phone,location\n'
+                                      'Kid,kid@example.com,0123456789,Penang\n'
+                                      'Named,named@example.com,0198765432,\n')
+    assert report['updated'] == 2
+    mum = Customer.query.filter_by(phone='+60123456789').one()
+    assert (mum.name, mum.email, mum.location) == ('Family Phone', 'mum@example.com', 'Penang')
+    other = Customer.query.filter_by(phone='+60198765432').one()
+    assert (other.name, other.email) == ('No Email', 'named@example.com')
+
+
+def test_reader_maps_header_aliases_and_cleans_fields():
+    stream = io.StringIO('Full Name,E-mail,Mobile,Status,Labels,Shoe size\n'
+                         'Ann,ANN@Example.com,012-345 6789,inactive,"VIP, VIP,New",42\n'
+                         '\n'
+                         'Bob,bob@example.com,,Lapsed,,\n'
+                         '"Cat\nLee",,12,,,\n')
+    ann, bob, cat = read_customers(stream, '60')
+    assert ann.fields == {'name': 'Ann', 'email': 'ann@example.com', 'phone': '+60123456789',
+                          'status': 'Inactive', 'tags': 'VIP,New'}
+    assert ann.keys() == [('email', 'ann@example.com'), ('phone', '+60123456789')]
+    assert (bob.line, bob.error) == (4, 'status must be one of Active, Inactive')
+    assert (cat.line, cat.error) == (6, "invalid phone '12'")
+
+
+def test_file_without_a_name_or_contact_column_is_refused(app, admin_client):
+    response = admin_client.post('/api/customers/import', data=b'email,phone\na@example.com,\n', content_type='text/csv')
+    assert response.status_code == 400
+    assert 'name column' in response.get_json()['error']
+    assert Customer.query.count() == 0
+
+
+def test_command_imports_in_batches_and_opens_chats(app, tmp_path):
+    path = tmp_path / 'customers.csv'
+    path.write_text('name,email\n' + ''.join(f'Customer {i},c{i}@example.com\n' for i in range(7)) + 'Bad,\n')
+    result = app.test_cli_runner().invoke(args=['import-customers', str(path), '--batch-size', '3', '--seed-chats',
+                                                '--no-notify'])
+    assert result.exit_code == 0, result.output
+    assert '8 rows: 7 created, 0 updated' in result.output and '1 invalid' in result.output
+    assert 'line 9: an email or phone is required' in result.output
+    assert Customer.query.count() == 7
+    assert ChatSession.query.filter(ChatSession.linked_customer_id.isnot(None)).count() == 7
@@ -0,0 +1,62 @@
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import (ChatMessage, ChatSession, Customer, CustomerSummary, Inquiry, Rule, User, invalidate_rules,
+                    rebuild_customer_summaries)
+
+
+def summary_of(customer_id):
+    db.session.expire_all()
+    summary = db.session.get(CustomerSummary, customer_id)
+    return summary and (summary.lead_score, summary.session_count, summary.open_inquiries, summary.active_agent_id)
+
+
+def test_summary_follows_chats_inquiries_and_scores(app, admin_client):
+    db.session.add(Rule(name='Price', keywords='price', score=20, operation='+'))
+    bob = User(username='bob1', password=generate_password_hash('pw'), name='Bob', role='agent')
+    customer = Customer(name='Acme')
+    db.session.add_all([bob, customer])
+    db.session.commit()
+    invalidate_rules()
+    customer_id, bob_id = customer.id, bob.id
+    assert summary_of(customer_id) == (0, 0, 0, None)
+
+    bot_chat = ChatSession(visitor_name='Acme', status='bot', linked_customer_id=customer_id)
+    bot_chat.chat_messages = [ChatMessage(sender_type='customer', text='what is the price?', timestamp='2026-01-05 10:00:00')]
+    agent_chat = ChatSession(visitor_name='Acme', status='agent_active', assigned_agent_id=bob_id,
+                             linked_customer_id=customer_id, updated_at='2026-02-01 09:00')
+    db.session.add_all([bot_chat, agent_chat,
+                        Inquiry(customer='Acme', customer_id=customer_id, status='New'),
+                        Inquiry(customer='Acme', customer_id=customer_id, status='Resolved')])
+    db.session.commit()
+    assert summary_of(customer_id)[1:] == (2, 1, bob_id)
+
+    # The profile API reads the summary (scoring the pending chat first) and the agent name in one go
+    data = admin_client.get(f'/api/customer/{customer_id}').get_json()
+    assert (data['lead_score'], data['session_count'], data['open_inquiries']) == (20, 2, 1)
+    assert (data['assigned_staff'], data['last_contact']) == ('Bob', '2026-02-01 09:00')
+
+    agent_chat.linked_customer_id = None
+    Inquiry.query.filter_by(status='New').one().status = 'Resolved'
+    db.session.commit()
+    assert summary_of(customer_id) == (20, 1, 0, None)
+
+
+def test_rebuild_matches_the_incremental_rows_and_deletes_drop_them(app):
+    customers = [Customer(name=f'Customer {i}') for i in range(3)]
+    db.session.add_all(customers)
+    db.session.commit()
+    db.session.add_all([ChatSession(visitor_name='V', status='bot', linked_customer_id=c.id) for c in customers[:2]])
+    db.session.add(Inquiry(customer='Customer 0', customer_id=customers[0].id, status='New'))
+    db.session.commit()
+    incremental = {c.id: summary_of(c.id) for c in customers}
+
+    db.session.execute(CustomerSummary.__table__.delete())
+    assert rebuild_customer_summaries(batch_size=2) == 3
+    db.session.commit()
+    assert {c.id: summary_of(c.id) for c in customers} == incremental
+
+    customer_id = customers[2].id
+    db.session.delete(customers[2])
+    db.session.commit()
+    assert summary_of(customer_id) is None
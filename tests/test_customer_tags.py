@@ -0,0 +1,53 @@
+from extensions import db
+from models import Customer, CustomerTag, Tag, backfill_customer_tags
+
+
+def tag_counts():
+    db.session.expire_all()
+    return {t.name: t.customer_count for t in Tag.query if t.customer_count}
+
+
+def linked_tags(customer_id):
+    return {name for name, in db.session.query(Tag.name).join(CustomerTag, CustomerTag.tag_id == Tag.id)
+            .filter(CustomerTag.customer_id == customer_id)}
+
+
+def test_create_edit_and_delete_keep_links_and_counts_in_step(app):
+    ann = Customer(name='Ann', tags='VIP, New,VIP')
+    bob = Customer(name='Bob', tags='VIP2')
+    db.session.add_all([ann, bob])
+    db.session.commit()
+    assert linked_tags(ann.id) == {'VIP', 'New'}
+    assert tag_counts() == {'VIP': 1, 'New': 1, 'VIP2': 1}
+
+    ann.tags = 'VIP,Returning'
+    bob.tags = 'VIP2,VIP'
+    db.session.commit()
+    assert linked_tags(ann.id) == {'VIP', 'Returning'}
+    assert tag_counts() == {'VIP': 2, 'Returning': 1, 'VIP2': 1}
+
+    db.session.delete(ann)
+    db.session.commit()
+    assert CustomerTag.query.filter_by(customer_id=ann.id).count() == 0
+    assert tag_counts() == {'VIP': 1, 'VIP2': 1}
+
+
+def test_tag_filter_matches_whole_tags_only(app, admin_client):
+    db.session.add_all([Customer(name='Ann', tags='VIP'), Customer(name='Bob', tags='VIP2'), Customer(name='Cat', tags='New')])
+    db.session.commit()
+    customers = admin_client.get('/api/customers?tags=VIP').get_json()['customers']
+    assert [c['name'] for c in customers] == ['Ann']
+    customers = admin_client.get('/api/customers?tags=VIP&tags=New').get_json()['customers']
+    assert sorted(c['name'] for c in customers) == ['Ann', 'Cat']
+
+
+def test_backfill_rebuilds_rows_written_without_the_hooks(app):
+    db.session.add(Customer(name='Ann', tags='VIP'))
+    db.session.commit()
+    # Bulk-written with Core, so the flush hooks never saw it
+    db.session.execute(Customer.__table__.insert().values(name='Ghost', tags='VIP,Premium'))
+    db.session.commit()
+    assert tag_counts() == {'VIP': 1}
+    assert backfill_customer_tags(batch_size=1) == 2
+    db.session.commit()
+    assert tag_counts() == {'VIP': 2, 'Premium': 1}
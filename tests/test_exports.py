@@ -0,0 +1,76 @@
+import csv
+import gzip
+import io
+import json
+
+from extensions import db
+from models import ChatMessage, ChatSession, Customer
+from services import export
+
+
+def test_encoders_split_into_chunks_without_changing_the_output():
+    rows = [(i, f'name, {i}', None) for i in range(200)]
+    chunks = list(export.csv_chunks(['id', 'name', 'note'], rows, chunk_size=256))
+    assert len(chunks) > 1
+    parsed = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+    assert parsed[0] == ['id', 'name', 'note'] and parsed[1] == ['0', 'name, 0', ''] and len(parsed) == 201
+
+    chunks = list(export.ndjson_chunks(({'id': i, 'text': 'café'} for i in range(200)), chunk_size=256))
+    assert len(chunks) > 1
+    lines = b''.join(chunks).decode().splitlines()
+    assert json.loads(lines[-1]) == {'id': 199, 'text': 'café'}
+
+    compressed = b''.join(export.gzip_chunks(iter(chunks)))
+    assert gzip.decompress(compressed) == b''.join(chunks)
+
+
+def test_group_rows_groups_consecutive_keys():
+    rows = [(1, 'a', 10), (1, 'a', 11), (2, 'b', None)]
+    assert list(export.group_rows(rows, 2)) == [((1, 'a'), [(10,), (11,)]), ((2, 'b'), [(None,)])]
+
+
+def add_chats():
+    chat = ChatSession(visitor_name='Ann', status='bot')
+    chat.chat_messages = [ChatMessage(sender_type='customer', text='hello', timestamp='2026-01-05 10:00:00'),
+                          ChatMessage(sender_type='bot', text='hi, how can I help?', timestamp='2026-01-05 10:00:01')]
+    db.session.add_all([chat, ChatSession(visitor_name='Empty', status='bot')])
+    db.session.commit()
+
+
+def test_customer_export_streams_csv_and_gzipped_ndjson(app, admin_client):
+    db.session.add_all([Customer(name='Ann', email='ann@example.com', tags='VIP'), Customer(name='Bob, Jr')])
+    db.session.commit()
+
+    response = admin_client.get('/export_customers')
+    assert response.is_streamed and response.mimetype == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [(r['Name'], r['Tags']) for r in rows] == [('Ann', 'VIP'), ('Bob, Jr', '')]
+
+    response = admin_client.get('/export/customers?format=ndjson&gzip=1')
+    assert response.mimetype == 'application/gzip'
+    assert 'customers.ndjson.gz' in response.headers['Content-Disposition']
+    records = [json.loads(line) for line in gzip.decompress(response.get_data()).splitlines()]
+    assert [(r['name'], r['email']) for r in records] == [('Ann', 'ann@example.com'), ('Bob, Jr', None)]
+
+
+def test_chat_export_nests_messages_in_ndjson_and_repeats_sessions_in_csv(app, admin_client):
+    add_chats()
+    records = [json.loads(line) for line in admin_client.get('/export/chats?format=ndjson').get_data().splitlines()]
+    assert [(r['visitor_name'], [m['text'] for m in r['messages']]) for r in records] == [
+        ('Ann', ['hello', 'hi, how can I help?']), ('Empty', [])]
+
+    rows = list(csv.DictReader(io.StringIO(admin_client.get('/export/chats').get_data(as_text=True))))
+    assert [(r['Visitor Name'], r['Text']) for r in rows] == [('Ann', 'hello'), ('Ann', 'hi, how can I help?'), ('Empty', '')]
+
+
+def test_unknown_exports_are_rejected(app, admin_client):
+    assert admin_client.get('/export/users').status_code == 404
+    assert admin_client.get('/export/customers?format=xml').status_code == 400
+
+
+def test_export_command_writes_a_file(app, tmp_path):
+    add_chats()
+    target = tmp_path / 'chats.csv.gz'
+    result = app.test_cli_runner().invoke(args=['export', 'chats', '--gzip', '-o', str(target)])
+    assert result.exit_code == 0, result.output
+    assert gzip.decompress(target.read_bytes()).decode().count('\n') == 4
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from extensions import db
+from models import FAQ, FAQDailyStat, FAQLog, RollupWatermark
+
+
+def test_faq_performance_counts_unrolled_clicks_without_writing(app, admin_client):
+    faq = FAQ(question='What are your opening hours?', answer='9 to 5', category='General')
+    db.session.add(faq)
+    db.session.flush()
+    db.session.add_all([FAQLog(faq_id=faq.id, clicked_at=datetime.utcnow()) for _ in range(3)])
+    db.session.commit()
+
+    response = admin_client.get('/api/analytics/faq-performance?days=7')
+    assert response.status_code == 200
+    row = next(f for f in response.get_json()['faqs'] if f['id'] == faq.id)
+    assert row['clicks'] == 3
+    assert row['daily'][-1] == 3
+    # A GET never rolls up or advances the watermark
+    assert FAQDailyStat.query.count() == 0
+    assert RollupWatermark.query.count() == 0
@@ -0,0 +1,64 @@
+from blueprints.auto_reply import auto_reply_engine
+from services.faq_search import FAQSearchIndex, tokenize
+
+FAQS = [
+    {'id': 1, 'question': 'What are your opening hours?', 'answer': 'We are open 9 to 5 on weekdays.'},
+    {'id': 2, 'question': 'Do you ship overseas?', 'answer': 'Yes, shipping takes 5 to 10 days.'},
+    {'id': 3, 'question': 'How do I get a refund?', 'answer': 'Refunds go back to the original payment within 5 days.'},
+]
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize('Hi, what are the Refunds for my orders?') == ['refund', 'order']
+    assert tokenize('please address') == ['address']
+
+
+def test_question_terms_outrank_answer_mentions():
+    index = FAQSearchIndex(FAQS + [{'id': 4, 'question': 'Payment methods', 'answer': 'Ask about a refund at the desk.'}])
+    results = index.search('refund please')
+    assert [faq_id for faq_id, _, _ in results] == [3, 4]
+    assert results[0][2] > results[1][2]
+
+
+def test_unrelated_or_stopword_only_messages_match_nothing():
+    index = FAQSearchIndex(FAQS)
+    assert index.search('what is the') == []
+    assert index.search('parking') == []
+
+
+def test_top_k_and_min_score_limit_the_answers():
+    index = FAQSearchIndex(FAQS)
+    assert len(index.search('within 5 days', top_k=3)) == 3
+    assert len(index.search('within 5 days', top_k=1)) == 1
+    best = index.search('overseas shipping')[0]
+    assert best[:2] == (2, FAQS[1]['answer'])
+    assert index.search('overseas shipping', min_score=best[2] + 1) == []
+
+
+def test_upsert_and_remove_update_the_index_in_place():
+    index = FAQSearchIndex(FAQS)
+    index.upsert({'id': 2, 'question': 'Do you deliver locally?', 'answer': 'Same-day delivery in town.'})
+    assert index.search('overseas') == []
+    assert [r[0] for r in index.search('deliver')] == [2]
+    index.remove(1)
+    assert 1 not in index and len(index) == 2
+    assert index.search('opening hours') == []
+
+
+def test_auto_reply_ranks_faqs_and_follows_edits(app, admin_client):
+    auto_reply_engine.invalidate()
+    auto_reply_engine.cache.clear()
+    ids = [admin_client.post('/api/faqs', json=dict(faq, category='General')).get_json()['id'] for faq in FAQS]
+
+    reply = admin_client.post('/api/auto-reply', json={'message': 'Can I get a refund?'}).get_json()
+    assert reply['source'] == 'faq'
+    assert reply['replies'][0] == FAQS[2]['answer']
+
+    admin_client.put(f'/api/faqs/{ids[2]}', json={'question': 'Returns policy', 'answer': 'Return items within 30 days.',
+                                                  'category': 'General'})
+    reply = admin_client.post('/api/auto-reply', json={'message': 'what is your returns policy'}).get_json()
+    assert reply['replies'] == ['Return items within 30 days.']
+
+    admin_client.delete(f'/api/faqs/{ids[1]}')
+    reply = admin_client.post('/api/auto-reply', json={'message': 'do you ship overseas'}).get_json()
+    assert reply['source'] == 'ai'
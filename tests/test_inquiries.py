@@ -0,0 +1,38 @@
+from extensions import db
+from models import Customer, Inquiry
+
+
+def test_link_picker_reaches_inquiries_past_the_first_page(app, admin_client):
+    # The oldest inquiry is far down the "recently updated" order
+    db.session.add(Inquiry(customer='Old Acme', status='New', updated_at='2020-01-01 00:00'))
+    db.session.add_all([Inquiry(customer=f'Customer {i}', status='New', updated_at=f'2026-01-01 {i // 60:02d}:{i % 60:02d}')
+                        for i in range(250)])
+    db.session.commit()
+    old_id = Inquiry.query.filter_by(customer='Old Acme').one().id
+
+    found = admin_client.get('/api/inquiries?search=old acme&sort=updated&order=desc&limit=50').get_json()
+    assert [i['id'] for i in found['inquiries']] == [old_id]
+    assert admin_client.get(f'/api/inquiries?id={old_id}&sort=updated&order=desc').get_json()['inquiries'][0]['customer'] == 'Old Acme'
+
+    # Following the cursor walks every inquiry exactly once
+    seen, cursor = [], None
+    while True:
+        params = {'sort': 'updated', 'order': 'desc', 'limit': 50}
+        if cursor:
+            params['cursor'] = cursor
+        page = admin_client.get('/api/inquiries', query_string=params).get_json()
+        seen += [i['id'] for i in page['inquiries']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 251
+    assert seen[-1] == old_id
+
+
+def test_customer_page_does_not_preload_recent_inquiries(app, admin_client):
+    customer = Customer(name='Picker Ltd')
+    db.session.add(customer)
+    db.session.commit()
+    page = admin_client.get(f'/customer/{customer.id}').data
+    assert b'limit=200' not in page
+    assert b'searchInquiryToLink' in page
@@ -0,0 +1,32 @@
+from services.keywords import compile_keywords
+
+
+def matcher(*keywords):
+    return compile_keywords([(kw, kw) for kw in keywords])
+
+
+def test_exact_keyword_matches():
+    assert matcher('sale', 'demo').search('Is there a SALE on?') == {'sale'}
+
+
+def test_misspelt_long_keyword_matches():
+    m = matcher('pricing', 'integration')
+    assert m.search('what is your pricng') == {'pricing'}
+    assert m.search('help with intergration') == {'integration'}
+
+
+def test_short_keywords_do_not_fuzzy_match_other_words():
+    m = matcher('sale', 'demo', 'cost')
+    assert m.search('the same thing again') == set()
+    assert m.search('I wrote a memo') == set()
+    assert m.search('most people post here') == set()
+
+
+def test_keyword_word_does_not_fuzzy_match_another_keyword():
+    m = matcher('prices', 'prizes')
+    assert m.search('list your prices') == {'prices'}
+
+
+def test_ambiguous_typo_matches_nothing():
+    # "prixes" is one edit from both keywords
+    assert matcher('prices', 'prizes').search('any prixes') == set()
@@ -0,0 +1,63 @@
+from extensions import db
+from models import ChatMessage, ChatSession, LeadScore, Rule, invalidate_rules
+
+
+def stored_score(session_id):
+    db.session.expire_all()
+    return db.session.get(LeadScore, session_id).score
+
+
+def add_chat(text):
+    chat = ChatSession(visitor_name='Visitor', status='bot', created_at='2026-01-05 10:00')
+    chat.chat_messages = [ChatMessage(sender_type='customer', text=text, timestamp='2026-01-05 10:00:00')]
+    db.session.add(chat)
+    db.session.commit()
+    return chat.id
+
+
+def test_new_chats_are_scored_by_the_pages_that_read_them(app, admin_client):
+    rule = Rule(name='Urgent', keywords='urgent', score=30, operation='+')
+    db.session.add(rule)
+    db.session.commit()
+    invalidate_rules()
+    chat_id = add_chat('this is urgent')
+    assert stored_score(chat_id) == 0
+    # No `flask maintain` running: the dashboard scores the new chat before listing it
+    assert admin_client.get('/dashboard').status_code == 200
+    assert stored_score(chat_id) == 30
+
+
+def test_rules_change_is_caught_up_a_bounded_batch_per_read(app, admin_client):
+    rule = Rule(name='Urgent', keywords='urgent', score=30, operation='+')
+    db.session.add(rule)
+    db.session.commit()
+    rule_id = rule.id
+    invalidate_rules()
+    chat_ids = [add_chat('this is urgent') for _ in range(3)]
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['maintain', '--once']).exit_code == 0
+    assert [stored_score(chat_id) for chat_id in chat_ids] == [30, 30, 30]
+
+    db.session.get(Rule, rule_id).score = 50
+    db.session.commit()
+    invalidate_rules()
+    app.config['LEAD_SCORE_READ_BATCH'] = 1
+    assert admin_client.get('/history').status_code == 200
+    assert admin_client.get('/dashboard').status_code == 200
+    assert sorted(stored_score(chat_id) for chat_id in chat_ids) == [30, 50, 50]
+
+    # The batch job does the rest in bulk, then has nothing left to do
+    result = runner.invoke(args=['maintain', '--once'])
+    assert 'lead scores: 1' in result.output
+    assert [stored_score(chat_id) for chat_id in chat_ids] == [50, 50, 50]
+    assert 'lead scores' not in runner.invoke(args=['maintain', '--once']).output
+
+
+def test_read_catch_up_can_be_turned_off(app, admin_client):
+    app.config['LEAD_SCORE_READ_BATCH'] = 0
+    db.session.add(Rule(name='Urgent', keywords='urgent', score=30, operation='+'))
+    db.session.commit()
+    invalidate_rules()
+    chat_id = add_chat('this is urgent')
+    assert admin_client.get('/dashboard').status_code == 200
+    assert stored_score(chat_id) == 0
@@ -0,0 +1,58 @@
+import pytest
+
+from extensions import db
+from models import Inquiry, User
+from schema import MIGRATIONS, upgrade_inquiry_rep_id
+from services import migrations
+
+
+def test_failed_migration_leaves_no_backfilled_rows(app):
+    # An inquiry from before the column existed: the rep known only by username
+    db.session.add(Inquiry(customer='Acme', status='New', assigned_rep='252499L'))
+    db.session.commit()
+    db.session.execute(Inquiry.__table__.update().values(assigned_user_id=None))
+    db.session.connection().execute(migrations.version_table.delete().where(migrations.version_table.c.version == 2))
+    db.session.commit()
+
+    def upgrade_then_fail(connection):
+        upgrade_inquiry_rep_id(connection)
+        raise RuntimeError('later step failed')
+
+    with pytest.raises(RuntimeError):
+        migrations.upgrade(db.session, [migrations.Migration(2, 'rep id', upgrade_then_fail)])
+    db.session.rollback()
+    assert Inquiry.query.one().assigned_user_id is None
+    assert 2 not in migrations.applied_versions(db.session.connection())
+
+    assert [m.version for m in migrations.upgrade(db.session, MIGRATIONS)] == [2]
+    assert Inquiry.query.one().assigned_user_id == User.query.filter_by(username='252499L').one().id
+
+
+def test_downgrade_stops_at_irreversible_migrations(app):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['db-downgrade', '4'])
+    assert result.exit_code != 0
+    assert 'migration 5' in result.output
+    assert migrations.current_version(db.session.connection()) == MIGRATIONS[-1].version
+
+    result = runner.invoke(args=['db-downgrade', '5'])
+    assert result.exit_code == 0, result.output
+    assert 'Schema at version 5' in result.output
+
+
+def test_empty_database_refuses_an_older_target(tmp_path):
+    from app import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'empty.db'}", 'TESTING': True})
+    with app.app_context():
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['init-db', '--to', '4'])
+        assert result.exit_code != 0
+        assert 'cannot be built at version 4' in result.output
+        assert not db.inspect(db.engine).has_table(User.__tablename__)
+
+        result = runner.invoke(args=['init-db', '--to', str(MIGRATIONS[-1].version)])
+        assert result.exit_code == 0, result.output
+        assert migrations.current_version(db.session.connection()) == MIGRATIONS[-1].version
+        db.session.remove()
+        db.engine.dispose()
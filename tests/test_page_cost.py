@@ -0,0 +1,82 @@
+import re
+
+from sqlalchemy import event
+
+from extensions import db
+from models import FAQ, ChatMessage, ChatSession, Customer, Inquiry, LeadScore, refresh_lead_scores
+
+
+def page_statements(client, url):
+    """The SQL statements a page ran."""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    assert b'backendSearchSeed' not in response.data
+    return statements
+
+
+def selects_from(statements, table):
+    pattern = re.compile(rf'^SELECT\b.*\bFROM\s+"?{table}"?(\s|$)', re.S)
+    return [s for s in statements if pattern.search(s)]
+
+
+def unbounded_selects(client, url, table):
+    """SELECTs on table that the page ran without a LIMIT."""
+    return [s for s in selects_from(page_statements(client, url), table)
+            if 'LIMIT' not in s and 'count(' not in s.lower()]
+
+
+def test_list_pages_do_not_load_every_customer_or_inquiry(app, admin_client):
+    db.session.add_all([Customer(name=f'Customer {i}', email=f'c{i}@example.com') for i in range(30)])
+    db.session.add_all([Inquiry(customer=f'Customer {i}', status='New') for i in range(30)])
+    db.session.commit()
+    for url in ('/customers', '/repository', '/dashboard', '/scoring', '/history'):
+        assert unbounded_selects(admin_client, url, 'customer') == [], url
+        assert unbounded_selects(admin_client, url, 'inquiry') == [], url
+
+
+def test_global_search_finds_faqs_and_customers(app, admin_client):
+    db.session.add_all([FAQ(question='Do you ship overseas?', answer='Yes', category='Shipping'), Customer(name='Overseas Ltd')])
+    db.session.commit()
+    results = admin_client.get('/api/global-search?q=overseas').get_json()
+    assert {r['category'] for r in results} == {'FAQ', 'Customer'}
+
+
+def test_history_reads_stored_scores_and_last_messages_in_bulk(app, admin_client):
+    chats = []
+    for i in range(10):
+        chat = ChatSession(visitor_name=f'Visitor {i}', status='bot', archived=False)
+        chat.chat_messages = [ChatMessage(sender_type='customer', text=f'first {i}', timestamp='2026-01-05 10:00:00'),
+                              ChatMessage(sender_type='bot', text=f'last reply {i}', timestamp='2026-01-05 10:00:05')]
+        chats.append(chat)
+    db.session.add_all(chats)
+    db.session.commit()
+    refresh_lead_scores()
+    db.session.commit()
+    db.session.get(LeadScore, chats[3].id).score = 40
+    db.session.commit()
+
+    statements = page_statements(admin_client, '/history')
+    # Nothing pending: one query for the previews however many chats are listed
+    assert len(selects_from(statements, 'chat_message')) == 1
+    page = admin_client.get('/history').get_data(as_text=True)
+    assert 'last reply 9' in page and 'first 9' not in page
+    assert 'Lead (40)' in page
+
+
+def test_link_pickers_search_customers_and_inquiries(app, admin_client):
+    db.session.add_all([Customer(name='Zed Traders', email='zed@example.com'), Customer(name='Other Co'),
+                        Inquiry(customer='Zed Traders', status='New')])
+    db.session.commit()
+    customers = admin_client.get('/api/customers?search=zed&sort=last_contact&order=desc').get_json()['customers']
+    assert [c['name'] for c in customers] == ['Zed Traders']
+    by_id = admin_client.get(f"/api/customers?id={customers[0]['id']}").get_json()['customers']
+    assert [c['email'] for c in by_id] == ['zed@example.com']
+    inquiries = admin_client.get('/api/inquiries?search=zed&sort=updated&order=desc').get_json()['inquiries']
+    assert [i['customer'] for i in inquiries] == ['Zed Traders']
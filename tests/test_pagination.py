@@ -0,0 +1,81 @@
+import pytest
+
+from extensions import db
+from models import Customer, Inquiry
+from services.pagination import decode_cursor, encode_cursor
+
+
+def walk(client, **params):
+    """Every page of /api/customers for these params: (ids in order, pages)."""
+    ids, pages, cursor = [], [], None
+    while True:
+        page = client.get('/api/customers', query_string=dict(params, cursor=cursor) if cursor else params).get_json()
+        pages.append(page)
+        ids += [c['id'] for c in page['customers']]
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids, pages
+
+
+def test_cursor_round_trips_and_is_tied_to_its_sort():
+    token = encode_cursor('name:asc', 'Ann', 7)
+    assert decode_cursor(token, 'name:asc') == ('Ann', 7)
+    with pytest.raises(ValueError):
+        decode_cursor(token, 'name:desc')
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor', 'name:asc')
+
+
+def test_directory_pages_through_ties_and_missing_values_once(app, admin_client):
+    # Repeated names and blank last contacts: the id breaks the ties
+    db.session.add_all([Customer(name=f'Customer {i % 4}', last_contact=f'2026-01-{i % 9 + 1:02d}' if i % 3 else None)
+                        for i in range(45)])
+    db.session.commit()
+    all_ids = {c.id for c in Customer.query}
+    for sort in ('id', 'name', 'last_contact'):
+        for order in ('asc', 'desc'):
+            ids, pages = walk(admin_client, sort=sort, order=order, limit=10)
+            assert len(ids) == 45 and set(ids) == all_ids, (sort, order)
+            assert [len(p['customers']) for p in pages] == [10, 10, 10, 10, 5]
+            assert pages[0]['total'] == 45 and 'total' not in pages[1]
+
+    ids, _ = walk(admin_client, sort='name', order='desc', limit=10)
+    names = [db.session.get(Customer, i).name for i in ids]
+    assert names == sorted(names, reverse=True)
+
+
+def test_rows_added_mid_walk_do_not_repeat_earlier_pages(app, admin_client):
+    db.session.add_all([Customer(name=f'Customer {i:02d}') for i in range(20)])
+    db.session.commit()
+    first = admin_client.get('/api/customers?sort=name&limit=10').get_json()
+    db.session.add(Customer(name='Aardvark'))
+    db.session.commit()
+    second = admin_client.get('/api/customers', query_string={'sort': 'name', 'limit': 10,
+                                                              'cursor': first['next_cursor']}).get_json()
+    assert [c['name'] for c in second['customers']] == [f'Customer {i:02d}' for i in range(10, 20)]
+
+
+def test_bad_cursor_or_sort_is_a_400(app, admin_client):
+    db.session.add_all([Customer(name=f'Customer {i}') for i in range(3)])
+    db.session.commit()
+    cursor = admin_client.get('/api/customers?sort=name&limit=1').get_json()['next_cursor']
+    assert admin_client.get('/api/customers', query_string={'sort': 'id', 'cursor': cursor}).status_code == 400
+    assert admin_client.get('/api/customers?cursor=garbage').status_code == 400
+    assert admin_client.get('/api/customers?sort=email').status_code == 400
+
+
+def test_inquiry_picker_pages_by_status_and_rejects_cursors_of_other_sorts(app, admin_client):
+    db.session.add_all([Customer(name='Ann'), Customer(name='Bob')])
+    db.session.add_all([Inquiry(customer=f'Customer {i}', status=('New', 'Resolved', None)[i % 3]) for i in range(12)])
+    db.session.commit()
+    ids, cursor = [], None
+    while True:
+        params = {'sort': 'status', 'limit': 5, **({'cursor': cursor} if cursor else {})}
+        page = admin_client.get('/api/inquiries', query_string=params).get_json()
+        ids += [i['id'] for i in page['inquiries']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert sorted(ids) == sorted(i.id for i in Inquiry.query)
+    name_cursor = admin_client.get('/api/customers?sort=name&limit=1').get_json()['next_cursor']
+    assert admin_client.get('/api/inquiries', query_string={'sort': 'status', 'cursor': name_cursor}).status_code == 400
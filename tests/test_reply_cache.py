@@ -0,0 +1,27 @@
+from services.auto_reply import AutoReplyEngine
+from services.reply_cache import ReplyCache, normalize_message
+
+
+def engine(*templates):
+    rows = [{'id': i, 'message': message, 'keywords': keywords} for i, (keywords, message) in enumerate(templates, 1)]
+    return AutoReplyEngine(lambda: (rows, []), lambda: 1, cache=ReplyCache())
+
+
+def test_normalize_keeps_punctuation():
+    assert normalize_message('  Do you teach  C++? ') == 'do you teach c++?'
+
+
+def test_messages_differing_in_keyword_punctuation_do_not_share_a_reply():
+    e = engine(('c++', 'Our C++ course starts Monday.'), ('24/7', 'Support is open around the clock.'))
+    source, matches = e.match('Do you teach C++?')
+    assert source == 'template' and matches[0]['id'] == 1
+    assert e.match('Do you teach C?') == (None, [])
+    assert e.match('Are you open 24/7')[1][0]['id'] == 2
+    assert e.match('Are you open 247') == (None, [])
+
+
+def test_case_and_spacing_variants_share_one_entry():
+    e = engine(('refund', 'Refunds take 5 days.'))
+    e.match('I want a  REFUND')
+    e.match('i want a refund')
+    assert e.cache.stats()['hits'] == 1
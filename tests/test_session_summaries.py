@@ -0,0 +1,29 @@
+from extensions import db
+from models import ChatMessage, ChatSession, ChatSessionSummary
+
+
+def add_chat(name='Visitor'):
+    chat = ChatSession(visitor_name=name, status='bot', created_at='2026-01-05 10:00', updated_at='2026-01-05 10:00')
+    chat.chat_messages = [
+        ChatMessage(sender_type='customer', sender_name=name, text='hi, pricing?', timestamp='2026-01-05 10:00:00'),
+        ChatMessage(sender_type='bot', sender_name='Chatbot', text='Plans start at $49', timestamp='2026-01-05 10:00:05'),
+    ]
+    db.session.add(chat)
+    db.session.commit()
+    return chat
+
+
+def test_archiving_a_chat_summarizes_it(app, admin_client):
+    chat = add_chat()
+    assert db.session.get(ChatSessionSummary, chat.id) is None
+    response = admin_client.post(f'/api/chat/session/{chat.id}/archive', json={'archived': True})
+    assert response.status_code == 200
+    assert db.session.get(ChatSessionSummary, chat.id) is not None
+
+
+def test_maintain_once_summarizes_new_chats(app):
+    chat_ids = [add_chat(f'Visitor {i}').id for i in range(3)]
+    result = app.test_cli_runner().invoke(args=['maintain', '--once'])
+    assert result.exit_code == 0, result.output
+    assert 'session summaries: 3' in result.output
+    assert all(db.session.get(ChatSessionSummary, chat_id) for chat_id in chat_ids)
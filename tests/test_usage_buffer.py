@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from services.usage_buffer import CounterBuffer
+
+
+class Store:
+    """flush_fn stand-in that fails on rows marked bad, and on everything while down."""
+
+    def __init__(self):
+        self.down = False
+        self.counters = {}
+        self.events = []
+        self.threads = set()
+        self.flushed = threading.Event()
+
+    def __call__(self, counters, events):
+        self.threads.add(threading.current_thread().name)
+        if self.down:
+            raise OperationalError('INSERT', {}, Exception('database is locked'))
+        rows = events.get('log', [])
+        if any(row.get('bad') for row in rows):
+            raise IntegrityError('INSERT', {}, Exception('foreign key violation'))
+        for kind, counter in counters.items():
+            for key, n in counter.items():
+                self.counters[(kind, key)] = self.counters.get((kind, key), 0) + n
+        self.events.extend(rows)
+        self.flushed.set()
+
+
+def test_full_buffer_is_flushed_off_the_request_thread():
+    store = Store()
+    buffer = CounterBuffer(store, interval=60, max_pending=3)
+    for _ in range(3):
+        buffer.increment('clicks', 1)
+    assert store.flushed.wait(5)
+    assert store.counters == {('clicks', 1): 3}
+    assert threading.current_thread().name not in store.threads
+    buffer.shutdown()
+
+
+def test_failing_row_is_retried_then_dropped_without_blocking_others():
+    store = Store()
+    buffer = CounterBuffer(store, interval=60, max_pending=1000, max_attempts=3)
+    buffer.increment('clicks', 7)
+    buffer.record('log', {'id': 1})
+    buffer.record('log', {'id': 2, 'bad': True})
+    for _ in range(2):
+        with pytest.raises(IntegrityError):
+            buffer.flush()
+    assert store.counters == {}
+    # Third failure: rows are written one by one and the bad one is dropped
+    assert buffer.flush() == 2
+    assert store.counters == {('clicks', 7): 1}
+    assert store.events == [{'id': 1}]
+    buffer.record('log', {'id': 3})
+    assert buffer.flush() == 1
+    assert store.events == [{'id': 1}, {'id': 3}]
+    buffer.shutdown()
+
+
+def test_outage_longer_than_max_attempts_loses_nothing():
+    store = Store()
+    buffer = CounterBuffer(store, interval=60, max_pending=1000, max_attempts=3)
+    store.down = True
+    for attempt in range(10):
+        buffer.increment('clicks', 7)
+        buffer.record('log', {'id': attempt})
+        with pytest.raises(OperationalError):
+            buffer.flush()
+    assert buffer.pending('clicks', 7) == 10
+    assert buffer.retry_delay() == 60 * 12
+
+    store.down = False
+    assert buffer.flush() == 20
+    assert store.counters == {('clicks', 7): 10}
+    assert store.events == [{'id': attempt} for attempt in range(10)]
+    assert buffer.retry_delay() == 60
+    buffer.shutdown()
+
+
+def test_outage_while_isolating_rows_keeps_the_unwritten_ones():
+    store = Store()
+    buffer = CounterBuffer(store, interval=60, max_pending=1000, max_attempts=1)
+    buffer.record('log', {'id': 1, 'bad': True})
+    buffer.record('log', {'id': 2})
+    buffer.record('log', {'id': 3})
+    calls = []
+    def go_down_after_first_row(counters, events):
+        calls.append(events)
+        store.down = len(calls) > 2
+        store(counters, events)
+    buffer._flush_fn = go_down_after_first_row
+    with pytest.raises(OperationalError):
+        buffer.flush()
+    # The batch failed, {'id': 1} was dropped, then the outage hit {'id': 2}
+    store.down = False
+    buffer._flush_fn = store
+    assert buffer.flush() == 2
+    assert store.events == [{'id': 2}, {'id': 3}]
+    buffer.shutdown()